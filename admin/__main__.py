@@ -0,0 +1,7 @@
+# Standard library
+import sys
+
+# Local
+from admin.cli import main
+
+sys.exit(main())
@@ -1,58 +1,71 @@
 from admin.utils import *
+from admin.charts import altair_chart, plotly_chart
+from admin.owner_data import category_counts, ytd_totals
+from admin import periods
+from admin.queries import DRILLDOWN_SQL
+from admin.export import export_panel
+from admin.tracing import in_current_span
 import plotly.express as px
 
-azk = AzureKeyVaultClient()
-snf = SnowflakeClient(kv_client=azk)
+OWNER = current_owner()
+
+snf = get_snowflake_client()
+
+DRILLDOWN_PERIODS = ("All", "Current Month", "Last 3 Months")
+DRILLDOWN_PREFETCH = 5
+DRILLDOWN_TTL_S = 600
+
+
+def drilldown_range(period: str) -> periods.DateRange:
+    """[start, end) dates of a drilldown period."""
+    if period == "Current Month":
+        return periods.current_month()
+    if period == "Last 3 Months":
+        # Rolling window, as the old `>= DATEADD(month, -3, CURRENT_DATE())`
+        return periods.trailing_months(3)
+    return periods.year_to_date()
+
+
+@st.cache_data(ttl=DRILLDOWN_TTL_S, show_spinner=False)
+def load_drilldown(owner: str, category: str | None, start: date, end: date) -> pd.DataFrame:
+    return get_snowflake_client().run_query_df(
+        DRILLDOWN_SQL,
+        {"owner": owner, "category": category, "start": start, "end": end},
+        label="drilldown",
+        compact=True,
+    )
 
 # ============================================================
 # 1. KPI METRICS DASHBOARD
 # ============================================================
 st.title("📊 Budget Analytics Dashboard")
 
-kpi_data = snf.run_query_df("""
-    SELECT 
-        ABS(SUM(CASE WHEN L1 <> 'Income' THEN AMOUNT ELSE 0 END)) as total_expenses,
-        COUNT(CASE WHEN L1 IS NULL THEN 1 END) as unclassified_count
-    FROM BUDGET.MART.BUDGET
-    WHERE YEAR(transaction_date) = YEAR(CURRENT_DATE()) 
-      AND OWNER = 'Peter'
-""")
+# Year-to-date slice of the shared monthly totals (fetched once for all owners)
+ytd = ytd_totals(OWNER)
+# Mirrors `L1 <> 'Income'` in SQL, which also drops unclassified rows
+is_expense = ytd["L1"].notna() & (ytd["L1"] != OWNER.income_category)
+expenses = ytd[is_expense]
 
-# Get category stats
-category_stats = snf.run_query_df("""
-    SELECT 
-        L1,
-        ABS(SUM(AMOUNT)) as category_total
-    FROM BUDGET.MART.BUDGET
-    WHERE L1 <> 'Income' 
-      AND YEAR(transaction_date) = YEAR(CURRENT_DATE())
-      AND OWNER = 'Peter'
-    GROUP BY L1
-    ORDER BY category_total DESC
-    LIMIT 1
-""")
+category_totals = (
+    expenses.groupby("L1")["AMOUNT"].sum().abs().sort_values(ascending=False)
+)
 
-if not kpi_data.empty:
+if not ytd.empty:
     col1, col2, col3, col4 = st.columns(4)
     
-    total_exp = kpi_data['TOTAL_EXPENSES'].iloc[0]
-    unclass_count = int(kpi_data['UNCLASSIFIED_COUNT'].iloc[0])
+    total_exp = abs(expenses['AMOUNT'].sum())
+    unclass_count = int(ytd.loc[ytd['L1'].isna(), 'TRANSACTIONS'].sum())
     
     with col1:
         st.metric("💰 Total Expenses YTD", f"{total_exp:,.0f}")
     with col2:
         # Calculate months with data
-        months_with_data = snf.run_query_df("""
-            SELECT COUNT(DISTINCT REPORTING_DATE) as months
-            FROM BUDGET.MART.BUDGET
-            WHERE YEAR(transaction_date) = YEAR(CURRENT_DATE()) AND OWNER = 'Peter'
-        """)
-        months = int(months_with_data['MONTHS'].iloc[0]) or 1
+        months = ytd['REPORTING_DATE'].nunique() or 1
         avg_monthly = total_exp / months
         st.metric("📅 Avg Monthly", f"{avg_monthly:,.0f}")
     with col3:
-        if not category_stats.empty:
-            top_cat = category_stats['L1'].iloc[0]
+        if not category_totals.empty:
+            top_cat = category_totals.index[0]
             st.metric("🏆 Top Category", top_cat)
         else:
             st.metric("🏆 Top Category", "N/A")
@@ -66,108 +79,95 @@ st.divider()
 # ============================================================
 with st.container(border=True):
     st.write("Chart of Monthly Expenses (No Income Included)") 
-    data_chart = snf.run_query_df("""
-        SELECT 
-            REPORTING_DATE,
-            L1,
-            ROUND(ABS(SUM(AMOUNT)),0) as AMOUNT
-        FROM BUDGET.MART.BUDGET
-        WHERE L1 <> 'Income' 
-          AND YEAR(transaction_date) = YEAR(CURRENT_DATE()) 
-          AND OWNER = 'Peter' 
-        GROUP BY ALL
-    """)
+    data_chart = expenses.groupby(['REPORTING_DATE', 'L1'], as_index=False)['AMOUNT'].sum()
+    data_chart['AMOUNT'] = data_chart['AMOUNT'].abs().round(0)
     
     
     # Create an Altair bar chart
-    chart = alt.Chart(data_chart).mark_bar(size=25).encode(
-        x=alt.X('yearmonth(REPORTING_DATE):T', title='Month'),
-        y=alt.Y('AMOUNT:Q', title='Amount'),
-        color='L1:N'
-    ).properties(
-        width=600,
-        height=400
-    ).configure_axis(
-        labelFontSize=12,
-        titleFontSize=14
-    ).configure_legend(
-        titleFontSize=14,
-        labelFontSize=12
+    altair_chart(
+        "admin_2.monthly_expenses",
+        data_chart,
+        lambda d: alt.Chart(d).mark_bar(size=25).encode(
+            x=alt.X('yearmonth(REPORTING_DATE):T', title='Month'),
+            y=alt.Y('AMOUNT:Q', title='Amount'),
+            color='L1:N'
+        ).properties(
+            width=600,
+            height=400
+        ).configure_axis(
+            labelFontSize=12,
+            titleFontSize=14
+        ).configure_legend(
+            titleFontSize=14,
+            labelFontSize=12
+        ),
+        x='REPORTING_DATE', y='AMOUNT', color='L1',
     )
-    
-    # Display the chart in Streamlit
-    st.altair_chart(chart, use_container_width=True)
 
 with st.container(border=True):
     st.write("Chart of Monthly P&L")  
 
-    data_chart_2 = snf.run_query_df("""
-        SELECT 
-            REPORTING_DATE,
-            ROUND(SUM(AMOUNT),0) as AMOUNT 
-        FROM BUDGET.MART.BUDGET
-        WHERE YEAR(transaction_date) = YEAR(CURRENT_DATE()) 
-          AND OWNER = 'Peter' 
-        GROUP BY ALL
-    """)
+    data_chart_2 = ytd.groupby('REPORTING_DATE', as_index=False)['AMOUNT'].sum()
+    data_chart_2['AMOUNT'] = data_chart_2['AMOUNT'].round(0)
     
     
     # Add a color column based on the AMOUNT value
     data_chart_2['color'] = data_chart_2['AMOUNT'].apply(lambda x: 'green' if x > 0 else 'red')
     
     # Create an Altair bar chart
-    chart_2 = alt.Chart(data_chart_2).mark_bar(size=25).encode(
-        x=alt.X('yearmonth(REPORTING_DATE):T', title='Month'),
-        y=alt.Y('AMOUNT:Q', title='Amount'),
-        color=alt.condition(
-            alt.datum.AMOUNT > 0,
-            alt.value('green'),
-            alt.value('red')
-        )
-    ).properties(
-        width=600,
-        height=400
-    ).configure_axis(
-        labelFontSize=12,
-        titleFontSize=14
-    ).configure_legend(
-        titleFontSize=14,
-        labelFontSize=12
+    altair_chart(
+        "admin_2.monthly_pnl",
+        data_chart_2,
+        lambda d: alt.Chart(d).mark_bar(size=25).encode(
+            x=alt.X('yearmonth(REPORTING_DATE):T', title='Month'),
+            y=alt.Y('AMOUNT:Q', title='Amount'),
+            color=alt.condition(
+                alt.datum.AMOUNT > 0,
+                alt.value('green'),
+                alt.value('red')
+            )
+        ).properties(
+            width=600,
+            height=400
+        ).configure_axis(
+            labelFontSize=12,
+            titleFontSize=14
+        ).configure_legend(
+            titleFontSize=14,
+            labelFontSize=12
+        ),
+        x='REPORTING_DATE', y='AMOUNT',
     )
 
-    # Display the chart in Streamlit
-    st.altair_chart(chart_2, use_container_width=True)
-
 # ============================================================
 # 3. HIERARCHICAL TREEMAP (L1 → L2 breakdown)
 # ============================================================
 with st.container(border=True):
     st.write("🗂️ Hierarchical Spending Breakdown YTD")
     
-    treemap_data = snf.run_query_df("""
-        SELECT 
-            COALESCE(L1, 'Unclassified') as L1,
-            COALESCE(L2, 'No L2') as L2,
-            ABS(SUM(AMOUNT)) as AMOUNT
-        FROM BUDGET.MART.BUDGET
-        WHERE L1 <> 'Income' 
-          AND YEAR(transaction_date) = YEAR(CURRENT_DATE())
-          AND OWNER = 'Peter'
-        GROUP BY L1, L2
-        HAVING SUM(AMOUNT) < 0
-    """)
+    treemap_data = (
+        expenses.fillna({'L2': 'No L2'})
+        .groupby(['L1', 'L2'], as_index=False)['AMOUNT']
+        .sum()
+    )
+    treemap_data = treemap_data[treemap_data['AMOUNT'] < 0].assign(
+        AMOUNT=lambda d: d['AMOUNT'].abs()
+    )
     
     if not treemap_data.empty:
-        fig = px.treemap(
+        plotly_chart(
+            "admin_2.treemap",
             treemap_data,
-            path=['L1', 'L2'],
+            lambda d: px.treemap(
+                d,
+                path=['L1', 'L2'],
+                values='AMOUNT',
+                color='AMOUNT',
+                color_continuous_scale='RdYlGn_r',
+                title='Spending Distribution by Category - YTD',
+            ).update_layout(height=500),
             values='AMOUNT',
-            color='AMOUNT',
-            color_continuous_scale='RdYlGn_r',
-            title='Spending Distribution by Category - YTD',
         )
-        fig.update_layout(height=500)
-        st.plotly_chart(fig, use_container_width=True)
 
 # ============================================================
 # 4. CATEGORY TREND LINES
@@ -175,36 +175,28 @@ with st.container(border=True):
 with st.container(border=True):
     st.write("📈 Category Trends Over Time")
     
-    trend_data = snf.run_query_df("""
-        SELECT 
-            REPORTING_DATE,
-            L1,
-            ROUND(ABS(SUM(AMOUNT)),0) as AMOUNT
-        FROM BUDGET.MART.BUDGET
-        WHERE L1 <> 'Income' 
-          AND YEAR(transaction_date) = YEAR(CURRENT_DATE())
-          AND OWNER = 'Peter'
-        GROUP BY REPORTING_DATE, L1
-        ORDER BY REPORTING_DATE
-    """)
+    trend_data = data_chart.sort_values('REPORTING_DATE')
     
     if not trend_data.empty:
-        chart_trend = alt.Chart(trend_data).mark_line(point=True).encode(
-            x=alt.X('REPORTING_DATE:T', title='Month'),
-            y=alt.Y('AMOUNT:Q', title='Amount'),
-            color=alt.Color('L1:N', title='Category'),
-            tooltip=['REPORTING_DATE:T', 'L1:N', 'AMOUNT:Q']
-        ).properties(
-            height=400
-        ).configure_axis(
-            labelFontSize=14,
-            titleFontSize=16
-        ).configure_legend(
-            titleFontSize=16,
-            labelFontSize=14
+        altair_chart(
+            "admin_2.category_trends",
+            trend_data,
+            lambda d: alt.Chart(d).mark_line(point=True).encode(
+                x=alt.X('REPORTING_DATE:T', title='Month'),
+                y=alt.Y('AMOUNT:Q', title='Amount'),
+                color=alt.Color('L1:N', title='Category'),
+                tooltip=['REPORTING_DATE:T', 'L1:N', 'AMOUNT:Q']
+            ).properties(
+                height=400
+            ).configure_axis(
+                labelFontSize=14,
+                titleFontSize=16
+            ).configure_legend(
+                titleFontSize=16,
+                labelFontSize=14
+            ),
+            x='REPORTING_DATE', y='AMOUNT', color='L1',
         )
-        
-        st.altair_chart(chart_trend, use_container_width=True)
 
 # ============================================================
 # 5. MONTH-OVER-MONTH COMPARISON
@@ -212,26 +204,19 @@ with st.container(border=True):
 with st.container(border=True):
     st.write("📊 Month-over-Month Change")
     
-    mom_data = snf.run_query_df("""
-        WITH monthly AS (
-            SELECT 
-                REPORTING_DATE,
-                ABS(SUM(CASE WHEN L1 <> 'Income' THEN AMOUNT ELSE 0 END)) as expenses
-            FROM BUDGET.MART.BUDGET
-            WHERE YEAR(transaction_date) = YEAR(CURRENT_DATE())
-              AND OWNER = 'Peter'
-            GROUP BY REPORTING_DATE
-            ORDER BY REPORTING_DATE
-        )
-        SELECT 
-            REPORTING_DATE,
-            expenses as current_month,
-            LAG(expenses, 1) OVER (ORDER BY REPORTING_DATE) as previous_month,
-            ROUND(expenses - LAG(expenses, 1) OVER (ORDER BY REPORTING_DATE), 0) as change_amount,
-            ROUND(((expenses - LAG(expenses, 1) OVER (ORDER BY REPORTING_DATE)) / 
-                   NULLIF(LAG(expenses, 1) OVER (ORDER BY REPORTING_DATE), 0)) * 100, 2) as change_pct
-        FROM monthly
-    """)
+    mom_data = (
+        ytd.assign(AMOUNT=ytd['AMOUNT'].where(is_expense, 0))
+        .groupby('REPORTING_DATE', as_index=False)['AMOUNT']
+        .sum()
+        .sort_values('REPORTING_DATE')
+    )
+    mom_data['CURRENT_MONTH'] = mom_data['AMOUNT'].abs()
+    mom_data['PREVIOUS_MONTH'] = mom_data['CURRENT_MONTH'].shift(1)
+    change = mom_data['CURRENT_MONTH'] - mom_data['PREVIOUS_MONTH']
+    mom_data['CHANGE_AMOUNT'] = change.round(0)
+    mom_data['CHANGE_PCT'] = (
+        change / mom_data['PREVIOUS_MONTH'].replace(0, float('nan')) * 100
+    ).round(2)
     
     if not mom_data.empty:
         # Format change columns with colors
@@ -273,50 +258,32 @@ with st.container(border=True):
     col_filter1, col_filter2 = st.columns(2)
     
     with col_filter1:
-        categories = snf.run_query_df("""
-            SELECT DISTINCT L1 
-            FROM BUDGET.MART.BUDGET 
-            WHERE OWNER = 'Peter' AND L1 IS NOT NULL
-            ORDER BY L1
-        """)
+        # Most frequent first; used to decide what to prefetch
+        categories = category_counts(OWNER)
         selected_category = st.selectbox(
             "Filter by Category",
-            options=["All"] + categories['L1'].tolist()
+            options=["All"] + sorted(categories['L1'].tolist())
         )
     
     with col_filter2:
         selected_month = st.selectbox(
             "Filter by Month",
-            options=["All", "Current Month", "Last 3 Months"]
+            options=list(DRILLDOWN_PERIODS)
         )
     
-    # Build query dynamically
-    category_filter = f"AND L1 = '{selected_category}'" if selected_category != "All" else ""
-    
-    if selected_month == "Current Month":
-        date_filter = "AND MONTH(transaction_date) = MONTH(CURRENT_DATE())"
-    elif selected_month == "Last 3 Months":
-        date_filter = "AND transaction_date >= DATEADD(month, -3, CURRENT_DATE())"
-    else:
-        date_filter = ""
+    category = None if selected_category == "All" else selected_category
+    transactions = load_drilldown(OWNER.name, category, *drilldown_range(selected_month))
     
-    transactions = snf.run_query_df(f"""
-        SELECT 
-            TRANSACTION_DATE,
-            DESCRIPTION,
-            L1,
-            L2,
-            L3,
-            AMOUNT,
-            SOURCE_SYSTEM
-        FROM BUDGET.MART.BUDGET
-        WHERE OWNER = 'Peter'
-          AND YEAR(transaction_date) = YEAR(CURRENT_DATE())
-          {category_filter}
-          {date_filter}
-        ORDER BY TRANSACTION_DATE DESC
-        LIMIT 100
-    """)
+    # Warm the cache for the likely next selections: the most common
+    # categories in this period and every period of this category
+    upcoming = [(c, selected_month) for c in categories['L1'].head(DRILLDOWN_PREFETCH)]
+    upcoming += [(category, period) for period in DRILLDOWN_PERIODS]
+    prefetched = st.session_state.setdefault("drilldown_prefetched", {})
+    for cat, period in upcoming:
+        cache_key = (cat, *drilldown_range(period))
+        if time.time() - prefetched.get(cache_key, 0) > DRILLDOWN_TTL_S:
+            prefetched[cache_key] = time.time()
+            get_background_executor().submit(in_current_span(load_drilldown), OWNER.name, *cache_key)
     
     if not transactions.empty:
         st.dataframe(
@@ -335,3 +302,9 @@ with st.container(border=True):
             height=400
         )
 
+
+# ============================================================
+# EXPORT
+# ============================================================
+with st.container(border=True):
+    export_panel(OWNER)
@@ -0,0 +1,160 @@
+from admin.utils import *
+from admin.metrics import CALL_LOG, percentile
+from admin.charts import SPEC_CACHE
+from admin.datasets import DATASETS
+from admin.ingest import INGEST_ENABLED, get_ingestion_scheduler
+from admin.warmup import WARMUP
+from admin import resilience
+
+snf = get_snowflake_client()
+
+st.title("⏱️ Performance")
+
+calls = pd.DataFrame(CALL_LOG.snapshot())
+
+
+def _warmup_summary() -> str:
+    warmup = WARMUP.snapshot()
+    if warmup["duration_s"] is None:
+        return warmup["state"]
+    summary = f"{warmup['state']} ({warmup['duration_s']:.1f} s)"
+    return f"{summary}, {warmup['error']}" if warmup["error"] else summary
+
+
+col1, col2 = st.columns([4, 1])
+with col1:
+    st.caption(
+        f"Last {len(calls)} external calls in this process · "
+        f"Snowflake pool: {snf.pool_stats()} · "
+        f"Chart specs: {SPEC_CACHE.stats()} · "
+        f"Warm-up: {_warmup_summary()}"
+    )
+with col2:
+    if st.button("Clear log"):
+        CALL_LOG.clear()
+        st.rerun()
+
+if calls.empty:
+    st.info("No calls recorded yet.")
+    st.stop()
+
+calls["duration_ms"] = calls["duration_s"] * 1000
+calls["started_at"] = pd.to_datetime(calls["started_at"], unit="s", utc=True).dt.tz_convert(
+    "Europe/Prague"
+)
+
+# ============================================================
+# 1. LATENCY PER LABEL
+# ============================================================
+with st.container(border=True):
+    st.write("Latency per call label (ms)")
+
+    summary = (
+        calls.groupby(["service", "label"])
+        .agg(
+            calls=("duration_ms", "size"),
+            p50=("duration_ms", "median"),
+            p95=("duration_ms", lambda d: percentile(d, 0.95)),
+            max=("duration_ms", "max"),
+            avg_rows=("rows", "mean"),
+            avg_bytes=("bytes", "mean"),
+            errors=("error", "count"),
+        )
+        .reset_index()
+        .sort_values("p95", ascending=False)
+    )
+
+    st.dataframe(
+        summary,
+        column_config={
+            "p50": st.column_config.NumberColumn("p50", format="%.0f"),
+            "p95": st.column_config.NumberColumn("p95", format="%.0f"),
+            "max": st.column_config.NumberColumn("max", format="%.0f"),
+            "avg_rows": st.column_config.NumberColumn("Avg rows", format="%.0f"),
+            "avg_bytes": st.column_config.NumberColumn("Avg bytes", format="%.0f"),
+        },
+        hide_index=True,
+        use_container_width=True,
+    )
+
+# ============================================================
+# 2. SLOWEST RECENT CALLS
+# ============================================================
+with st.container(border=True):
+    st.write("Slowest recent calls")
+
+    st.dataframe(
+        calls.nlargest(25, "duration_ms")[
+            ["started_at", "service", "label", "duration_ms", "rows", "bytes", "query_id", "error"]
+        ],
+        column_config={
+            "started_at": st.column_config.DatetimeColumn("Started", format="DD/MM HH:mm:ss"),
+            "duration_ms": st.column_config.NumberColumn("Duration (ms)", format="%.0f"),
+            "query_id": "Snowflake query ID",
+        },
+        hide_index=True,
+        use_container_width=True,
+    )
+
+# ============================================================
+# 3. SHARED DATASETS
+# ============================================================
+with st.container(border=True):
+    st.write("Datasets loaded in this process and session")
+
+    st.dataframe(
+        pd.DataFrame(DATASETS.info()),
+        column_config={
+            "age_s": st.column_config.NumberColumn("Age (s)", format="%.0f"),
+            "load_ms": st.column_config.NumberColumn("Load (ms)", format="%.1f"),
+        },
+        hide_index=True,
+        use_container_width=True,
+    )
+
+# ============================================================
+# 4. UPLOAD-TRIGGERED RECALCULATIONS
+# ============================================================
+with st.container(border=True):
+    st.write("Upload-triggered recalculations (lag from upload to mart)")
+
+    if not INGEST_ENABLED:
+        st.caption("Upload watcher is off; set BWA_INGEST=1 to turn it on.")
+    else:
+        scheduler = get_ingestion_scheduler()
+        runs = pd.DataFrame(scheduler.history())
+        st.caption(f"{len(scheduler.pending())} uploads waiting for a quiet window")
+        if not runs.empty:
+            runs["files"] = runs["uploads"].str.len()
+            runs["max_lag_s"] = runs["lag_s"].apply(lambda lags: max(lags.values(), default=None))
+            runs["triggered_at"] = pd.to_datetime(runs["triggered_at"], unit="s", utc=True).dt.tz_convert(
+                "Europe/Prague"
+            )
+            st.dataframe(
+                runs[["triggered_at", "job_id", "state", "files", "max_lag_s"]],
+                column_config={
+                    "triggered_at": st.column_config.DatetimeColumn("Triggered", format="DD/MM HH:mm:ss"),
+                    "max_lag_s": st.column_config.NumberColumn("Max lag (s)", format="%.0f"),
+                },
+                hide_index=True,
+                use_container_width=True,
+            )
+
+# ============================================================
+# 5. RETRIES AND CIRCUIT BREAKERS
+# ============================================================
+with st.container(border=True):
+    st.write("Retries and circuit breakers per dependency")
+    st.caption(
+        "Calls retried on transient errors, calls that still failed, times the breaker "
+        "opened and calls rejected while it was open (admin/resilience.py)."
+    )
+
+    st.dataframe(
+        pd.DataFrame(resilience.stats()),
+        column_config={
+            "consecutive_failures": st.column_config.NumberColumn("Failing streak"),
+        },
+        hide_index=True,
+        use_container_width=True,
+    )
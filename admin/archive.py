@@ -0,0 +1,297 @@
+# Standard library
+import hashlib
+import io
+import json
+import os
+import tarfile
+from collections import defaultdict
+from dataclasses import asdict, dataclass, field
+from datetime import date, datetime
+
+# Third-party
+import streamlit as st
+from azure.core.exceptions import ResourceNotFoundError
+from azure.storage.blob import StandardBlobTier
+
+# Local
+from admin import periods
+from admin.metrics import instrument
+from admin.owners import OWNERS, OwnerProfile
+from admin.periods import APP_TZ
+from admin.pipeline import RecalculationLease
+from admin.resilience import guarded
+from admin.tracing import action
+from admin.utils import get_blob_uploader
+
+# Compaction of the processed_files folder. Every upload moves the previous
+# statement there as its own blob, so the prefix grows without bound and the
+# listings under it get slower. Closed months are packed into one
+# `<archive_folder>YYYY-MM.tar.gz` bundle with a `YYYY-MM.manifest.json`
+# next to it; `index.json` maps every original blob name to its bundle so
+# retrieve() can still return the original bytes. Bundles are uploaded to a
+# cooler access tier and deleted after RETENTION_MONTHS (0 keeps them).
+#
+# Each month is written bundle -> manifest -> index before its originals are
+# deleted, so an interrupted run leaves duplicates, never missing files, and
+# the next run picks up where it stopped.
+
+try:
+    # The SDK takes the enum only; a plain string fails on the first upload
+    ARCHIVE_TIER = StandardBlobTier(os.environ.get("BWA_ARCHIVE_TIER", "Cool"))
+except ValueError as e:
+    raise ValueError(f"BWA_ARCHIVE_TIER: {e}; use one of {[t.value for t in StandardBlobTier]}") from None
+RETENTION_MONTHS = int(os.environ.get("BWA_ARCHIVE_RETENTION_MONTHS", "0"))
+INDEX_BLOB = "index.json"
+INDEX_TTL_S = 60
+
+
+@dataclass
+class CompactionReport:
+    owner: str
+    locked: bool = False  # another compaction holds the lease; nothing done
+    bundles: list[str] = field(default_factory=list)
+    files: int = 0
+    bytes_in: int = 0
+    bytes_out: int = 0
+    expired: list[str] = field(default_factory=list)
+    active_files: int = 0  # left in processed_folder (current month)
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class ProcessedArchive:
+    def __init__(self, container_client, processed_folder: str, archive_folder: str):
+        self.container_client = container_client
+        self.processed_folder = processed_folder
+        self.archive_folder = archive_folder
+
+    @classmethod
+    def for_owner(cls, owner: OwnerProfile, container_client) -> "ProcessedArchive":
+        return cls(container_client, owner.processed_folder, owner.archive_folder)
+
+    # -------------------------
+    # Blob helpers
+    # -------------------------
+    def _read(self, name: str) -> bytes:
+        def read():
+            with instrument("blob", "archive_read") as info:
+                data = self.container_client.get_blob_client(name).download_blob().readall()
+                info["bytes"] = len(data)
+            return data
+
+        return guarded("blob", read)
+
+    def _write(self, name: str, data: bytes, **kwargs) -> None:
+        def write():
+            with instrument("blob", "archive_write") as info:
+                info["bytes"] = len(data)
+                self.container_client.upload_blob(name=name, data=data, overwrite=True, **kwargs)
+
+        guarded("blob", write)
+
+    def _delete(self, name: str) -> None:
+        def delete():
+            with instrument("blob", "archive_delete"):
+                self.container_client.delete_blob(name)
+
+        guarded("blob", delete)
+
+    def index(self) -> dict[str, dict]:
+        """Original blob name -> {bundle, member, month, size, sha256}."""
+        try:
+            return json.loads(self._read(self.archive_folder + INDEX_BLOB))
+        except ResourceNotFoundError:
+            return {}
+
+    def _write_index(self, index: dict) -> None:
+        self._write(self.archive_folder + INDEX_BLOB, json.dumps(index, indent=1).encode())
+
+    # -------------------------
+    # Compaction
+    # -------------------------
+    def _bundle(self, month: str, blobs: list, index: dict) -> tuple[bytes, list[dict]]:
+        """tar.gz of `blobs`, merged into the month's existing bundle if there is one."""
+        name = f"{self.archive_folder}{month}.tar.gz"
+        members: dict[str, tuple[tarfile.TarInfo, bytes]] = {}
+        if any(entry["bundle"] == name for entry in index.values()):
+            with tarfile.open(fileobj=io.BytesIO(self._read(name)), mode="r:gz") as tar:
+                for info in tar.getmembers():
+                    members[info.name] = (info, tar.extractfile(info).read())
+
+        files = []
+        for blob in blobs:
+            data = self._read(blob.name)
+            member = blob.name.removeprefix(self.processed_folder)
+            info = tarfile.TarInfo(member)
+            info.size = len(data)
+            info.mtime = blob.last_modified.timestamp()
+            members[member] = (info, data)  # a re-archived file replaces the older copy
+            files.append(
+                {
+                    "name": blob.name,
+                    "member": member,
+                    "size": len(data),
+                    "sha256": _sha256(data),
+                    "last_modified": blob.last_modified.isoformat(),
+                }
+            )
+
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w:gz") as tar:
+            for info, data in members.values():
+                tar.addfile(info, io.BytesIO(data))
+        return buffer.getvalue(), files
+
+    def compact(self, owner: str, on: date | None = None) -> CompactionReport:
+        """Bundle processed files of closed months and apply the retention policy."""
+        report = CompactionReport(owner=owner)
+        lease = RecalculationLease(self.container_client, blob=f"{self.archive_folder}compaction.lock")
+        if not lease.acquire():
+            report.locked = True
+            return report
+
+        try:
+            current = periods.current_month(on).start
+            with instrument("blob", "list_processed") as info:
+                processed = list(
+                    self.container_client.list_blobs(name_starts_with=self.processed_folder)
+                )
+                info["rows"] = len(processed)
+
+            by_month = defaultdict(list)
+            for blob in processed:
+                archived_on = blob.last_modified.astimezone(APP_TZ).date()
+                if archived_on < current:
+                    by_month[archived_on.strftime("%Y-%m")].append(blob)
+                else:
+                    report.active_files += 1
+
+            index = self.index()
+            for month, blobs in sorted(by_month.items()):
+                bundle = f"{self.archive_folder}{month}.tar.gz"
+                payload, files = self._bundle(month, blobs, index)
+                self._write(bundle, payload, standard_blob_tier=ARCHIVE_TIER)
+
+                for entry in files:
+                    index[entry["name"]] = {"bundle": bundle, "month": month, **entry}
+                manifest = {
+                    "bundle": bundle,
+                    "month": month,
+                    "created_at": datetime.now(APP_TZ).isoformat(timespec="seconds"),
+                    "files": sorted(
+                        (e for e in index.values() if e["bundle"] == bundle),
+                        key=lambda e: e["name"],
+                    ),
+                }
+                self._write(
+                    f"{self.archive_folder}{month}.manifest.json",
+                    json.dumps(manifest, indent=1).encode(),
+                )
+                self._write_index(index)
+
+                for blob in blobs:
+                    self._delete(blob.name)
+                report.bundles.append(bundle)
+                report.files += len(blobs)
+                report.bytes_in += sum(blob.size for blob in blobs)
+                report.bytes_out += len(payload)
+
+            report.expired = self._expire(index, current)
+        finally:
+            lease.release()
+        return report
+
+    def _expire(self, index: dict, current: date) -> list[str]:
+        if RETENTION_MONTHS <= 0:
+            return []
+        cutoff = periods.last_n_months(RETENTION_MONTHS, current).start.strftime("%Y-%m")
+        expired = sorted({e["bundle"] for e in index.values() if e["month"] < cutoff})
+        if not expired:
+            return []
+
+        # Index first: a bundle that is still listed must still exist
+        self._write_index({k: e for k, e in index.items() if e["bundle"] not in expired})
+        for bundle in expired:
+            self._delete(bundle)
+            self._delete(bundle.removesuffix(".tar.gz") + ".manifest.json")
+        return expired
+
+    # -------------------------
+    # Retrieval
+    # -------------------------
+    def retrieve(self, name: str) -> bytes:
+        """Original bytes of a compacted processed blob (full blob name or file name)."""
+        index = self.index()
+        entry = index.get(name) or index.get(self.processed_folder + name)
+        if entry is None:
+            raise KeyError(f"{name} is not in the archive index.")
+        with tarfile.open(fileobj=io.BytesIO(self._read(entry["bundle"])), mode="r:gz") as tar:
+            data = tar.extractfile(entry["member"]).read()
+        if _sha256(data) != entry["sha256"]:
+            raise ValueError(f"{name} in {entry['bundle']} does not match its manifest checksum.")
+        return data
+
+
+def get_processed_archive(owner: str) -> ProcessedArchive:
+    return ProcessedArchive.for_owner(OWNERS[owner], get_blob_uploader(owner).container_client)
+
+
+@st.cache_data(ttl=INDEX_TTL_S, show_spinner=False)
+def _cached_index(owner: str) -> dict[str, dict]:
+    return get_processed_archive(owner).index()
+
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def _cached_original(owner: str, name: str, sha256: str) -> bytes:
+    """Keyed on the checksum, so a re-archived file is fetched again."""
+    return get_processed_archive(owner).retrieve(name)
+
+
+def archive_panel(owner: OwnerProfile) -> None:
+    """Compaction button and retrieval of archived statements, behind a toggle."""
+    if not st.toggle("Archive maintenance", key=f"{owner.name}_archive"):
+        return
+
+    archive = get_processed_archive(owner.name)
+    if st.button("Compact processed files", key=f"{owner.name}_archive_compact"):
+        with action("compact archive", owner=owner.name):
+            report = archive.compact(owner.name)
+            _cached_index.clear()
+            if report.locked:
+                st.warning("Another compaction is running.")
+            else:
+                st.success(
+                    f"Bundled {report.files} files into {len(report.bundles)} monthly archives "
+                    f"({report.bytes_in / 1024:.0f} KB -> {report.bytes_out / 1024:.0f} KB); "
+                    f"{report.active_files} files from this month stay in place."
+                )
+                if report.expired:
+                    st.write(f"Removed after {RETENTION_MONTHS} months: {', '.join(report.expired)}")
+
+    index = _cached_index(owner.name)
+    if not index:
+        st.caption("No archived files yet.")
+        return
+    name = st.selectbox(
+        f"Archived files ({len(index)})",
+        sorted(index, key=lambda n: index[n]["last_modified"], reverse=True),
+        format_func=lambda n: f"{index[n]['month']} · {index[n]['member']}",
+        key=f"{owner.name}_archive_file",
+    )
+    # The bundle is downloaded and unpacked only on request, not on every rerun
+    fetched_key = f"{owner.name}_archive_fetched"
+    if st.button("Fetch original", key=f"{owner.name}_archive_fetch"):
+        st.session_state[fetched_key] = name
+    if st.session_state.get(fetched_key) != name:
+        return
+    st.download_button(
+        "Download original",
+        _cached_original(owner.name, name, index[name]["sha256"]),
+        file_name=index[name]["member"].split("/")[-1],
+        key=f"{owner.name}_archive_download",
+    )
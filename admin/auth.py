@@ -0,0 +1,252 @@
+# Standard library
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+# Third-party
+import bcrypt as bc
+import streamlit as st
+import streamlit.components.v1 as components
+import yaml
+
+SECRETS_PATH = "secrets.yaml"
+CREDENTIALS_PATH = "credentials.yaml"
+
+# bcrypt is CPU bound (~250ms per check); keep the pool small so a burst of
+# logins cannot starve the script threads of other sessions.
+PASSWORD_WORKERS = int(os.getenv("AUTH_PASSWORD_WORKERS", "2"))
+PASSWORD_TIMEOUT_S = 10
+
+logger = logging.getLogger(__name__)
+
+
+class LoginBusyError(RuntimeError):
+    """The bcrypt pool did not get to a password check within PASSWORD_TIMEOUT_S."""
+
+
+class UserStore:
+    """
+    secrets.yaml loaded once per process and reloaded only when the file's
+    mtime changes. Users are indexed by username for O(1) lookups.
+    """
+
+    def __init__(self, path: str = SECRETS_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        # (mtime_ns, data, users), replaced in one assignment so a lock-free
+        # reader always sees the data and its index from the same load
+        self._snapshot: tuple[int | None, dict, dict[str, dict]] = (None, {}, {})
+
+    def _refresh(self) -> tuple[int | None, dict, dict[str, dict]]:
+        mtime_ns = os.stat(self.path).st_mtime_ns
+        snapshot = self._snapshot
+        if mtime_ns == snapshot[0]:
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            if mtime_ns == snapshot[0]:
+                return snapshot
+            with open(self.path, "r") as file:
+                data = yaml.safe_load(file) or {}
+            snapshot = (mtime_ns, data, dict(data.get("users") or {}))
+            self._snapshot = snapshot
+            return snapshot
+
+    @property
+    def data(self) -> dict:
+        return self._refresh()[1]
+
+    def get(self, username: str) -> dict | None:
+        return self._refresh()[2].get(username)
+
+
+@st.cache_resource
+def get_user_store() -> UserStore:
+    return UserStore()
+
+
+@st.cache_resource
+def get_credentials_store() -> UserStore:
+    return UserStore(CREDENTIALS_PATH)
+
+
+@st.cache_resource
+def _password_pool() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(
+        max_workers=PASSWORD_WORKERS, thread_name_prefix="bcrypt"
+    )
+
+
+#Password hashing
+
+def hash_password(password):
+    salt = bc.gensalt()  # Generate salt
+    hashed_password = bc.hashpw(password.encode('utf-8'), salt)  # Hash password
+    return hashed_password
+
+
+def check_password(username, entered_password) -> bool:
+    """
+    Verify a password on the bounded bcrypt pool instead of the script thread.
+    Raises LoginBusyError when the pool is too backed up to answer in time.
+    """
+    user = get_user_store().get(username)
+    if user is None or not entered_password:
+        return False
+
+    stored_password_hash = user["password"].encode("utf-8")
+    future = _password_pool().submit(
+        bc.checkpw, entered_password.encode("utf-8"), stored_password_hash
+    )
+    try:
+        return future.result(timeout=PASSWORD_TIMEOUT_S)
+    except FutureTimeoutError:
+        future.cancel()  # still queued: drop it; already running: let it finish
+        raise LoginBusyError("Login is busy, try again.") from None
+
+
+# Role setup
+
+def role_lookup(username):
+    user = get_user_store().get(username)
+    if user is not None:
+        return user["role"]
+    return None
+
+
+# Session cookies
+# Signed "<payload>.<signature>" tokens so a browser refresh restores the role
+# without another bcrypt round. Name and expiry come from the cookie section
+# of credentials.yaml; the signing key only from AUTH_COOKIE_KEY. Without it
+# no cookie is issued or accepted and every session logs in with a password.
+
+COOKIE_KEY_ENV = "AUTH_COOKIE_KEY"
+_warned_no_key = False
+
+
+def _cookie_config() -> dict:
+    global _warned_no_key
+    cookie = get_credentials_store().data.get("cookie") or {}
+    key = os.getenv(COOKIE_KEY_ENV, "").strip()
+    if not key and not _warned_no_key:
+        _warned_no_key = True
+        logger.warning("%s is not set; session cookies are disabled.", COOKIE_KEY_ENV)
+    return {
+        "name": cookie.get("name", "bwa_session"),
+        "key": key,
+        "expiry_days": float(cookie.get("expiry_days", 30)),
+    }
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _sign(payload: str, key: str) -> str:
+    digest = hmac.new(key.encode("utf-8"), payload.encode("ascii"), hashlib.sha256)
+    return _b64encode(digest.digest())
+
+
+def issue_session_token(username: str, role: str) -> str | None:
+    """Signed token for the session cookie; None when no signing key is configured."""
+    config = _cookie_config()
+    if not config["key"]:
+        return None
+    expires = int(time.time() + config["expiry_days"] * 86400)
+    payload = _b64encode(
+        json.dumps({"u": username, "r": role, "exp": expires}).encode("utf-8")
+    )
+    return f"{payload}.{_sign(payload, config['key'])}"
+
+
+def verify_session_token(token: str | None) -> tuple[str, str] | None:
+    """Return (username, role) for a valid, unexpired token whose user still exists."""
+    if not token or "." not in token:
+        return None
+
+    config = _cookie_config()
+    if not config["key"]:
+        return None
+
+    # Cookies are user input: anything malformed (non-ASCII, bad base64 or
+    # JSON) is an invalid token, not an error
+    payload, signature = token.rsplit(".", 1)
+    try:
+        if not hmac.compare_digest(signature, _sign(payload, config["key"])):
+            return None
+        claims = json.loads(_b64decode(payload))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(claims, dict):
+        return None
+    if claims.get("exp", 0) < time.time():
+        return None
+
+    # Users removed or re-roled in secrets.yaml lose their cookie immediately
+    username, role = claims.get("u"), claims.get("r")
+    if role is None or role_lookup(username) != role:
+        return None
+    return username, role
+
+
+def restore_session() -> None:
+    """Restore the role from the session cookie once per browser session."""
+    if st.session_state.get("role") is not None or st.session_state.get("logged_out"):
+        return
+
+    config = _cookie_config()
+    session = verify_session_token(st.context.cookies.get(config["name"]))
+    if session is not None:
+        st.session_state.username, st.session_state.role = session
+
+
+def remember_session(username: str, role: str) -> None:
+    st.session_state.username = username
+    st.session_state.role = role
+    st.session_state.logged_out = False
+    token = issue_session_token(username, role)
+    if token is not None:
+        st.session_state.pending_cookie = token
+
+
+def forget_session() -> None:
+    st.session_state.username = None
+    st.session_state.role = None
+    # st.context.cookies keeps the value sent at connect time, so block restore
+    st.session_state.logged_out = True
+    st.session_state.pending_cookie = ""
+
+
+def sync_session_cookie() -> None:
+    """
+    Write or clear the session cookie in the browser. Called on the run after
+    login/logout because output emitted right before st.rerun() is dropped.
+    """
+    token = st.session_state.pop("pending_cookie", None)
+    if token is None:
+        return
+
+    config = _cookie_config()
+    max_age = int(config["expiry_days"] * 86400) if token else 0
+    components.html(
+        f"""
+        <script>
+        const secure = window.parent.location.protocol === "https:" ? "; Secure" : "";
+        window.parent.document.cookie =
+            {json.dumps(config["name"])} + "=" + {json.dumps(token)} +
+            "; Max-Age={max_age}; Path=/; SameSite=Strict" + secure;
+        </script>
+        """,
+        height=0,
+    )
@@ -0,0 +1,163 @@
+# Standard library
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+# Third-party
+import altair as alt
+import pandas as pd
+import streamlit as st
+
+# Local
+from admin.profiler import phase
+
+# Dashboard charts are rebuilt on every rerun although the data behind them
+# rarely changes. Serialized specs (Vega-Lite dicts for Altair, figures for
+# Plotly) are kept in a process-wide LRU keyed by the chart name, a hash of
+# the plotted frame and the chart parameters. Frames over the point budget
+# are aggregated before plotting so the payload sent to the browser stays
+# small.
+
+CHART_POINT_BUDGET = int(os.getenv("BWA_CHART_POINTS", "5000"))
+CHART_MAX_SERIES = int(os.getenv("BWA_CHART_SERIES", "12"))
+CHART_CACHE_SIZE = 128
+
+# Coarser and coarser buckets tried for a temporal x axis
+TIME_GRAINS = ("W", "M", "Q", "Y")
+
+# The point budget replaces Altair's own 5000-row guard, which raises instead
+# of reducing the data
+alt.data_transformers.disable_max_rows()
+
+
+class SpecCache:
+    def __init__(self, maxsize: int = CHART_CACHE_SIZE):
+        self._specs: OrderedDict[str, object] = OrderedDict()
+        self._lock = threading.Lock()
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_build(self, key: str, build):
+        with self._lock:
+            if key in self._specs:
+                self._specs.move_to_end(key)
+                self.hits += 1
+                return self._specs[key]
+            self.misses += 1
+        # Built outside the lock; two sessions racing on one key both build
+        spec = build()
+        with self._lock:
+            self._specs[key] = spec
+            while len(self._specs) > self.maxsize:
+                self._specs.popitem(last=False)
+        return spec
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"specs": len(self._specs), "hits": self.hits, "misses": self.misses}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._specs.clear()
+            self.hits = self.misses = 0
+
+
+SPEC_CACHE = SpecCache()
+
+
+def frame_hash(df: pd.DataFrame) -> str:
+    """Content hash of a frame: values, column names and dtypes."""
+    digest = hashlib.sha1(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    digest.update(repr(list(zip(df.columns, df.dtypes.astype(str)))).encode())
+    return digest.hexdigest()
+
+
+def _fold_series(df: pd.DataFrame, x: str, y: str, color: str, max_series: int) -> pd.DataFrame:
+    """Keep the largest `max_series - 1` series by total |y| and sum the rest into 'Other'."""
+    totals = df.groupby(color, dropna=False)[y].apply(lambda s: s.abs().sum())
+    keep = totals.nlargest(max_series - 1).index
+    folded = df[color].where(df[color].isin(keep), "Other")
+    return df.assign(**{color: folded}).groupby([x, color], as_index=False, dropna=False)[y].sum()
+
+
+def downsample(
+    df: pd.DataFrame,
+    x: str,
+    y: str,
+    color: str | None = None,
+    budget: int = CHART_POINT_BUDGET,
+    max_series: int = CHART_MAX_SERIES,
+) -> pd.DataFrame:
+    """
+    Reduce `df` to at most `budget` points, summing `y`.
+
+    Too many series are folded into 'Other' first, then a temporal x axis is
+    re-bucketed to weeks, months, quarters or years; anything still over the
+    budget is thinned to every n-th point per series.
+    """
+    if len(df) <= budget:
+        return df
+
+    keys = [x, color] if color else [x]
+    data = df[keys + [y]]
+    if color and data[color].nunique(dropna=False) > max_series:
+        data = _fold_series(data, x, y, color, max_series)
+
+    if pd.api.types.is_datetime64_any_dtype(data[x]):
+        for grain in TIME_GRAINS:
+            if len(data) <= budget:
+                break
+            bucket = data[x].dt.to_period(grain).dt.start_time
+            data = (
+                data.assign(**{x: bucket})
+                .groupby(keys, as_index=False, dropna=False)[y]
+                .sum()
+            )
+
+    if len(data) > budget:
+        step = -(-len(data) // budget)
+        data = data.sort_values(keys)
+        position = data.groupby(color, dropna=False).cumcount() if color else pd.Series(
+            range(len(data)), index=data.index
+        )
+        data = data[position % step == 0]
+
+    return data.reset_index(drop=True)
+
+
+def _key(name: str, data: pd.DataFrame, params: dict) -> str:
+    return f"{name}:{frame_hash(data)}:{json.dumps(params, sort_keys=True, default=str)}"
+
+
+def altair_chart(name: str, data: pd.DataFrame, build, x: str, y: str, color: str | None = None, **params) -> None:
+    """
+    Render an Altair chart from the spec cache.
+
+    `build(data)` returns the alt.Chart for the downsampled frame. `name`
+    identifies the builder, so any value it reads besides the data must be
+    passed in `params` to take part in the cache key.
+    """
+    with phase("charts"):
+        data = downsample(data, x, y, color)
+        key = _key(name, data, {"x": x, "y": y, "color": color, **params})
+        spec = SPEC_CACHE.get_or_build(key, lambda: build(data).to_dict())
+        st.vega_lite_chart(spec, use_container_width=True)
+
+
+def plotly_chart(name: str, data: pd.DataFrame, build, max_points: int = CHART_POINT_BUDGET, **params) -> None:
+    """
+    Render a Plotly figure from the spec cache.
+
+    Only the largest `max_points` rows by |values| are plotted, for charts
+    without an x axis to bucket on (treemaps, pies).
+    """
+    with phase("charts"):
+        values = params.get("values")
+        if values and len(data) > max_points:
+            data = data.loc[data[values].abs().nlargest(max_points).index]
+        key = _key(name, data, {"max_points": max_points, **params})
+        fig = SPEC_CACHE.get_or_build(key, lambda: build(data))
+        st.plotly_chart(fig, use_container_width=True)
@@ -0,0 +1,200 @@
+# Standard library
+import hashlib
+from datetime import datetime
+
+# Third-party
+import numpy as np
+import pandas as pd
+import streamlit as st
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+# Local
+from admin.datasets import DATASETS
+from admin.owners import OwnerProfile
+from admin.periods import APP_TZ
+from admin.queries import CLASSIFIED_SQL, UNCLASSIFIED_SQL
+from admin.tracing import action
+from admin.utils import AzureBlobUploader, SnowflakeClient, UploadError, get_snowflake_client
+
+# Bulk classification of transactions without a hierarchy row. Descriptions
+# are grouped by a normalized form (dates, long reference numbers and masked
+# card numbers removed), and each group gets the L1/L2/L3 of the most similar
+# classified description: TF-IDF over character n-grams, cosine similarity
+# as one sparse matrix product. Accepted groups are written in one
+# write_pandas call and one hierarchy CSV export.
+
+SUGGESTION_MIN_SCORE = 0.6
+SUGGESTION_CHUNK = 2000  # unclassified rows per similarity block
+
+_NOISE = (
+    r"\b\d{1,2}[./-]\d{1,2}(?:[./-]\d{2,4})?\b"  # dates
+    r"|\b\d{5,}\b"  # references, account and card numbers
+    r"|[X*]{4,}\d*"  # masked card numbers
+)
+
+
+def normalize_description(descriptions: pd.Series) -> pd.Series:
+    return (
+        descriptions.fillna("")
+        .str.upper()
+        .str.replace(_NOISE, " ", regex=True)
+        .str.replace(r"[^\w]+", " ", regex=True)
+        .str.strip()
+        .str.replace(r"\s+", " ", regex=True)
+    )
+
+
+def group_unclassified(unclassified: pd.DataFrame) -> pd.DataFrame:
+    """One row per normalized description with its PROD_HIERARCHY_IDs and totals."""
+    return (
+        unclassified.assign(DESCRIPTION=normalize_description(unclassified["PROD_HIERARCHY_ID"]))
+        .groupby("DESCRIPTION", as_index=False)
+        .agg(
+            IDS=("PROD_HIERARCHY_ID", list),
+            TRANSACTIONS=("TRANSACTIONS", "sum"),
+            AMOUNT=("AMOUNT", "sum"),
+        )
+        .sort_values("TRANSACTIONS", ascending=False, ignore_index=True)
+    )
+
+
+def suggest(groups: pd.DataFrame, classified: pd.DataFrame) -> pd.DataFrame:
+    """Add the nearest classified description (MATCH, SCORE) and its L1/L2/L3 to each group."""
+    out = groups.assign(L1=None, L2=None, L3=None, MATCH=None, SCORE=0.0)
+    if groups.empty or classified.empty:
+        return out
+
+    # Most common classification per normalized description
+    labels = (
+        classified.assign(DESCRIPTION=normalize_description(classified["PROD_HIERARCHY_ID"]))
+        .groupby(["DESCRIPTION", "L1", "L2", "L3"], dropna=False)
+        .size()
+        .reset_index(name="N")
+        .sort_values("N", ascending=False)
+        .drop_duplicates("DESCRIPTION", ignore_index=True)
+    )
+
+    vectorizer = TfidfVectorizer(analyzer="char_wb", ngram_range=(3, 4), sublinear_tf=True)
+    vectorizer.fit(pd.concat([labels["DESCRIPTION"], groups["DESCRIPTION"]]))
+    known = vectorizer.transform(labels["DESCRIPTION"]).T.tocsc()
+
+    best = np.zeros(len(groups), dtype=int)
+    score = np.zeros(len(groups))
+    for start in range(0, len(groups), SUGGESTION_CHUNK):
+        block = vectorizer.transform(groups["DESCRIPTION"].iloc[start : start + SUGGESTION_CHUNK])
+        # Rows are L2-normalized, so the dot product is the cosine similarity
+        similarity = (block @ known).toarray()
+        best[start : start + block.shape[0]] = similarity.argmax(axis=1)
+        score[start : start + block.shape[0]] = similarity.max(axis=1)
+
+    # No shared n-gram at all: leave the group without a suggestion
+    match = labels.iloc[best].reset_index(drop=True).where(pd.Series(score > 0))
+    return out.assign(
+        L1=match["L1"], L2=match["L2"], L3=match["L3"], MATCH=match["DESCRIPTION"], SCORE=score
+    )
+
+
+def _load_inputs(owner: str) -> dict[str, pd.DataFrame]:
+    reads = get_snowflake_client().run_batch(
+        {"unclassified": UNCLASSIFIED_SQL, "classified": CLASSIFIED_SQL},
+        {"unclassified": {"owner": owner}, "classified": {"owner": owner}},
+        label="classification inputs",
+    )
+    return {name: result.dataframe() for name, result in reads.items()}
+
+
+def _derive_suggestions(owner: str) -> pd.DataFrame:
+    inputs = DATASETS.get("classification_inputs", owner=owner)
+    return suggest(group_unclassified(inputs["unclassified"]), inputs["classified"])
+
+
+DATASETS.register("classification_inputs", _load_inputs, depends_on=("hierarchy", "mart"))
+DATASETS.register("classification_suggestions", _derive_suggestions)
+
+
+def hierarchy_rows(accepted: pd.DataFrame, owner: str, loaded_at: datetime) -> pd.DataFrame:
+    """HIERARCHY rows for every PROD_HIERARCHY_ID of the accepted groups."""
+    rows = accepted.explode("IDS").rename(columns={"IDS": "PROD_HIERARCHY_ID"})
+    return pd.DataFrame(
+        {
+            "HIERARCHY_HK": [hashlib.md5(i.encode()).hexdigest() for i in rows["PROD_HIERARCHY_ID"]],
+            "PROD_HIERARCHY_ID": rows["PROD_HIERARCHY_ID"].to_numpy(),
+            "L1": rows["L1"].to_numpy(),
+            "L2": rows["L2"].to_numpy(),
+            "L3": rows["L3"].to_numpy(),
+            "OWNER": owner,
+            "LOAD_DATETIME": loaded_at,
+        }
+    )
+
+
+def commit_hierarchy(
+    snf: SnowflakeClient, abl: AzureBlobUploader, accepted: pd.DataFrame, owner: str
+) -> int:
+    """
+    Insert HIERARCHY rows for `accepted` (IDS, L1-L3) and append them to the
+    hierarchy CSV. Raises RuntimeError when the insert fails and UploadError
+    when only the CSV export did.
+    """
+    to_insert = hierarchy_rows(accepted, owner, datetime.now(APP_TZ))
+    success, _, nrows = snf.sf_write_pandas(to_insert, table_name="HIERARCHY")
+    if not success:
+        raise RuntimeError("Failed to insert data.")
+    try:
+        abl.export_hierarchy_csv(to_insert)
+    finally:
+        # The rows are in HIERARCHY even when the CSV export failed
+        DATASETS.invalidate("hierarchy")
+    return nrows
+
+
+def classification_workbench(
+    snf: SnowflakeClient,
+    abl: AzureBlobUploader,
+    owner: OwnerProfile,
+    min_score: float = SUGGESTION_MIN_SCORE,
+) -> None:
+    groups = DATASETS.get("classification_suggestions", owner=owner.name)
+
+    if groups.empty:
+        st.info("Every transaction description has a hierarchy.")
+        return
+
+    st.caption(
+        f"{len(groups)} description groups · "
+        f"{int(groups['IDS'].str.len().sum())} descriptions · "
+        f"{int(groups['TRANSACTIONS'].sum())} transactions"
+    )
+    edited = st.data_editor(
+        groups.drop(columns="IDS").assign(ACCEPT=groups["SCORE"] >= min_score),
+        column_order=["ACCEPT", "DESCRIPTION", "TRANSACTIONS", "AMOUNT", "L1", "L2", "L3", "MATCH", "SCORE"],
+        column_config={
+            "ACCEPT": st.column_config.CheckboxColumn("Accept"),
+            "AMOUNT": st.column_config.NumberColumn("Amount", format="%.2f"),
+            "MATCH": "Suggested from",
+            "SCORE": st.column_config.ProgressColumn("Similarity", min_value=0, max_value=1),
+        },
+        disabled=["DESCRIPTION", "TRANSACTIONS", "AMOUNT", "MATCH", "SCORE"],
+        hide_index=True,
+        use_container_width=True,
+        key=f"{owner.name}_workbench",
+    )
+
+    if st.button("Commit accepted", key=f"{owner.name}_workbench_commit"):
+        with action("commit classification", owner=owner.name):
+            accepted = edited[edited["ACCEPT"] & edited["L1"].notna()].join(groups["IDS"])
+            if accepted.empty:
+                st.warning("Nothing to commit (accept at least one row with L1).")
+                return
+
+            try:
+                nrows = commit_hierarchy(snf, abl, accepted, owner.name)
+            except UploadError as e:
+                st.error(
+                    f"Descriptions were classified in Snowflake, but the hierarchy CSV "
+                    f"was not updated. {e}"
+                )
+            except RuntimeError as e:
+                st.error(str(e))
+            else:
+                st.success(f"Classified {nrows} descriptions; recalculate to update the mart.")
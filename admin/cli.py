@@ -0,0 +1,259 @@
+"""
+Headless entry point for the operations behind the Streamlit buttons.
+
+Every command prints one JSON object on stdout and exits with
+0 (done), 1 (failed) or 3 (another job holds the lease); 2 is a usage error:
+
+    python -m admin upload Peter statements/*.csv --recalc
+    python -m admin recalc
+    python -m admin rules-scd2 rules.csv
+    python -m admin hierarchy Jan hierarchy.csv
+    python -m admin warm
+    python -m admin watch --quiet 60
+    python -m admin export Jan 2025-01-01 2025-12-31 --format parquet -o jan_2025.parquet
+    python -m admin compact --owner Jan
+    python -m admin serve streamlit_app.py --server.port 8000
+"""
+
+# Standard library
+import argparse
+import getpass
+import json
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+# Third-party
+import pandas as pd
+import streamlit.logger
+
+# Local
+from admin.owners import OWNERS
+from admin.tracing import span
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_BUSY = 3
+
+
+def _user() -> str:
+    return f"cli:{getpass.getuser()}"
+
+
+def _files(paths: list[str]) -> list[Path]:
+    files = []
+    for path in map(Path, paths):
+        files += sorted(p for p in path.rglob("*") if p.is_file()) if path.is_dir() else [path]
+    return files
+
+
+# -------------------------
+# Commands
+# -------------------------
+def cmd_upload(args) -> tuple[int, dict]:
+    from admin.utils import UploadError, get_blob_uploader
+
+    abl = get_blob_uploader(args.owner)
+    uploaded, failed = [], {}
+    for path in _files(args.paths):
+        try:
+            with path.open("rb") as file:
+                abl.upload_file(file, path.name)
+        except UploadError as e:
+            failed[str(path)] = str(e)
+        else:
+            uploaded.append(str(path))
+
+    result = {"owner": args.owner, "uploaded": uploaded, "failed": failed}
+    code = EXIT_FAILED if failed else EXIT_OK
+    if args.recalc and uploaded:
+        # One pipeline run for the whole backfill
+        recalc_code, result["recalculation"] = cmd_recalc(args)
+        code = code or recalc_code
+    return code, result
+
+
+def cmd_recalc(args) -> tuple[int, dict]:
+    from admin.pipeline import get_recalculation_runner
+
+    runner = get_recalculation_runner()
+    started, status = runner.start(_user())
+    if not started:
+        return EXIT_BUSY, {"started": False, "status": status}
+    status = runner.wait()
+    return (EXIT_OK if status["state"] == "succeeded" else EXIT_FAILED), {
+        "started": True,
+        "status": status,
+    }
+
+
+def cmd_rules_scd2(args) -> tuple[int, dict]:
+    from admin.pipeline import apply_rules
+    from admin.utils import get_snowflake_client
+
+    rules = pd.read_csv(args.csv, sep=args.delimiter)
+    rules.columns = rules.columns.str.upper()
+    sp_result = apply_rules(get_snowflake_client(), rules)
+    return EXIT_OK, {"rules": len(rules), "result": sp_result}
+
+
+def cmd_hierarchy(args) -> tuple[int, dict]:
+    from admin.classify import commit_hierarchy
+    from admin.utils import get_blob_uploader, get_snowflake_client
+
+    rows = pd.read_csv(args.csv, sep=args.delimiter)
+    rows.columns = rows.columns.str.upper()
+    rows = rows[rows["L1"].notna()]
+    if rows.empty:
+        return EXIT_FAILED, {"owner": args.owner, "error": "no rows with L1"}
+    accepted = rows[["L1", "L2", "L3"]].assign(IDS=rows["PROD_HIERARCHY_ID"].map(lambda i: [i]))
+    nrows = commit_hierarchy(
+        get_snowflake_client(), get_blob_uploader(args.owner), accepted, args.owner
+    )
+    return EXIT_OK, {"owner": args.owner, "inserted": nrows}
+
+
+def cmd_warm(args) -> tuple[int, dict]:
+    # Runs the dashboard statements with the pages' exact text and binds, so
+    # Snowflake's result cache answers them when users arrive
+    from admin.warmup import warm_datasets
+
+    warmed, failed = warm_datasets(args.owner)
+    return (EXIT_FAILED if failed else EXIT_OK), {"warmed": warmed, "failed": failed}
+
+
+def cmd_serve(args) -> tuple[int, dict]:
+    # Warm-up and health endpoints start before Streamlit, in the same
+    # process, so the pool and datasets are the ones the pages use
+    from streamlit.web import cli as streamlit_cli
+
+    from admin import warmup
+
+    warmup.start()
+    sys.argv = ["streamlit", "run", args.script, *args.streamlit_args]
+    try:
+        streamlit_cli.main()
+    except SystemExit as e:
+        return (e.code or EXIT_OK), {"warmup": warmup.WARMUP.snapshot()}
+    return EXIT_OK, {"warmup": warmup.WARMUP.snapshot()}
+
+
+def cmd_watch(args) -> tuple[int, dict]:
+    from admin.ingest import IngestionScheduler
+    from admin.pipeline import get_recalculation_runner
+
+    timing = {"quiet_s": args.quiet, "poll_s": args.poll}
+    scheduler = IngestionScheduler(
+        get_recalculation_runner(),
+        [OWNERS[owner].input_folder for owner in args.owner],
+        ignored={OWNERS[owner].hierarchy_blob for owner in args.owner},
+        **{name: value for name, value in timing.items() if value is not None},
+    )
+    if args.once:
+        scheduler.poll()
+    else:
+        try:
+            scheduler.run_forever()
+        except KeyboardInterrupt:
+            pass
+    return EXIT_OK, {"pending": scheduler.pending(), "runs": scheduler.history()}
+
+
+def cmd_export(args) -> tuple[int, dict]:
+    from admin.export import export_transactions
+    from admin.periods import DateRange
+    from admin.utils import get_snowflake_client
+
+    period = DateRange(args.start, args.end + timedelta(days=1))
+    rows = export_transactions(get_snowflake_client(), args.owner, period, args.format, args.output)
+    return EXIT_OK, {"owner": args.owner, "rows": rows, "path": args.output}
+
+
+def cmd_compact(args) -> tuple[int, dict]:
+    from admin.archive import get_processed_archive
+
+    reports = [get_processed_archive(owner).compact(owner).as_dict() for owner in args.owner]
+    return (EXIT_BUSY if any(r["locked"] for r in reports) else EXIT_OK), {"reports": reports}
+
+
+# -------------------------
+# Entry point
+# -------------------------
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m admin", description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    owners = dict(choices=list(OWNERS), nargs="*", default=list(OWNERS))
+
+    upload = commands.add_parser("upload", help="upload statement files (directories recursively)")
+    upload.add_argument("owner", choices=list(OWNERS))
+    upload.add_argument("paths", nargs="+")
+    upload.add_argument("--recalc", action="store_true", help="recalculate once afterwards")
+    upload.set_defaults(run=cmd_upload)
+
+    commands.add_parser("recalc", help="run the recalculation pipeline and wait").set_defaults(
+        run=cmd_recalc
+    )
+
+    rules = commands.add_parser("rules-scd2", help="replace the rules table and run the SCD2 load")
+    rules.add_argument("csv")
+    rules.add_argument("--delimiter", default=",")
+    rules.set_defaults(run=cmd_rules_scd2)
+
+    hierarchy = commands.add_parser(
+        "hierarchy", help="insert PROD_HIERARCHY_ID,L1,L2,L3 rows and export the hierarchy CSV"
+    )
+    hierarchy.add_argument("owner", choices=list(OWNERS))
+    hierarchy.add_argument("csv")
+    hierarchy.add_argument("--delimiter", default=",")
+    hierarchy.set_defaults(run=cmd_hierarchy)
+
+    warm = commands.add_parser("warm", help="run the dashboard queries ahead of users")
+    warm.add_argument("--owner", **owners)
+    warm.set_defaults(run=cmd_warm)
+
+    watch = commands.add_parser("watch", help="recalculate after bursts of uploads")
+    watch.add_argument("--owner", **owners)
+    watch.add_argument("--quiet", type=float, default=None, help="quiet window in seconds")
+    watch.add_argument("--poll", type=float, default=None, help="poll interval in seconds")
+    watch.add_argument("--once", action="store_true", help="scan once and report what is pending")
+    watch.set_defaults(run=cmd_watch)
+
+    export = commands.add_parser("export", help="stream an owner's transactions to a file")
+    export.add_argument("owner", choices=list(OWNERS))
+    export.add_argument("start", type=date.fromisoformat, help="first day, YYYY-MM-DD")
+    export.add_argument("end", type=date.fromisoformat, help="last day (inclusive)")
+    export.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    export.add_argument("-o", "--output", required=True, help="e.g. jan_2025.csv.gz")
+    export.set_defaults(run=cmd_export)
+
+    serve = commands.add_parser(
+        "serve", help="warm up, serve health endpoints and run the Streamlit app"
+    )
+    serve.add_argument("script", help="e.g. streamlit_app.py")
+    serve.add_argument("streamlit_args", nargs=argparse.REMAINDER, help="passed to streamlit run")
+    serve.set_defaults(run=cmd_serve)
+
+    compact = commands.add_parser("compact", help="bundle processed files of closed months")
+    compact.add_argument("--owner", **owners)
+    compact.set_defaults(run=cmd_compact)
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.command != "serve":
+        # st.cache_resource factories work without a running app; keep its
+        # "missing ScriptRunContext" warnings out of the output. `serve` is
+        # the app itself and keeps Streamlit's normal logging.
+        streamlit.logger.set_log_level("error")
+    try:
+        with span(f"cli {args.command}"):
+            code, result = args.run(args)
+    except Exception as e:
+        code, result = EXIT_FAILED, {"error": f"{type(e).__name__}: {e}"}
+    print(json.dumps({"command": args.command, "exit_code": code, **result}, default=str))
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
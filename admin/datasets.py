@@ -0,0 +1,180 @@
+# Standard library
+import json
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from itertools import count
+
+# Third-party
+import streamlit as st
+
+# Named datasets shared between pages. A dataset is registered once with a
+# loader; pages ask for it by name and parameters (e.g. owner) and get the
+# copy another page already loaded, whether it came from Snowflake or was
+# derived from another dataset. Freshness is tracked per entry:
+#
+# - max_age_s: entries older than this are reloaded;
+# - depends_on: names a dataset is built from. Datasets read inside a loader
+#   are recorded automatically; invalidate("mart") after a recalculation
+#   makes everything built on the mart stale.
+#
+# Process-scoped entries are shared by all sessions; session-scoped ones live
+# in st.session_state and are checked against the same versions.
+
+_versions = count(1)
+_loading: ContextVar[list | None] = ContextVar("dataset_loading", default=None)
+
+
+@dataclass
+class DatasetSpec:
+    name: str
+    loader: object
+    depends_on: tuple[str, ...] = ()
+    max_age_s: float | None = None
+    scope: str = "process"
+
+
+@dataclass
+class DatasetEntry:
+    name: str
+    key: str
+    value: object
+    version: int
+    loaded_at: float
+    load_s: float
+    generations: dict[str, int]
+    parents: dict[tuple[str, str], int] = field(default_factory=dict)
+    hits: int = 0
+
+
+class DatasetStore:
+    def __init__(self):
+        self._specs: dict[str, DatasetSpec] = {}
+        self._entries: dict[tuple[str, str], DatasetEntry] = {}
+        self._generations: dict[str, int] = {}
+        self._lock = threading.RLock()
+        self._key_locks: dict[tuple[str, str], threading.Lock] = {}
+
+    def register(
+        self,
+        name: str,
+        loader,
+        depends_on: tuple[str, ...] = (),
+        max_age_s: float | None = None,
+        scope: str = "process",
+    ) -> None:
+        """`loader(**params)` builds the dataset; it may read other datasets with get()."""
+        if scope not in ("process", "session"):
+            raise ValueError(f"Unknown dataset scope: {scope}")
+        self._specs[name] = DatasetSpec(name, loader, tuple(depends_on), max_age_s, scope)
+
+    # -------------------------
+    # Lookup
+    # -------------------------
+    @staticmethod
+    def _key(params: dict) -> str:
+        return json.dumps(params, sort_keys=True, default=str)
+
+    def _entries_for(self, spec: DatasetSpec) -> dict:
+        if spec.scope == "session":
+            return st.session_state.setdefault("datasets", {})
+        return self._entries
+
+    def _is_fresh(self, entry: DatasetEntry | None) -> bool:
+        if entry is None:
+            return False
+        spec = self._specs[entry.name]
+        if spec.max_age_s is not None and time.time() - entry.loaded_at > spec.max_age_s:
+            return False
+        if any(self._generations.get(n, 0) != g for n, g in entry.generations.items()):
+            return False
+        for (name, key), version in entry.parents.items():
+            parent = self._entries_for(self._specs[name]).get((name, key))
+            if parent is None or parent.version != version or not self._is_fresh(parent):
+                return False
+        return True
+
+    def get(self, name: str, **params):
+        spec = self._specs[name]
+        key = self._key(params)
+        entries = self._entries_for(spec)
+
+        with self._lock:
+            entry = entries.get((name, key))
+            fresh = self._is_fresh(entry)
+            key_lock = self._key_locks.setdefault((name, key), threading.Lock())
+
+        if not fresh:
+            # One load per dataset at a time; later callers reuse its result
+            with key_lock:
+                with self._lock:
+                    entry = entries.get((name, key))
+                    fresh = self._is_fresh(entry)
+                if not fresh:
+                    entry = self._load(spec, key, params, entries)
+
+        # Record the read for the dataset being loaded (if any) as a dependency
+        loading = _loading.get()
+        if loading is not None:
+            loading.append(((name, key), entry.version))
+        entry.hits += fresh
+        return entry.value
+
+    def _load(self, spec: DatasetSpec, key: str, params: dict, entries: dict) -> DatasetEntry:
+        generations = {n: self._generations.get(n, 0) for n in (spec.name, *spec.depends_on)}
+        reads: list = []
+        token = _loading.set(reads)
+        start = time.perf_counter()
+        try:
+            value = spec.loader(**params)
+        finally:
+            _loading.reset(token)
+        entry = DatasetEntry(
+            name=spec.name,
+            key=key,
+            value=value,
+            version=next(_versions),
+            loaded_at=time.time(),
+            load_s=time.perf_counter() - start,
+            generations=generations,
+            parents=dict(reads),
+        )
+        with self._lock:
+            entries[(spec.name, key)] = entry
+        return entry
+
+    # -------------------------
+    # Invalidation + inspection
+    # -------------------------
+    def invalidate(self, name: str) -> None:
+        """Mark `name` (a dataset or any depends_on name) and everything built on it stale."""
+        with self._lock:
+            self._generations[name] = self._generations.get(name, 0) + 1
+            stale = [k for k, e in self._entries.items() if not self._is_fresh(e)]
+            for k in stale:
+                del self._entries[k]
+
+    def info(self) -> list[dict]:
+        """Freshness metadata of the process-scoped entries and this session's."""
+        with self._lock:
+            entries = list(self._entries.values())
+        entries += list(st.session_state.get("datasets", {}).values())
+        now = time.time()
+        return [
+            {
+                "dataset": e.name,
+                "params": e.key,
+                "scope": self._specs[e.name].scope,
+                "age_s": now - e.loaded_at,
+                "load_ms": e.load_s * 1000,
+                "rows": len(e.value) if hasattr(e.value, "__len__") else None,
+                "hits": e.hits,
+                "depends_on": sorted({n for n, _ in e.parents} | set(self._specs[e.name].depends_on)),
+                "fresh": self._is_fresh(e),
+            }
+            for e in entries
+        ]
+
+
+DATASETS = DatasetStore()
@@ -0,0 +1,167 @@
+# Standard library
+import gzip
+import os
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+
+# Third-party
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import streamlit as st
+
+# Local
+from admin import periods
+from admin.owners import OwnerProfile, owners_for_role
+from admin.periods import DateRange
+from admin.queries import EXPORT_COUNT_SQL, EXPORT_SQL
+from admin.tracing import action
+from admin.utils import SnowflakeClient, get_snowflake_client
+
+# Transaction export of an owner and period. Result batches are streamed
+# from Snowflake straight into a gzip CSV or a Parquet file on disk, one
+# batch at a time, so memory stays at about one batch whatever the history
+# size. The finished file is served with st.download_button.
+
+EXPORT_FORMATS = {"csv": ".csv.gz", "parquet": ".parquet"}
+EXPORT_DIR = Path(tempfile.gettempdir()) / "bwa-exports"
+EXPORT_TTL_S = 3600  # finished files older than this are removed on the next export
+
+# Fixed so every batch (and an empty result) is written with the same types;
+# a batch where L3 is all NULL would otherwise infer a null column
+EXPORT_SCHEMA = pa.schema(
+    [
+        ("TRANSACTION_HK", pa.string()),
+        ("TRANSACTION_DATE", pa.date32()),
+        ("REPORTING_DATE", pa.date32()),
+        ("DESCRIPTION", pa.string()),
+        ("L1", pa.string()),
+        ("L2", pa.string()),
+        ("L3", pa.string()),
+        ("AMOUNT", pa.float64()),
+        ("SOURCE_SYSTEM", pa.string()),
+        ("OWNER", pa.string()),
+    ]
+)
+
+
+def _to_arrow(batch: pd.DataFrame) -> pa.Table:
+    return pa.Table.from_pandas(batch, preserve_index=False).select(EXPORT_SCHEMA.names).cast(
+        EXPORT_SCHEMA
+    )
+
+
+def write_export(batches, path: str | os.PathLike, fmt: str, on_batch=None) -> int:
+    """Write DataFrame batches to `path` as gzip CSV or Parquet; returns rows written."""
+    rows = 0
+    if fmt == "csv":
+        with gzip.open(path, "wt", newline="", encoding="utf-8") as f:
+            f.write(",".join(EXPORT_SCHEMA.names) + "\n")
+            for batch in batches:
+                batch[EXPORT_SCHEMA.names].to_csv(f, header=False, index=False)
+                rows += len(batch)
+                if on_batch is not None:
+                    on_batch(rows)
+    elif fmt == "parquet":
+        with pq.ParquetWriter(path, EXPORT_SCHEMA, compression="zstd") as writer:
+            for batch in batches:
+                writer.write_table(_to_arrow(batch))
+                rows += len(batch)
+                if on_batch is not None:
+                    on_batch(rows)
+    else:
+        raise ValueError(f"Unknown export format: {fmt}")
+    return rows
+
+
+def export_transactions(
+    snf: SnowflakeClient,
+    owner: str,
+    period: DateRange,
+    fmt: str,
+    path: str | os.PathLike,
+    on_batch=None,
+) -> int:
+    params = {"owner": owner, **period.params()}
+    batches = snf.iter_batches(EXPORT_SQL, params, label="export")
+    try:
+        return write_export(batches, path, fmt, on_batch)
+    finally:
+        batches.close()  # returns the connection if writing failed midway
+
+
+def _purge_old_exports() -> None:
+    EXPORT_DIR.mkdir(parents=True, exist_ok=True)
+    for path in EXPORT_DIR.iterdir():
+        if time.time() - path.stat().st_mtime > EXPORT_TTL_S:
+            path.unlink(missing_ok=True)
+
+
+def export_panel(default_owner: OwnerProfile) -> None:
+    """Owner/period/format form that builds an export file and offers it for download."""
+    if not st.toggle("Export transactions", key="export_toggle"):
+        return
+
+    owners = [p.name for p in owners_for_role(st.session_state.get("role"))]
+    col1, col2, col3 = st.columns(3)
+    owner = col1.selectbox(
+        "Owner", owners, index=owners.index(default_owner.name), key="export_owner"
+    )
+    ytd = periods.year_to_date()
+    picked = col2.date_input(
+        "Period", value=(ytd.start, periods.today()), key="export_period"
+    )
+    fmt = col3.radio(
+        "Format", list(EXPORT_FORMATS), format_func=str.upper, horizontal=True, key="export_format"
+    )
+    if len(picked) != 2:
+        st.caption("Pick a start and an end date.")
+        return
+    period = DateRange(picked[0], picked[1] + timedelta(days=1))  # end date is inclusive
+
+    snf = get_snowflake_client()
+    if st.button("Build export", key="export_build"):
+        with action("export", owner=owner, format=fmt):
+            _purge_old_exports()
+            previous = st.session_state.pop("export_file", None)
+            if previous is not None:
+                Path(previous["path"]).unlink(missing_ok=True)
+
+            total = snf.run_query(EXPORT_COUNT_SQL, {"owner": owner, **period.params()})[0][0]
+            progress = st.progress(0.0, text=f"Exporting {total:,} transactions...")
+            name = f"{owner.lower()}_{picked[0]:%Y%m%d}_{picked[1]:%Y%m%d}{EXPORT_FORMATS[fmt]}"
+            fd, path = tempfile.mkstemp(suffix=EXPORT_FORMATS[fmt], dir=EXPORT_DIR)
+            os.close(fd)
+            try:
+                rows = export_transactions(
+                    snf,
+                    owner,
+                    period,
+                    fmt,
+                    path,
+                    on_batch=lambda rows: progress.progress(
+                        min(rows / total, 1.0) if total else 1.0, text=f"{rows:,} / {total:,} rows"
+                    ),
+                )
+            except Exception as e:
+                Path(path).unlink(missing_ok=True)
+                progress.empty()
+                st.error(f"Export failed: {e}")
+                return
+            progress.empty()
+            st.session_state["export_file"] = {"path": path, "name": name, "rows": rows}
+
+    export = st.session_state.get("export_file")
+    if export is not None and Path(export["path"]).exists():
+        size = Path(export["path"]).stat().st_size
+        st.caption(f"{export['name']} · {export['rows']:,} rows · {size / 1024:,.0f} KB")
+        with open(export["path"], "rb") as f:
+            st.download_button(
+                "Download export",
+                f,
+                file_name=export["name"],
+                mime="application/gzip" if export["name"].endswith(".gz") else "application/octet-stream",
+                key="export_download",
+            )
@@ -0,0 +1,460 @@
+"""
+Offline stand-ins for Snowflake, Blob Storage and Key Vault.
+
+- FakeSnowflakeConnection: connection/cursor-compatible wrapper around an
+  in-memory DuckDB database exposing BUDGET.MART.BUDGET, CORE.RULES_TABLE,
+  CORE.HIERARCHY and CORE.TRANSACTION seeded with synthetic data.
+- LocalContainerClient: the subset of azure ContainerClient used by
+  AzureBlobUploader, backed by a local folder.
+- FakeKeyVaultClient: fixed secrets.
+
+DuckDB is a development dependency only (requirements-dev.txt).
+"""
+
+# Standard library
+import datetime as dt
+import decimal
+import hashlib
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from pathlib import Path
+
+# Third-party
+import numpy as np
+import pandas as pd
+from azure.core.exceptions import ResourceExistsError, ResourceNotFoundError
+from azure.storage.blob import StandardBlobTier
+
+# Local
+from admin.owners import OWNERS
+from admin.queries import REFRESH_MONTHLY_AGGREGATE_SQL
+from admin.utils import AzureBlobUploader, SnowflakeClient
+
+try:
+    import duckdb
+except ImportError:  # pragma: no cover - only needed for offline runs
+    duckdb = None
+
+
+# -------------------------
+# Key Vault
+# -------------------------
+class FakeKeyVaultClient:
+    def __init__(self, secrets: dict | None = None):
+        self.secrets = secrets or {}
+
+    def get_secret(self, secret_name: str) -> str:
+        return self.secrets.get(secret_name, f"fake-{secret_name}")
+
+    def credential(self):
+        return None
+
+
+# -------------------------
+# Snowflake
+# -------------------------
+def _quote(value) -> str:
+    """Client-side literal rendering, as the connector does for pyformat."""
+    if isinstance(value, (list, tuple)):
+        return ",".join(_quote(v) for v in value)
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return "NULL"
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, (int, float, decimal.Decimal, np.integer, np.floating)):
+        return str(value)
+    if isinstance(value, (dt.datetime, dt.date, pd.Timestamp)):
+        return f"'{value.isoformat()}'"
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def bind_pyformat(sql: str, params) -> str:
+    if not params:
+        return sql
+    if isinstance(params, dict):
+        return re.sub(r"%\((\w+)\)s", lambda m: _quote(params[m.group(1)]), sql)
+    values = iter(params)
+    return re.sub(r"%s", lambda m: _quote(next(values)), sql)
+
+
+FAKE_BATCH_ROWS = 10_000
+
+
+def _split_statements(text: str) -> list[str]:
+    """Split on semicolons outside string literals."""
+    parts = re.split(r";(?=(?:[^']*'[^']*')*[^']*$)", text)
+    return [p for p in parts if p.strip()]
+
+
+class FakeSnowflakeCursor:
+    def __init__(self, conn: "FakeSnowflakeConnection"):
+        self.conn = conn
+        self.description = None
+        self.sfqid = None
+        self._rows: list[tuple] = []
+        self._pending: list = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def execute(self, sql: str, params=None, num_statements: int | None = None, **kwargs):
+        text = bind_pyformat(sql, params)
+        if params:
+            text = text.replace("%%", "%")
+        statements = [text] if not num_statements else _split_statements(text)
+        if num_statements and len(statements) != num_statements:
+            raise ValueError(
+                f"Actual statement count {len(statements)} did not match "
+                f"the desired statement count {num_statements}."
+            )
+        # Statements run eagerly; like Snowflake, the batch stops at the first error
+        self._pending = []
+        for statement in statements:
+            try:
+                self._pending.append(self._run(statement))
+            except Exception as e:
+                self._pending.append(e)
+                break
+        self._advance()
+        return self
+
+    def _run(self, statement: str) -> tuple[str, list, list[tuple]]:
+        statement = statement.strip().rstrip(";")
+        sfqid = str(uuid.uuid4())
+        if statement.upper().startswith("CALL "):
+            # Stored procedures are no-ops; the call is recorded for inspection
+            self.conn.calls.append(statement)
+            return sfqid, [("STATUS",)], [(
+                {"status": "SUCCESS", "rows_closed": 0, "rows_inserted": 0,
+                 "started_at": "", "finished_at": ""},
+            )]
+        result = self.conn.db.execute(statement)
+        description = result.description
+        return sfqid, description, result.fetchall() if description else []
+
+    def _advance(self) -> bool:
+        if not self._pending:
+            return False
+        current = self._pending.pop(0)
+        if isinstance(current, Exception):
+            raise current
+        self.sfqid, self.description, self._rows = current
+        return True
+
+    def nextset(self):
+        return self if self._advance() else None
+
+    def fetchall(self) -> list[tuple]:
+        rows, self._rows = self._rows, []
+        return rows
+
+    def fetch_pandas_batches(self, **kwargs):
+        """The result in FAKE_BATCH_ROWS chunks, like the connector's result batches."""
+        rows, self._rows = self._rows, []
+        columns = [c[0] for c in self.description or ()]
+        for start in range(0, len(rows), FAKE_BATCH_ROWS):
+            yield pd.DataFrame.from_records(rows[start : start + FAKE_BATCH_ROWS], columns=columns)
+
+    def close(self) -> None:
+        pass
+
+
+class FakeSnowflakeConnection:
+    def __init__(self, db):
+        self.db = db.cursor()  # one DuckDB cursor per connection, like a session
+        self.calls: list[str] = []
+        self._closed = False
+
+    def cursor(self) -> FakeSnowflakeCursor:
+        return FakeSnowflakeCursor(self)
+
+    def is_closed(self) -> bool:
+        return self._closed
+
+    def close(self) -> None:
+        self._closed = True
+
+
+def synthetic_mart(n_transactions: int, seed: int = 42) -> pd.DataFrame:
+    """Random mart rows spread over the last three years for every configured owner."""
+    rng = np.random.default_rng(seed)
+    owners = list(OWNERS)
+    categories = ["Food", "Housing", "Transport", "Travel", "Health", "Leisure"]
+    subcategories = ["Groceries", "Restaurants", "Rent", "Energy", "Fuel", "Other"]
+
+    today = np.datetime64(dt.date.today(), "D")
+    dates = today - rng.integers(0, 3 * 365, n_transactions).astype("timedelta64[D]")
+    owner = np.array(owners)[rng.integers(0, len(owners), n_transactions)]
+    income = pd.Series(owner).map({o: OWNERS[o].income_category for o in owners}).to_numpy()
+
+    kind = rng.random(n_transactions)
+    l1 = np.where(
+        kind < 0.05,
+        income,
+        np.where(
+            kind < 0.10,
+            None,
+            np.array(categories, dtype=object)[rng.integers(0, len(categories), n_transactions)],
+        ),
+    )
+    amount = np.where(
+        kind < 0.05,
+        rng.integers(20_000, 60_000, n_transactions),
+        -rng.gamma(2.0, 400.0, n_transactions),
+    ).round(2)
+    merchant = rng.integers(0, 2_000, n_transactions)
+
+    df = pd.DataFrame(
+        {
+            "TRANSACTION_HK": [hashlib.md5(str(i).encode()).hexdigest() for i in range(n_transactions)],
+            "TRANSACTION_DATE": dates,
+            "DESCRIPTION": pd.Series(merchant).map(lambda m: f"CARD PAYMENT MERCHANT {m:04d}"),
+            "L1": l1,
+            "L2": np.where(
+                pd.isna(l1),
+                None,
+                np.array(subcategories, dtype=object)[rng.integers(0, len(subcategories), n_transactions)],
+            ),
+            "L3": None,
+            "AMOUNT": amount,
+            "SOURCE_SYSTEM": np.array(["CSOB", "REVOLUT"])[rng.integers(0, 2, n_transactions)],
+            "OWNER": owner,
+        }
+    )
+    df["TRANSACTION_DATE"] = pd.to_datetime(df["TRANSACTION_DATE"]).dt.date
+    df["REPORTING_DATE"] = pd.to_datetime(df["TRANSACTION_DATE"]).dt.to_period("M").dt.start_time.dt.date
+    return df
+
+
+def seed_database(n_transactions: int, seed: int = 42):
+    """In-memory DuckDB with the BUDGET database layout used by the app."""
+    if duckdb is None:
+        raise ImportError("duckdb is required for offline runs: pip install -r requirements-dev.txt")
+
+    db = duckdb.connect()
+    db.execute("ATTACH ':memory:' AS BUDGET")
+    for schema in ("RAW", "CORE", "MART"):
+        db.execute(f"CREATE SCHEMA BUDGET.{schema}")
+
+    mart = synthetic_mart(n_transactions, seed)
+    db.register("mart_df", mart)
+    db.execute(
+        """
+        CREATE TABLE BUDGET.MART.BUDGET AS
+        SELECT
+            TRANSACTION_HK, TRANSACTION_DATE, REPORTING_DATE, DESCRIPTION,
+            L1, L2, L3::VARCHAR AS L3, AMOUNT::DECIMAL(12, 2) AS AMOUNT,
+            SOURCE_SYSTEM, OWNER
+        FROM mart_df
+        """
+    )
+    db.execute(
+        """
+        CREATE TABLE BUDGET.CORE.TRANSACTION AS
+        SELECT TRANSACTION_HK, TRANSACTION_DATE, DESCRIPTION AS PROD_HIERARCHY,
+               DESCRIPTION, AMOUNT, SOURCE_SYSTEM, OWNER
+        FROM BUDGET.MART.BUDGET
+        """
+    )
+    db.execute(
+        """
+        CREATE TABLE BUDGET.CORE.HIERARCHY AS
+        SELECT DISTINCT
+            MD5(DESCRIPTION) AS HIERARCHY_HK,
+            DESCRIPTION AS PROD_HIERARCHY_ID,
+            L1, L2, L3, OWNER,
+            NOW()::TIMESTAMP AS LOAD_DATETIME
+        FROM BUDGET.MART.BUDGET
+        WHERE L1 IS NOT NULL
+        """
+    )
+    db.execute(
+        """
+        CREATE TABLE BUDGET.CORE.RULES_TABLE AS
+        SELECT
+            ROW_NUMBER() OVER (ORDER BY L1, L2) AS RULE_ID,
+            'CONTAINS' AS MATCH_TYPE,
+            'MERCHANT ' || L1 AS PATTERN,
+            L1, L2, NULL::VARCHAR AS L3,
+            1 AS PRIORITY,
+            TRUE AS IS_CURRENT
+        FROM (SELECT DISTINCT L1, L2 FROM BUDGET.MART.BUDGET WHERE L1 IS NOT NULL)
+        """
+    )
+    db.execute(REFRESH_MONTHLY_AGGREGATE_SQL)
+    db.unregister("mart_df")
+    return db
+
+
+def fake_snowflake_client(n_transactions: int = 1_000, db=None, **kwargs) -> SnowflakeClient:
+    db = db if db is not None else seed_database(n_transactions)
+    return SnowflakeClient(
+        kv_client=FakeKeyVaultClient(),
+        connection_factory=lambda: FakeSnowflakeConnection(db),
+        **kwargs,
+    )
+
+
+# -------------------------
+# Blob Storage
+# -------------------------
+class LocalBlob:
+    def __init__(self, name: str, path: Path):
+        stat = path.stat()
+        self.name = name
+        self.size = stat.st_size
+        self.last_modified = dt.datetime.fromtimestamp(stat.st_mtime, dt.timezone.utc)
+        self.etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+class LocalDownload:
+    def __init__(self, data: bytes):
+        self._data = data
+
+    def readall(self) -> bytes:
+        return self._data
+
+    def content_as_text(self, encoding: str = "utf-8") -> str:
+        return self._data.decode(encoding)
+
+
+class LocalBlobClient:
+    def __init__(self, container: "LocalContainerClient", name: str):
+        self.container = container
+        self.blob_name = name
+        self.path = container.root / name
+        self.url = self.path.as_uri()
+
+    def upload_blob(self, data, overwrite: bool = False, **kwargs) -> None:
+        self.container.upload_blob(self.blob_name, data, overwrite=overwrite)
+
+    def download_blob(self, **kwargs) -> LocalDownload:
+        if not self.path.exists():
+            raise ResourceNotFoundError(f"The specified blob does not exist: {self.blob_name}")
+        return LocalDownload(self.path.read_bytes())
+
+    def start_copy_from_url(self, source_url: str, **kwargs) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(Path(source_url.removeprefix("file://")), self.path)
+
+    def get_blob_properties(self) -> LocalBlob:
+        return LocalBlob(self.blob_name, self.path)
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def delete_blob(self, **kwargs) -> None:
+        self.container.delete_blob(self.blob_name)
+
+    def acquire_lease(self, lease_duration: int = -1, lease_id: str | None = None, **kwargs):
+        if not self.path.exists():
+            raise ResourceNotFoundError(f"The specified blob does not exist: {self.blob_name}")
+        lease = LocalBlobLease(self, lease_id)
+        lease.acquire(lease_duration)
+        return lease
+
+
+class LocalBlobLease:
+    """
+    Lease kept in a sidecar '<blob>.lease' file holding the lease id and
+    expiry, so separate processes sharing the folder see the same lease.
+    """
+
+    _lock = threading.Lock()
+
+    def __init__(self, blob: LocalBlobClient, lease_id: str | None = None):
+        self.path = blob.path.with_name(blob.path.name + ".lease")
+        self.id = lease_id or str(uuid.uuid4())
+        self.duration = -1
+
+    def _holder(self) -> str | None:
+        try:
+            lease_id, expires = self.path.read_text().split()
+        except (FileNotFoundError, ValueError):
+            return None
+        return lease_id if float(expires) < 0 or float(expires) > time.time() else None
+
+    def _write(self) -> None:
+        expires = -1 if self.duration < 0 else time.time() + self.duration
+        self.path.write_text(f"{self.id} {expires}")
+
+    def acquire(self, lease_duration: int = -1) -> None:
+        with self._lock:
+            if self._holder() not in (None, self.id):
+                raise ResourceExistsError("There is already a lease present.")
+            self.duration = lease_duration
+            self._write()
+
+    def renew(self, **kwargs) -> None:
+        with self._lock:
+            if self._holder() not in (None, self.id):
+                raise ResourceExistsError("The lease ID specified did not match.")
+            self._write()
+
+    def release(self, **kwargs) -> None:
+        with self._lock:
+            if self._holder() == self.id:
+                self.path.unlink()
+
+
+class LocalContainerClient:
+    """Folder-backed stand-in for azure.storage.blob.ContainerClient."""
+
+    def __init__(self, root: str | os.PathLike):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.tiers: dict[str, StandardBlobTier | None] = {}  # access tier of each upload
+
+    def list_blobs(self, name_starts_with: str | None = None, **kwargs):
+        for path in sorted(self.root.rglob("*")):
+            if not path.is_file() or path.suffix == ".lease":
+                continue
+            name = path.relative_to(self.root).as_posix()
+            if name_starts_with is None or name.startswith(name_starts_with):
+                yield LocalBlob(name, path)
+
+    def upload_blob(
+        self,
+        name: str,
+        data,
+        overwrite: bool = False,
+        standard_blob_tier: StandardBlobTier | None = None,
+        **kwargs,
+    ) -> LocalBlobClient:
+        if standard_blob_tier is not None and not isinstance(standard_blob_tier, StandardBlobTier):
+            # The SDK reads `.value` and fails on a plain string
+            raise TypeError(f"standard_blob_tier must be a StandardBlobTier, not {standard_blob_tier!r}")
+        path = self.root / name
+        if path.exists() and not overwrite:
+            raise ResourceExistsError(f"The specified blob already exists: {name}")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if hasattr(data, "read"):
+            data = data.read()
+        path.write_bytes(data.encode("utf-8") if isinstance(data, str) else data)
+        self.tiers[name] = standard_blob_tier
+        return LocalBlobClient(self, name)
+
+    def get_blob_client(self, blob: str) -> LocalBlobClient:
+        return LocalBlobClient(self, blob)
+
+    def delete_blob(self, blob: str, **kwargs) -> None:
+        (self.root / blob).unlink()
+
+
+def fake_blob_uploader(root: str | os.PathLike, owner: str = "Peter") -> AzureBlobUploader:
+    profile = OWNERS[owner]
+    return AzureBlobUploader(
+        kv_client=FakeKeyVaultClient(),
+        input_folder=profile.input_folder,
+        processed_folder=profile.processed_folder,
+        archive_keywords=profile.archive_keywords,
+        hierarchy_blob=profile.hierarchy_blob,
+        container_client=LocalContainerClient(root),
+    )
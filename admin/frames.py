@@ -0,0 +1,56 @@
+# Third-party
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# Compact, Arrow-backed DataFrames for query results that are only displayed
+# or passed along. Instead of Python objects per cell:
+#
+# - low-cardinality text (L1/L2/L3, OWNER, SOURCE_SYSTEM) is dictionary
+#   encoded and arrives as a pandas categorical;
+# - other text stays an Arrow string column;
+# - NUMBER(p, s) becomes float64 (s > 0) or the smallest fitting integer;
+# - DATE stays an Arrow date32 column rather than datetime.date objects.
+#
+# st.dataframe converts to Arrow for the browser; these columns go across
+# without a per-cell conversion.
+
+CATEGORY_MAX_RATIO = 0.5  # distinct values / rows at or below which text is dictionary encoded
+
+_ARROW_DTYPES = {
+    pa.string(): pd.ArrowDtype(pa.string()),
+    pa.large_string(): pd.ArrowDtype(pa.large_string()),
+    pa.date32(): pd.ArrowDtype(pa.date32()),
+}
+
+
+def _compact_column(column: pa.ChunkedArray) -> pa.ChunkedArray:
+    kind = column.type
+    if pa.types.is_decimal(kind):
+        return column.cast(pa.int64() if kind.scale == 0 else pa.float64())
+    if pa.types.is_string(kind) or pa.types.is_large_string(kind):
+        if len(column) and pc.count_distinct(column).as_py() <= CATEGORY_MAX_RATIO * len(column):
+            return column.dictionary_encode()
+    return column
+
+
+def compact_table(table: pa.Table) -> pd.DataFrame:
+    """Arrow table (e.g. cursor.fetch_arrow_all()) to a memory-optimized DataFrame."""
+    table = pa.table(
+        [_compact_column(c) for c in table.columns], names=table.column_names
+    )
+    df = table.to_pandas(types_mapper=_ARROW_DTYPES.get, self_destruct=True)
+    for name in df.columns:
+        if pd.api.types.is_integer_dtype(df[name]) and not isinstance(df[name].dtype, pd.ArrowDtype):
+            df[name] = pd.to_numeric(df[name], downcast="integer")
+    return df
+
+
+def compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Same as compact_table() for a frame built from Python rows."""
+    return compact_table(pa.Table.from_pandas(df, preserve_index=False))
+
+
+def frame_memory(df: pd.DataFrame) -> int:
+    """Bytes held by the frame, including string payloads."""
+    return int(df.memory_usage(deep=True).sum())
@@ -0,0 +1,184 @@
+# Third-party
+import pandas as pd
+import streamlit as st
+
+# Local
+from admin.frames import frame_memory
+from admin.tracing import in_current_span
+from admin.utils import SnowflakeClient, get_background_executor
+
+# Keyset (seek) pagination over the mart: pages are addressed by the last
+# (TRANSACTION_DATE, TRANSACTION_HK) seen instead of an OFFSET, so every page
+# costs the same no matter how deep into the history the user scrolls.
+
+KEY_COLUMNS = ("TRANSACTION_DATE", "TRANSACTION_HK")
+
+MART_COLUMNS = (
+    "TRANSACTION_DATE",
+    "REPORTING_DATE",
+    "DESCRIPTION",
+    "L1",
+    "L2",
+    "L3",
+    "AMOUNT",
+    "SOURCE_SYSTEM",
+    "OWNER",
+    "TRANSACTION_HK",
+)
+
+FILTER_OPERATORS = ("=", "<>", ">=", "<", "IS NULL", "IS NOT NULL", "ILIKE", "IN", "NOT IN")
+
+
+class KeysetPager:
+    """Builds and runs one page query with filters, ordering and projection pushed down."""
+
+    def __init__(
+        self,
+        snf: SnowflakeClient,
+        table: str = "BUDGET.MART.BUDGET",
+        columns: tuple[str, ...] = MART_COLUMNS,
+    ):
+        self.snf = snf
+        self.table = table
+        self.columns = columns
+
+    def _check_column(self, column: str) -> str:
+        # Identifiers cannot be bound, so only known columns reach the SQL text
+        if column not in self.columns:
+            raise ValueError(f"Unknown column: {column}")
+        return column
+
+    def page_query(
+        self,
+        columns: list[str],
+        filters: list[tuple[str, str, object]],
+        descending: bool = True,
+        after: tuple | None = None,
+        limit: int = 100,
+    ) -> tuple[str, dict]:
+        projection = [self._check_column(c) for c in columns if c not in KEY_COLUMNS]
+        projection += list(KEY_COLUMNS)
+
+        where, params = [], {}
+        for i, (column, op, value) in enumerate(filters):
+            column = self._check_column(column)
+            if op not in FILTER_OPERATORS:
+                raise ValueError(f"Unsupported filter operator: {op}")
+            if op in ("IS NULL", "IS NOT NULL"):
+                where.append(f"{column} {op}")
+            elif op in ("IN", "NOT IN"):
+                if not value and op == "NOT IN":
+                    continue
+                params[f"f{i}"] = list(value) or [None]
+                where.append(f"{column} {op} (%(f{i})s)")
+            else:
+                params[f"f{i}"] = value
+                where.append(f"{column} {op} %(f{i})s")
+
+        seek = "<" if descending else ">"
+        if after is not None:
+            params["after_date"], params["after_hk"] = after
+            where.append(
+                f"(TRANSACTION_DATE {seek} %(after_date)s"
+                f" OR (TRANSACTION_DATE = %(after_date)s AND TRANSACTION_HK {seek} %(after_hk)s))"
+            )
+
+        direction = "DESC" if descending else "ASC"
+        # One extra row tells us whether a next page exists
+        params["limit"] = int(limit) + 1
+        sql = f"""
+            SELECT {", ".join(projection)}
+            FROM {self.table}
+            {"WHERE " + " AND ".join(where) if where else ""}
+            ORDER BY TRANSACTION_DATE {direction}, TRANSACTION_HK {direction}
+            LIMIT %(limit)s
+        """
+        return sql, params
+
+    def fetch_page(self, *args, **kwargs) -> pd.DataFrame:
+        sql, params = self.page_query(*args, **kwargs)
+        return self.snf.run_query_df(sql, params, label="grid_page", compact=True)
+
+
+def transaction_grid(
+    snf: SnowflakeClient,
+    key: str,
+    base_filters: list[tuple[str, str, object]],
+    default_columns: tuple[str, ...] = (
+        "TRANSACTION_DATE",
+        "DESCRIPTION",
+        "L1",
+        "L2",
+        "L3",
+        "AMOUNT",
+        "SOURCE_SYSTEM",
+    ),
+    page_size: int = 100,
+) -> None:
+    """
+    Render a server-side paginated transaction table.
+
+    Only the current page is held in memory; the next page is prefetched on
+    the background executor while the user reads the current one.
+    """
+    pager = KeysetPager(snf)
+
+    col_columns, col_search, col_order = st.columns([3, 2, 1])
+    with col_columns:
+        columns = st.multiselect(
+            "Columns", options=pager.columns, default=list(default_columns), key=f"{key}_columns"
+        )
+    with col_search:
+        search = st.text_input("Search description", key=f"{key}_search")
+    with col_order:
+        order = st.selectbox("Order", ["Newest first", "Oldest first"], key=f"{key}_order")
+
+    filters = list(base_filters)
+    if search:
+        filters.append(("DESCRIPTION", "ILIKE", f"%{search}%"))
+    descending = order == "Newest first"
+    columns = columns or list(default_columns)
+
+    # Any change to the query resets paging back to the first page
+    signature = repr((columns, filters, descending, page_size))
+    state = st.session_state.setdefault(f"{key}_grid", {})
+    if state.get("signature") != signature:
+        state.clear()
+        state.update(signature=signature, cursors=[None], prefetched={})
+
+    def load(after):
+        return pager.fetch_page(columns, filters, descending, after, page_size)
+
+    after = state["cursors"][-1]
+    future = state["prefetched"].pop(after, None)
+    page = future.result() if future is not None else load(after)
+
+    has_next = len(page) > page_size
+    page = page.head(page_size)
+
+    visible = [c for c in columns if c in page.columns]
+    st.dataframe(page[visible], hide_index=True, use_container_width=True)
+
+    col_prev, col_info, col_next = st.columns([1, 3, 1])
+    with col_prev:
+        if st.button("Previous", key=f"{key}_prev", disabled=len(state["cursors"]) == 1):
+            state["cursors"].pop()
+            st.rerun()
+    with col_info:
+        st.caption(
+            f"Page {len(state['cursors'])} · {len(page)} rows · "
+            f"{frame_memory(page) / 1024:,.0f} KB"
+        )
+    with col_next:
+        next_clicked = st.button("Next", key=f"{key}_next", disabled=not has_next)
+
+    if has_next:
+        last = page.iloc[-1]
+        next_after = (last["TRANSACTION_DATE"], last["TRANSACTION_HK"])
+        if next_after not in state["prefetched"]:
+            state["prefetched"] = {
+                next_after: get_background_executor().submit(in_current_span(load), next_after)
+            }
+        if next_clicked:
+            state["cursors"].append(next_after)
+            st.rerun()
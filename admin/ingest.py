@@ -0,0 +1,236 @@
+# Standard library
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+
+# Third-party
+import streamlit as st
+
+# Local
+from admin.metrics import CALL_LOG, CallRecord, instrument
+from admin.owners import OWNERS
+from admin.pipeline import RecalculationRunner, get_recalculation_runner
+from admin.tracing import span
+
+# Recalculation triggered by uploads instead of the button. A poller lists
+# every owner's input_folder and compares blob ETags with the previous scan;
+# new or changed blobs are pending until no further change has been seen for
+# INGEST_QUIET_S, then one recalculation runs for the whole burst. Uploads
+# that arrive while a job is running wait for the next quiet window.
+#
+# For every upload the lag from the blob's last-modified time to the end of
+# the job that loaded it is recorded in CALL_LOG as pipeline/upload_to_mart.
+#
+# Off unless BWA_INGEST=1. The owners' hierarchy CSVs live in the same
+# folders but are written by the app itself (export_hierarchy_csv), so they
+# are not treated as uploads.
+
+INGEST_ENABLED = os.environ.get("BWA_INGEST", "0") != "0"
+INGEST_POLL_S = float(os.environ.get("BWA_INGEST_POLL_S", "30"))
+INGEST_QUIET_S = float(os.environ.get("BWA_INGEST_QUIET_S", "120"))
+INGEST_USER = "ingestion"
+INGEST_HISTORY = 50
+
+
+def _timestamp(iso: str) -> float:
+    return datetime.fromisoformat(iso).timestamp()
+
+
+@dataclass
+class IngestionRun:
+    job_id: str
+    uploads: dict[str, float]  # blob name -> last modified
+    first_upload: float
+    last_upload: float
+    triggered_at: float
+    finished_at: float | None = None
+    state: str = "running"
+    lag_s: dict[str, float] = field(default_factory=dict)
+
+
+class IngestionScheduler:
+    def __init__(
+        self,
+        runner: RecalculationRunner,
+        folders: list[str],
+        quiet_s: float = INGEST_QUIET_S,
+        poll_s: float = INGEST_POLL_S,
+        ignored: set[str] | None = None,
+    ):
+        self.runner = runner
+        self.container_client = runner.container_client
+        self.folders = folders
+        self.ignored = ignored or set()  # blob names that are never uploads
+        self.quiet_s = quiet_s
+        self.poll_s = poll_s
+        self._etags: dict[str, str] | None = None
+        self._pending: dict[str, float] = {}  # blob name -> last modified
+        self._last_change = 0.0
+        self._runs: deque[IngestionRun] = deque(maxlen=INGEST_HISTORY)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    # -------------------------
+    # Polling
+    # -------------------------
+    def _scan(self) -> dict:
+        blobs = {}
+        with instrument("blob", "list_inputs") as info:
+            for folder in self.folders:
+                for blob in self.container_client.list_blobs(name_starts_with=folder):
+                    if blob.name not in self.ignored:
+                        blobs[blob.name] = blob
+            info["rows"] = len(blobs)
+        return blobs
+
+    def poll(self, now: float | None = None) -> None:
+        """One scan: record changed blobs, close finished runs, trigger when quiet."""
+        now = time.time() if now is None else now
+        blobs = self._scan()
+        if self._etags is None:
+            # First scan: blobs newer than the last job are still unprocessed;
+            # with no job on record the current files are only the baseline
+            status = self.runner.status()
+            since = _timestamp(status["started_at"]) if status else float("inf")
+
+        with self._lock:
+            if self._etags is None:
+                changed = [b for b in blobs.values() if b.last_modified.timestamp() > since]
+            else:
+                changed = [b for n, b in blobs.items() if self._etags.get(n) != b.etag]
+            self._etags = {name: blob.etag for name, blob in blobs.items()}
+            for blob in changed:
+                self._pending[blob.name] = blob.last_modified.timestamp()
+            if changed:
+                self._last_change = now
+
+        self._close_runs()
+        if self._pending and now - self._last_change >= self.quiet_s:
+            with span("ingestion trigger", files=len(self._pending)):
+                self._trigger(now)
+
+    def _trigger(self, now: float) -> None:
+        with self._lock:
+            last_upload = max(self._pending.values())
+        status = self.runner.status()
+        if (
+            status is not None
+            and status["state"] in ("running", "succeeded")
+            and _timestamp(status["started_at"]) >= last_upload
+        ):
+            # Another instance (or the button) already started a job after
+            # the last upload; it loads these files too
+            job = status
+        else:
+            started, job = self.runner.start(INGEST_USER)
+            if not started:
+                return  # a job older than the uploads is running; retry after it
+        with self._lock:
+            self._runs.append(
+                IngestionRun(
+                    job_id=job["job_id"],
+                    uploads=dict(self._pending),
+                    first_upload=min(self._pending.values()),
+                    last_upload=last_upload,
+                    triggered_at=now,
+                )
+            )
+            self._pending.clear()
+
+    def _close_runs(self) -> None:
+        with self._lock:
+            open_runs = [run for run in self._runs if run.state == "running"]
+        if not open_runs:
+            return
+        status = self.runner.status()
+        if status is None or status["state"] == "running":
+            return
+        for run in open_runs:
+            if run.job_id != status["job_id"]:
+                run.state = "unknown"  # status already overwritten by a later job
+                continue
+            run.state = status["state"]
+            run.finished_at = _timestamp(status["finished_at"] or status["heartbeat_at"])
+            for name, uploaded_at in run.uploads.items():
+                run.lag_s[name] = max(run.finished_at - uploaded_at, 0.0)
+                CALL_LOG.append(
+                    CallRecord(
+                        service="pipeline",
+                        label="upload_to_mart",
+                        started_at=uploaded_at,
+                        duration_s=run.lag_s[name],
+                        rows=1,
+                        error=None if run.state == "succeeded" else run.state,
+                    )
+                )
+
+    # -------------------------
+    # Thread
+    # -------------------------
+    def notify(self) -> None:
+        """Scan now rather than at the next poll (e.g. right after an upload)."""
+        self._wake.set()
+
+    def run_forever(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except Exception:
+                pass  # recorded in CALL_LOG by instrument(); try again next poll
+            self._wake.wait(self.poll_s)
+            self._wake.clear()
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self.run_forever, name="ingestion-scheduler", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+
+    # -------------------------
+    # Inspection
+    # -------------------------
+    def pending(self) -> dict[str, float]:
+        with self._lock:
+            return dict(self._pending)
+
+    def history(self) -> list[dict]:
+        with self._lock:
+            return [asdict(run) for run in reversed(self._runs)]
+
+
+@st.cache_resource
+def get_ingestion_scheduler() -> IngestionScheduler:
+    """Process-wide scheduler, polling in the background when BWA_INGEST is on."""
+    scheduler = IngestionScheduler(
+        get_recalculation_runner(),
+        [profile.input_folder for profile in OWNERS.values()],
+        ignored={profile.hierarchy_blob for profile in OWNERS.values()},
+    )
+    if INGEST_ENABLED:
+        scheduler.start()
+    return scheduler
+
+
+def ingestion_caption(uploaded: bool = False) -> None:
+    """Upload-page hint on pending uploads; `uploaded` makes the scheduler scan now."""
+    if not INGEST_ENABLED:
+        return
+    scheduler = get_ingestion_scheduler()
+    if uploaded:
+        scheduler.notify()
+    pending = scheduler.pending()
+    if pending:
+        st.caption(
+            f"{len(pending)} new file(s) will be loaded automatically "
+            f"{INGEST_QUIET_S:.0f} s after the last upload."
+        )
@@ -0,0 +1,118 @@
+# Standard library
+import math
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+
+# Local
+from admin.profiler import phase
+from admin.tracing import span
+
+# In-process record of external calls (Snowflake, Blob Storage, Key Vault).
+# Kept in a bounded ring buffer so memory stays flat however long the
+# process runs; the Admin "Performance" page reads it.
+
+CALL_LOG_SIZE = 2000
+
+
+@dataclass
+class CallRecord:
+    service: str
+    label: str
+    started_at: float
+    duration_s: float
+    rows: int | None = None
+    bytes: int | None = None
+    query_id: str | None = None
+    error: str | None = None
+
+
+class CallLog:
+    def __init__(self, maxlen: int = CALL_LOG_SIZE):
+        self._records: deque[CallRecord] = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+
+    def append(self, record: CallRecord) -> None:
+        with self._lock:
+            self._records.append(record)
+
+    def snapshot(self) -> list[dict]:
+        with self._lock:
+            return [asdict(r) for r in self._records]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._records.clear()
+
+
+CALL_LOG = CallLog()
+
+
+@contextmanager
+def instrument(service: str, label: str):
+    """
+    Time one external call and append it to CALL_LOG.
+
+    Yields a dict the caller may fill with "rows", "bytes" and "query_id".
+    Failures are recorded with the exception type and re-raised. The call is
+    also a tracing span (admin/tracing.py) carrying the same fields.
+    """
+    info = {"rows": None, "bytes": None, "query_id": None}
+    started_at = time.time()
+    start = time.perf_counter()
+    error = None
+    try:
+        with span(f"{service} {label}", service=service) as current, phase(
+            _phase_name(service, label)
+        ):
+            try:
+                yield info
+            finally:
+                if current is not None:
+                    for key, value in info.items():
+                        current.set_attribute(key, value)
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        CALL_LOG.append(
+            CallRecord(
+                service=service,
+                label=label,
+                started_at=started_at,
+                duration_s=time.perf_counter() - start,
+                rows=info["rows"],
+                bytes=info["bytes"],
+                query_id=info["query_id"],
+                error=error,
+            )
+        )
+
+
+def percentile(values, q: float) -> float:
+    """Nearest-rank percentile (q in 0..1): always one of the values, never below the median."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+def _phase_name(service: str, label: str) -> str:
+    """Profiler phase a call is attributed to."""
+    if service == "keyvault":
+        return "secrets"
+    if service == "snowflake":
+        return "connect" if label == "connect" else "query"
+    return service
+
+
+_LABEL_RE = re.compile(r"\b(FROM|CALL|INTO|TABLE)\s+([\w.$\"]+)", re.I)
+
+
+def query_label(sql: str) -> str:
+    """Default label for a statement: its verb and first object, e.g. 'SELECT BUDGET.MART.BUDGET'."""
+    words = sql.split(None, 1)
+    verb = words[0].upper() if words else "?"
+    match = _LABEL_RE.search(sql)
+    return f"{verb} {match.group(2).upper()}" if match else verb
@@ -0,0 +1,110 @@
+# Standard library
+import threading
+
+# Third-party
+import pandas as pd
+import streamlit as st
+
+# Local
+from admin import periods
+from admin.datasets import DATASETS
+from admin.owners import OWNERS, OwnerProfile
+from admin.queries import CREATE_MONTHLY_AGGREGATE_SQL, MONTHLY_TOTALS_SQL
+from admin.utils import get_snowflake_client
+
+# Owner-partitioned datasets: a query runs once for every configured owner,
+# the result is kept in the dataset store split by OWNER, and each page reads
+# only its slice. Year-to-date totals and category counts are derived from
+# the monthly totals, so any page that loaded one can serve the others.
+
+PARTITION_TTL_S = 600
+
+_aggregate_lock = threading.Lock()
+_aggregate_checked = False
+
+
+def fetch_partitioned(
+    sql: str, params: dict | None = None, label: str | None = None
+) -> dict[str, pd.DataFrame]:
+    """Run `sql` for all owners (bound as %(owners)s) and split the rows by OWNER."""
+    bound = {"owners": list(OWNERS), **(params or {})}
+    df = get_snowflake_client().run_query_df(sql, bound, label=label)
+    return {
+        owner: df[df["OWNER"] == owner].reset_index(drop=True) for owner in OWNERS
+    }
+
+
+def ensure_monthly_aggregate() -> None:
+    """
+    Build the monthly aggregate from the mart if it does not exist yet, once
+    per process, so a fresh deploy works before its first recalculation.
+    """
+    global _aggregate_checked
+    if _aggregate_checked:
+        return
+    with _aggregate_lock:
+        if not _aggregate_checked:
+            get_snowflake_client().run_query(
+                CREATE_MONTHLY_AGGREGATE_SQL, label="create_monthly_aggregate"
+            )
+            _aggregate_checked = True
+
+
+def _load_monthly_totals() -> dict[str, pd.DataFrame]:
+    ensure_monthly_aggregate()
+    return {
+        owner: df.assign(
+            REPORTING_DATE=pd.to_datetime(df["REPORTING_DATE"]),
+            TRANSACTION_MONTH=pd.to_datetime(df["TRANSACTION_MONTH"]),
+            AMOUNT=df["AMOUNT"].astype(float),
+        )
+        for owner, df in fetch_partitioned(MONTHLY_TOTALS_SQL, label="monthly_totals").items()
+    }
+
+
+def _derive_ytd_totals(owner: str, year: int) -> pd.DataFrame:
+    monthly = DATASETS.get("monthly_totals", owner=owner)
+    return monthly[periods.year(year).mask(monthly["TRANSACTION_MONTH"])]
+
+
+def _derive_category_counts(owner: str, year: int) -> pd.DataFrame:
+    """Classified categories of the year, most frequent first."""
+    ytd = DATASETS.get("ytd_totals", owner=owner, year=year)
+    return (
+        ytd[ytd["L1"].notna()]
+        .groupby("L1", as_index=False)["TRANSACTIONS"]
+        .sum()
+        .sort_values("TRANSACTIONS", ascending=False, ignore_index=True)
+    )
+
+
+DATASETS.register(
+    "monthly_totals_all",
+    _load_monthly_totals,
+    depends_on=("mart",),
+    max_age_s=PARTITION_TTL_S,
+)
+DATASETS.register(
+    "monthly_totals", lambda owner: DATASETS.get("monthly_totals_all")[owner]
+)
+DATASETS.register("ytd_totals", _derive_ytd_totals)
+DATASETS.register("category_counts", _derive_category_counts)
+
+
+def owner_dataset(name: str, owner: OwnerProfile, **params):
+    """One owner's copy of a dataset, subject to the role split in app.py."""
+    if st.session_state.get("role") not in owner.roles:
+        raise PermissionError(f"Role cannot view {owner.name}'s data.")
+    return DATASETS.get(name, owner=owner.name, **params)
+
+
+def monthly_totals(owner: OwnerProfile) -> pd.DataFrame:
+    return owner_dataset("monthly_totals", owner)
+
+
+def ytd_totals(owner: OwnerProfile) -> pd.DataFrame:
+    return owner_dataset("ytd_totals", owner, year=periods.year_to_date().start.year)
+
+
+def category_counts(owner: OwnerProfile) -> pd.DataFrame:
+    return owner_dataset("category_counts", owner, year=periods.year_to_date().start.year)
@@ -0,0 +1,102 @@
+from dataclasses import dataclass
+
+import streamlit as st
+
+
+@dataclass(frozen=True)
+class OwnerPage:
+    path: str
+    title: str
+    icon: str
+    url_path: str
+
+
+@dataclass(frozen=True)
+class OwnerProfile:
+    """
+    Per-owner settings shared by the upload, hierarchy and report pages.
+    Adding an owner only takes a new entry in OWNERS: navigation, blob
+    folders and the owner-partitioned datasets are all driven from here.
+    """
+
+    name: str
+    blob_prefix: str
+    # Roles that may see this owner's pages; the owner's first page is the
+    # landing page for roles[0]
+    roles: tuple[str, ...]
+    section: str
+    pages: tuple[OwnerPage, ...]
+    # Substrings identifying a bank statement; an upload archives older
+    # statements of the same kind from the input folder
+    archive_keywords: tuple[str, ...] = ("account-statement",)
+    income_category: str = "Income"
+    excluded_transactions: tuple[str, ...] = ()
+
+    @property
+    def input_folder(self) -> str:
+        return f"{self.blob_prefix}inputs/"
+
+    @property
+    def processed_folder(self) -> str:
+        return f"{self.blob_prefix}processed_files/"
+
+    @property
+    def archive_folder(self) -> str:
+        # Monthly bundles of processed_folder, see admin/archive.py
+        return f"{self.blob_prefix}archive/"
+
+    @property
+    def hierarchy_blob(self) -> str:
+        return f"{self.input_folder}input_hierarchy_{self.name.lower()}.csv"
+
+
+OWNERS: dict[str, OwnerProfile] = {
+    "Jan": OwnerProfile(
+        name="Jan",
+        blob_prefix="jan/",
+        roles=("Responder", "Admin"),
+        section="Jan's Budget",
+        pages=(
+            OwnerPage(
+                "respond/respond_1.py",
+                "Files Upload / Hierarchy",
+                ":material/healing:",
+                "respond_1",
+            ),
+            OwnerPage(
+                "respond/respond_2.py", "Report View", ":material/handyman:", "respond_2"
+            ),
+        ),
+        archive_keywords=("SK7075000000004024135645", "account-statement"),
+        income_category="Prijem",
+        excluded_transactions=("0d5b5bccddb88ab98eac67945c00c1f1",),
+    ),
+    "Peter": OwnerProfile(
+        name="Peter",
+        blob_prefix="peter/",
+        roles=("Admin",),
+        section="Peter's Budget",
+        pages=(
+            OwnerPage(
+                "admin/admin_1.py",
+                "Files Upload / Hierarchy",
+                ":material/person_add:",
+                "admin_1",
+            ),
+            OwnerPage("admin/admin_2.py", "Report View", ":material/security:", "admin_2"),
+        ),
+        archive_keywords=("pohyby", "account-statement"),
+    ),
+}
+
+
+def owners_for_role(role: str | None) -> list[OwnerProfile]:
+    return [profile for profile in OWNERS.values() if role in profile.roles]
+
+
+def current_owner() -> OwnerProfile:
+    """Owner of the page being run, as resolved by the navigation in app.py."""
+    owner = st.session_state.get("owner")
+    if owner not in OWNERS:
+        raise PermissionError("No owner selected for this page.")
+    return OWNERS[owner]
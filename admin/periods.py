@@ -0,0 +1,72 @@
+# Standard library
+from dataclasses import dataclass
+from datetime import date, datetime
+
+# Third-party
+import pandas as pd
+import pytz
+
+# Report periods resolved in the app to literal [start, end) dates. Queries
+# bind them as `TRANSACTION_DATE >= %(start)s AND TRANSACTION_DATE < %(end)s`
+# rather than wrapping the column in YEAR()/MONTH(), so Snowflake can prune
+# micro-partitions. Bounds are whole months or years and never CURRENT_DATE(),
+# so the same statement and values repeat for the whole period and the
+# persisted result cache can answer them; trailing_months() is the exception,
+# its start moves by a day each day.
+
+APP_TZ = pytz.timezone("Europe/Prague")
+
+
+@dataclass(frozen=True)
+class DateRange:
+    start: date
+    end: date  # exclusive
+
+    def __iter__(self):
+        # start, end = date_range
+        return iter((self.start, self.end))
+
+    def params(self) -> dict:
+        return {"start": self.start, "end": self.end}
+
+    def clip(self, other: "DateRange") -> "DateRange":
+        return DateRange(max(self.start, other.start), min(self.end, other.end))
+
+    def mask(self, dates: pd.Series) -> pd.Series:
+        """Boolean mask of `dates` (datetime64) within the range."""
+        return (dates >= pd.Timestamp(self.start)) & (dates < pd.Timestamp(self.end))
+
+
+def today() -> date:
+    return datetime.now(APP_TZ).date()
+
+
+def _add_months(day: date, months: int) -> date:
+    return (pd.Timestamp(day) + pd.DateOffset(months=months)).date()
+
+
+def year(value: int) -> DateRange:
+    return DateRange(date(value, 1, 1), date(value + 1, 1, 1))
+
+
+def year_to_date(on: date | None = None) -> DateRange:
+    # Ends at next 1 January rather than tomorrow: there are no future
+    # transactions, and the bounds stay the same all year
+    return year((on or today()).year)
+
+
+def current_month(on: date | None = None) -> DateRange:
+    start = (on or today()).replace(day=1)
+    return DateRange(start, _add_months(start, 1))
+
+
+def last_n_months(n: int, on: date | None = None) -> DateRange:
+    """The current month and the `n` whole months before it."""
+    month = current_month(on)
+    return DateRange(_add_months(month.start, -n), month.end)
+
+
+def trailing_months(n: int, on: date | None = None) -> DateRange:
+    """From the same day `n` months back (clamped to month end) to the end of the current month."""
+    day = on or today()
+    return DateRange(_add_months(day, -n), current_month(day).end)
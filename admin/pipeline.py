@@ -0,0 +1,329 @@
+# Standard library
+import json
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+
+# Third-party
+import pandas as pd
+import streamlit as st
+from azure.core.exceptions import ResourceExistsError, ResourceNotFoundError
+
+# Local
+from admin.datasets import DATASETS
+from admin.metrics import instrument
+from admin.owners import OWNERS
+from admin.periods import APP_TZ
+from admin.tracing import action, in_current_span, span
+from admin.utils import (
+    RECALCULATION_PROCEDURES,
+    SnowflakeClient,
+    get_blob_uploader,
+    get_snowflake_client,
+)
+
+# One recalculation at a time across every session and App Service instance.
+# The runner holds a blob lease on LOCK_BLOB for the whole pipeline and
+# renews it from a heartbeat thread; if the process dies the lease expires
+# after LEASE_DURATION_S and the next request can take over. Progress is
+# written to STATUS_BLOB, so a second request (here or on another instance)
+# shows the running job instead of starting its own.
+
+LOCK_BLOB = "locks/recalculation.lock"
+STATUS_BLOB = "locks/recalculation.json"
+LEASE_DURATION_S = 60  # Azure allows 15-60 s for a finite lease
+HEARTBEAT_S = 20
+STATUS_POLL_S = 2
+
+
+def _now() -> str:
+    return datetime.now(APP_TZ).isoformat(timespec="seconds")
+
+
+class RecalculationLease:
+    """Blob lease on the lock blob, kept alive by a heartbeat thread while held."""
+
+    def __init__(self, container_client, blob: str = LOCK_BLOB, on_heartbeat=None):
+        self.blob_client = container_client.get_blob_client(blob)
+        self.on_heartbeat = on_heartbeat
+        self.lease = None
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def acquire(self) -> bool:
+        """Take the lease; False if another job holds it."""
+        try:
+            self.blob_client.upload_blob(b"", overwrite=False)
+        except ResourceExistsError:
+            pass
+        try:
+            with instrument("blob", "acquire_lease"):
+                self.lease = self.blob_client.acquire_lease(lease_duration=LEASE_DURATION_S)
+        except ResourceExistsError:
+            return False
+        self._thread = threading.Thread(
+            target=in_current_span(self._heartbeat), name="recalculation-heartbeat", daemon=True
+        )
+        self._thread.start()
+        return True
+
+    def _heartbeat(self) -> None:
+        while not self._stop.wait(HEARTBEAT_S):
+            try:
+                with instrument("blob", "renew_lease"):
+                    self.lease.renew()
+            except Exception:
+                # Someone else may take over now; the running batch is not
+                # interrupted, but the status records the lost lease
+                self.lost = True
+                return
+            if self.on_heartbeat is not None:
+                self.on_heartbeat()
+
+    def stop_heartbeat(self) -> None:
+        """Stop renewing (and the heartbeat's status writes) but keep the lease."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def release(self) -> None:
+        self.stop_heartbeat()
+        if self.lease is not None and not self.lost:
+            try:
+                with instrument("blob", "release_lease"):
+                    self.lease.release()
+            except Exception:
+                pass  # expires on its own
+
+
+class RecalculationRunner:
+    """Starts the recalculation pipeline in the background under the lease."""
+
+    def __init__(self, snf: SnowflakeClient, container_client):
+        self.snf = snf
+        self.container_client = container_client
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="recalculation")
+        self._lock = threading.Lock()
+        self._future: Future | None = None
+        self._status: dict | None = None
+
+    # -------------------------
+    # Status
+    # -------------------------
+    def status(self) -> dict | None:
+        """Latest job status: this process's job if any, otherwise the status blob."""
+        with self._lock:
+            if self._status is not None and self._status["state"] == "running":
+                return dict(self._status)
+        try:
+            with instrument("blob", "read_status"):
+                data = (
+                    self.container_client.get_blob_client(STATUS_BLOB)
+                    .download_blob()
+                    .content_as_text()
+                )
+        except ResourceNotFoundError:
+            return None
+        status = json.loads(data)
+        heartbeat = datetime.fromisoformat(status["heartbeat_at"])
+        if (
+            status["state"] == "running"
+            and (datetime.now(APP_TZ) - heartbeat).total_seconds() > LEASE_DURATION_S
+        ):
+            status["state"] = "abandoned"  # owner stopped renewing; lease has expired
+        return status
+
+    def _write_status(self) -> None:
+        with self._lock:
+            self._status["heartbeat_at"] = _now()
+            data = json.dumps(self._status, default=str)
+        with instrument("blob", "write_status"):
+            self.container_client.get_blob_client(STATUS_BLOB).upload_blob(data, overwrite=True)
+
+    # -------------------------
+    # Run
+    # -------------------------
+    def start(self, started_by: str) -> tuple[bool, dict | None]:
+        """Start the pipeline unless one is running; returns (started, status)."""
+        with self._lock:
+            if self._future is not None and not self._future.done():
+                return False, dict(self._status)
+
+        lease = RecalculationLease(self.container_client, on_heartbeat=self._write_status)
+        if not lease.acquire():
+            return False, self.status()
+
+        try:
+            with self._lock:
+                self._status = {
+                    "job_id": uuid.uuid4().hex,
+                    "state": "running",
+                    "started_by": started_by,
+                    "host": socket.gethostname(),
+                    "started_at": _now(),
+                    "finished_at": None,
+                    "steps": {},
+                    "error": None,
+                }
+            self._write_status()
+            # The job's calls stay in the trace of the action that started it
+            future = self._executor.submit(in_current_span(self._run), lease)
+        except BaseException as e:
+            # The heartbeat would otherwise renew the lease forever
+            lease.release()
+            with self._lock:
+                self._status.update(state="failed", finished_at=_now(), error=f"{type(e).__name__}: {e}")
+            raise
+
+        with self._lock:
+            self._future = future
+            return True, dict(self._status)
+
+    def wait(self, timeout: float | None = None) -> dict | None:
+        """Block until this process's job (if any) has finished; returns its status."""
+        with self._lock:
+            future = self._future
+        if future is not None:
+            future.result(timeout)
+        with self._lock:
+            return dict(self._status) if self._status is not None else None
+
+    def _run(self, lease: RecalculationLease) -> None:
+        with span("recalculation job", job_id=self._status["job_id"]):
+            self._run_steps(lease)
+
+    def _run_step(self, label: str, sql: str) -> dict:
+        start = time.perf_counter()
+        try:
+            # A CALL is not retried (run_query_df only retries plain reads)
+            self.snf.run_query_df(sql, label=f"recalculation: {label}")
+        except Exception as e:
+            error = str(e)
+        else:
+            error = None
+        return {"ok": error is None, "error": error, "duration_s": time.perf_counter() - start}
+
+    def _run_steps(self, lease: RecalculationLease) -> None:
+        try:
+            # One statement per procedure, so each gets STATEMENT_TIMEOUT_S of
+            # its own and a failure is pinned on the step that raised; the
+            # steps after it are recorded as not executed
+            with self._lock:
+                self._status["steps"] = {
+                    label: {"ok": False, "error": "not executed", "duration_s": 0.0}
+                    for label in RECALCULATION_PROCEDURES
+                }
+            ok = True
+            for label, sql in RECALCULATION_PROCEDURES.items():
+                step = self._run_step(label, sql)
+                with self._lock:
+                    self._status["steps"][label] = step
+                if not step["ok"]:
+                    ok = False
+                    break
+            with self._lock:
+                self._status["state"] = "succeeded" if ok else "failed"
+            if ok:
+                # Cached dashboard datasets predate the new mart
+                DATASETS.invalidate("mart")
+                st.cache_data.clear()
+        except Exception as e:
+            with self._lock:
+                self._status.update(state="failed", error=str(e))
+        finally:
+            # The final status goes out while the lease is still held, so a
+            # job started after the release never sees this one as running;
+            # the heartbeat stops first so its write cannot land after it
+            lease.stop_heartbeat()
+            with self._lock:
+                self._status["finished_at"] = _now()
+                if lease.lost:
+                    self._status["error"] = self._status["error"] or "lease lost during run"
+            try:
+                self._write_status()
+            finally:
+                lease.release()
+
+
+def apply_rules(snf: SnowflakeClient, rules: pd.DataFrame) -> dict | None:
+    """
+    Stage the full rules table in RAW.RULES_TABLE and run the SCD2 load.
+
+    Returns the procedure's result (status, rows_closed, rows_inserted,
+    started_at, finished_at), or None if it returned nothing. Raises
+    RuntimeError without running the load when staging fails.
+    """
+    to_update = rules.assign(LOAD_DATETIME=datetime.now(APP_TZ))
+    success, _, _ = snf.sf_write_pandas(to_update, table_name="RULES_TABLE", schema="RAW")
+    if not success:
+        raise RuntimeError("Staging RAW.RULES_TABLE failed; the SCD2 load was not run.")
+    result = snf.run_query_df("CALL BUDGET.CORE.SP_LOAD_RULES_SCD2();")
+    if result is None or result.empty:
+        return None
+    sp_result = result.iloc[0, 0]  # the returned VARIANT
+    return json.loads(sp_result) if isinstance(sp_result, str) else sp_result
+
+
+@st.cache_resource
+def get_recalculation_runner() -> RecalculationRunner:
+    # The lock and status blobs live in the container shared by all owners
+    return RecalculationRunner(
+        get_snowflake_client(), get_blob_uploader(next(iter(OWNERS))).container_client
+    )
+
+
+def _render_status(status: dict | None) -> None:
+    if status is None:
+        return
+    if status["state"] == "running":
+        st.info(
+            f"Recalculation started by {status['started_by']} at {status['started_at']} "
+            f"on {status['host']} is running (last heartbeat {status['heartbeat_at']})."
+        )
+        return
+    if status["state"] == "abandoned":
+        st.warning(
+            f"Recalculation started by {status['started_by']} at {status['started_at']} "
+            "stopped sending heartbeats; it can be started again."
+        )
+        return
+    st.caption(
+        f"Last recalculation by {status['started_by']}: {status['state']}, "
+        f"finished {status['finished_at']}"
+    )
+    for label, step in status["steps"].items():
+        if step["ok"]:
+            st.write(f"{label} executed successfully! ({step['duration_s']:.1f} s)")
+        else:
+            st.write(f"{label}: {step['error']}")
+    if status["error"]:
+        st.write(f"Error: {status['error']}")
+
+
+@st.fragment(run_every=STATUS_POLL_S)
+def _poll_status() -> None:
+    status = get_recalculation_runner().status()
+    _render_status(status)
+    if status is None or status["state"] != "running":
+        st.session_state.pop("recalculation_watch", None)
+        st.rerun()
+
+
+def recalculation_panel() -> None:
+    """'Recalculate Database' button plus the state of the running or last job."""
+    runner = get_recalculation_runner()
+    if st.button("Recalculate Database"):
+        with action("recalculate"):
+            started, status = runner.start(st.session_state.get("username") or "unknown")
+        if not started:
+            st.warning("A recalculation is already running; showing its progress instead.")
+        st.session_state["recalculation_watch"] = True
+
+    if st.session_state.get("recalculation_watch"):
+        _poll_status()
+    else:
+        _render_status(runner.status())
@@ -0,0 +1,129 @@
+# Standard library
+import cProfile
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Third-party
+import streamlit as st
+
+# Opt-in page profiler: ?profile=1 in the URL or BWA_PROFILE=1 in the
+# environment. Each page run gets a phase breakdown (self time, so nested
+# phases are not double counted) shown in a collapsible panel at the bottom.
+# With BWA_PROFILE_DIR set, a cProfile dump is also written per run; open it
+# with snakeviz or turn it into a flamegraph with flameprof.
+
+PROFILE_ENV = "BWA_PROFILE"
+PROFILE_DIR_ENV = "BWA_PROFILE_DIR"
+
+_active: ContextVar["PageProfile | None"] = ContextVar("page_profile", default=None)
+
+# Only one cProfile can run at a time in a process (sys.monitoring on 3.12+)
+_cprofile_lock = threading.Lock()
+
+
+class PageProfile:
+    def __init__(self, page: str):
+        self.page = page
+        self.totals: dict[str, float] = {}
+        self.counts: dict[str, int] = {}
+        self._stack: list[list] = []  # [phase, start, time spent in children]
+
+    def push(self, name: str) -> None:
+        self._stack.append([name, time.perf_counter(), 0.0])
+
+    def pop(self) -> None:
+        name, start, children = self._stack.pop()
+        elapsed = time.perf_counter() - start
+        self.totals[name] = self.totals.get(name, 0.0) + elapsed - children
+        self.counts[name] = self.counts.get(name, 0) + 1
+        if self._stack:
+            self._stack[-1][2] += elapsed
+
+
+@contextmanager
+def phase(name: str):
+    """Attribute the time spent in the block to `name` when profiling is on."""
+    profile = _active.get()
+    if profile is None:
+        yield
+        return
+    profile.push(name)
+    try:
+        yield
+    finally:
+        profile.pop()
+
+
+def profiling_enabled() -> bool:
+    if os.getenv(PROFILE_ENV, "").lower() in ("1", "true", "yes"):
+        return True
+    return st.query_params.get("profile", "").lower() in ("1", "true", "yes")
+
+
+@contextmanager
+def profile_page(page: str):
+    """Wrap one page run; renders the timing panel when the page completes."""
+    if not profiling_enabled():
+        yield
+        return
+
+    profile = PageProfile(page)
+    token = _active.set(profile)
+
+    dump_dir = os.getenv(PROFILE_DIR_ENV)
+    profiler = None
+    if dump_dir and _cprofile_lock.acquire(blocking=False):
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    started = time.perf_counter()
+    try:
+        # st.rerun()/st.stop() raise out of here; the panel is skipped then
+        yield
+        total = time.perf_counter() - started
+        _render_panel(profile, total)
+    finally:
+        _active.reset(token)
+        if profiler is not None:
+            profiler.disable()
+            _cprofile_lock.release()
+            os.makedirs(dump_dir, exist_ok=True)
+            slug = re.sub(r"\W+", "_", page).strip("_").lower() or "page"
+            stamp = f"{time.strftime('%Y%m%d-%H%M%S')}-{time.time_ns() % 10**9:09d}"
+            profiler.dump_stats(os.path.join(dump_dir, f"{slug}-{stamp}.prof"))
+
+
+def _render_panel(profile: PageProfile, total: float) -> None:
+    accounted = sum(profile.totals.values())
+    rows = [
+        {
+            "phase": name,
+            "calls": profile.counts[name],
+            "ms": seconds * 1000,
+            "share": seconds / total if total else 0,
+        }
+        for name, seconds in sorted(profile.totals.items(), key=lambda kv: -kv[1])
+    ]
+    rows.append(
+        {
+            "phase": "script / render (unattributed)",
+            "calls": 1,
+            "ms": max(total - accounted, 0) * 1000,
+            "share": max(total - accounted, 0) / total if total else 0,
+        }
+    )
+
+    with st.expander(f"⏱️ {profile.page}: {total * 1000:,.0f} ms"):
+        st.dataframe(
+            rows,
+            column_config={
+                "ms": st.column_config.NumberColumn("ms", format="%.1f"),
+                "share": st.column_config.ProgressColumn("Share", min_value=0, max_value=1),
+            },
+            hide_index=True,
+            use_container_width=True,
+        )
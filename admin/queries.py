@@ -0,0 +1,144 @@
+# Shared dashboard statements. The SQL text is constant and every value is
+# passed as a parameter, so one statement serves all filter combinations
+# and no value is ever formatted into the SQL by hand. With the connector's
+# default pyformat paramstyle the values are escaped and interpolated
+# client-side: the text Snowflake receives differs per value, and its result
+# cache is reused only between runs with the same values.
+
+# Local
+from admin.owners import OWNERS
+
+DRILLDOWN_LIMIT = 100
+
+DRILLDOWN_SQL = f"""
+    SELECT
+        TRANSACTION_DATE,
+        DESCRIPTION,
+        L1,
+        L2,
+        L3,
+        AMOUNT,
+        SOURCE_SYSTEM
+    FROM BUDGET.MART.BUDGET
+    WHERE OWNER = %(owner)s
+      AND transaction_date >= %(start)s
+      AND transaction_date < %(end)s
+      AND (%(category)s IS NULL OR L1 = %(category)s)
+    ORDER BY TRANSACTION_DATE DESC
+    LIMIT {DRILLDOWN_LIMIT}
+"""
+
+# Compact monthly aggregate at owner x month x L1 x L2 x L3 grain, rebuilt
+# by the last recalculation step and created on first use when a fresh
+# deploy has not recalculated yet. Dashboard queries that only need totals
+# read it instead of scanning every transaction in the mart. EXCLUDED flags
+# the transactions an owner hides from the expense and P&L charts (but not
+# from income); the hashes come from owner config, not user input.
+MONTHLY_AGGREGATE_TABLE = "BUDGET.MART.BUDGET_MONTHLY"
+
+_EXCLUDED_HKS = ", ".join(
+    "'" + hk.replace("'", "''") + "'"
+    for profile in OWNERS.values()
+    for hk in profile.excluded_transactions
+) or "NULL"
+
+_MONTHLY_AGGREGATE_SELECT = f"""
+    SELECT
+        OWNER,
+        REPORTING_DATE,
+        DATE_TRUNC('month', TRANSACTION_DATE) as TRANSACTION_MONTH,
+        L1,
+        L2,
+        L3,
+        COALESCE(TRANSACTION_HK IN ({_EXCLUDED_HKS}), FALSE) as EXCLUDED,
+        SUM(AMOUNT) as AMOUNT,
+        COUNT(*) as TRANSACTIONS
+    FROM BUDGET.MART.BUDGET
+    GROUP BY ALL
+"""
+
+REFRESH_MONTHLY_AGGREGATE_SQL = (
+    f"CREATE OR REPLACE TABLE {MONTHLY_AGGREGATE_TABLE} AS {_MONTHLY_AGGREGATE_SELECT}"
+)
+CREATE_MONTHLY_AGGREGATE_SQL = (
+    f"CREATE TABLE IF NOT EXISTS {MONTHLY_AGGREGATE_TABLE} AS {_MONTHLY_AGGREGATE_SELECT}"
+)
+
+# Monthly totals for every owner in a single read of the aggregate; each
+# page takes its owner's slice.
+MONTHLY_TOTALS_SQL = f"""
+    SELECT
+        OWNER,
+        REPORTING_DATE,
+        TRANSACTION_MONTH,
+        L1,
+        L2,
+        EXCLUDED,
+        SUM(AMOUNT) as AMOUNT,
+        SUM(TRANSACTIONS) as TRANSACTIONS
+    FROM {MONTHLY_AGGREGATE_TABLE}
+    WHERE OWNER IN (%(owners)s)
+    GROUP BY ALL
+"""
+
+# Classification workbench: transaction descriptions of an owner without a
+# hierarchy row, and the owner's current hierarchy to suggest from.
+UNCLASSIFIED_SQL = """
+    WITH tx AS (
+        SELECT
+            prod_hierarchy,
+            COUNT(*) as TRANSACTIONS,
+            SUM(amount) as AMOUNT
+        FROM BUDGET.CORE.TRANSACTION
+        WHERE owner = %(owner)s
+          AND prod_hierarchy IS NOT NULL
+        GROUP BY prod_hierarchy
+    )
+    SELECT
+        tx.prod_hierarchy AS PROD_HIERARCHY_ID,
+        tx.TRANSACTIONS,
+        tx.AMOUNT
+    FROM tx
+    LEFT JOIN BUDGET.CORE.HIERARCHY h
+      ON tx.prod_hierarchy = h.prod_hierarchy_id
+     AND h.owner = %(owner)s
+    WHERE h.prod_hierarchy_id IS NULL
+"""
+
+CLASSIFIED_SQL = """
+    SELECT PROD_HIERARCHY_ID, L1, L2, L3
+    FROM BUDGET.CORE.HIERARCHY
+    WHERE owner = %(owner)s AND L1 IS NOT NULL
+    QUALIFY ROW_NUMBER() OVER (
+        PARTITION BY PROD_HIERARCHY_ID ORDER BY LOAD_DATETIME DESC
+    ) = 1
+"""
+
+# Full transaction export of an owner and period (admin/export.py). Read in
+# result batches, so no LIMIT.
+EXPORT_SQL = """
+    SELECT
+        TRANSACTION_HK,
+        TRANSACTION_DATE,
+        REPORTING_DATE,
+        DESCRIPTION,
+        L1,
+        L2,
+        L3,
+        AMOUNT,
+        SOURCE_SYSTEM,
+        OWNER
+    FROM BUDGET.MART.BUDGET
+    WHERE OWNER = %(owner)s
+      AND transaction_date >= %(start)s
+      AND transaction_date < %(end)s
+    ORDER BY TRANSACTION_DATE, TRANSACTION_HK
+"""
+
+EXPORT_COUNT_SQL = """
+    SELECT COUNT(*)
+    FROM BUDGET.MART.BUDGET
+    WHERE OWNER = %(owner)s
+      AND transaction_date >= %(start)s
+      AND transaction_date < %(end)s
+"""
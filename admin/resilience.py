@@ -0,0 +1,213 @@
+# Standard library
+import os
+import random
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+# Third-party
+from azure.core.exceptions import HttpResponseError, ServiceRequestError, ServiceResponseError
+from snowflake.connector.errors import OperationalError
+
+# Shared failure handling for Key Vault, Blob Storage and Snowflake calls:
+#
+#   timeouts   POLICIES[service].timeout_s is passed to the SDK clients as
+#              connect/read (Azure) and login/network (Snowflake) timeouts;
+#              statements get STATEMENT_TIMEOUT_S. The SDKs' own retries are
+#              switched off so this module is the only place that retries.
+#   retries    guarded() retries transient errors (network, timeouts, 408,
+#              429, 5xx, Snowflake OperationalError) with full-jitter
+#              exponential backoff, only when the call is idempotent.
+#   breaker    after `failure_threshold` consecutive failed calls a service's
+#              breaker opens and calls fail fast with CircuitOpenError for
+#              `reset_after_s`; then one trial call decides whether it closes.
+#
+# Errors that are not transient (bad SQL, 404, auth) are re-raised at once
+# and count as the dependency answering. An error is judged only by the
+# service it came from: a Key Vault failure inside a Snowflake connect is
+# retried and counted by Key Vault, and passes through the Snowflake call
+# untouched. stats() feeds the Performance page.
+
+
+def _seconds(name: str, default: float) -> float:
+    return float(os.getenv(name, str(default)))
+
+
+@dataclass(frozen=True)
+class Policy:
+    timeout_s: float
+    attempts: int = 3
+    base_delay_s: float = 0.2
+    max_delay_s: float = 5.0
+    failure_threshold: int = 5
+    reset_after_s: float = 30.0
+
+
+POLICIES = {
+    "keyvault": Policy(timeout_s=_seconds("BWA_KEYVAULT_TIMEOUT_S", 10)),
+    "blob": Policy(timeout_s=_seconds("BWA_BLOB_TIMEOUT_S", 30)),
+    "snowflake": Policy(timeout_s=_seconds("BWA_SNOWFLAKE_TIMEOUT_S", 60), attempts=2),
+}
+
+# Client-side limit per Snowflake statement (0: none); long enough for each recalculation procedure
+STATEMENT_TIMEOUT_S = int(_seconds("BWA_STATEMENT_TIMEOUT_S", 900))
+
+RETRY_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a service whose breaker is open."""
+
+    def __init__(self, message: str, service: str):
+        super().__init__(message)
+        self.resilience_service = service
+
+
+def _origin(e: BaseException) -> str | None:
+    """The guarded service an exception was raised under, once one has seen it."""
+    return getattr(e, "resilience_service", None)
+
+
+def _tag(e: BaseException, service: str) -> None:
+    if _origin(e) is None:
+        try:
+            e.resilience_service = service
+        except AttributeError:  # exception types without a __dict__
+            pass
+
+
+def is_transient(e: BaseException) -> bool:
+    """Worth retrying: the request may not have reached the service or it asked to retry."""
+    if isinstance(e, (TimeoutError, ConnectionError, ServiceRequestError, ServiceResponseError)):
+        return True
+    if isinstance(e, HttpResponseError):
+        return e.status_code in RETRY_STATUS
+    return isinstance(e, OperationalError)
+
+
+class CircuitBreaker:
+    def __init__(self, service: str, policy: Policy):
+        self.service = service
+        self.policy = policy
+        self.state = "closed"  # closed -> open -> half_open -> closed | open
+        self.failures = 0  # consecutive failed calls
+        self.opened_at: float | None = None
+        self._trial = False  # a half-open trial call is in flight
+        self.counters = {"calls": 0, "retries": 0, "failures": 0, "trips": 0, "rejected": 0}
+        self._lock = threading.Lock()
+
+    def before_call(self) -> None:
+        with self._lock:
+            self.counters["calls"] += 1
+            if self.state == "open":
+                if time.monotonic() - self.opened_at < self.policy.reset_after_s:
+                    self.counters["rejected"] += 1
+                    raise CircuitOpenError(self._open_message(), self.service)
+                self.state = "half_open"
+            if self.state == "half_open":
+                if self._trial:
+                    self.counters["rejected"] += 1
+                    raise CircuitOpenError(self._open_message(), self.service)
+                self._trial = True
+
+    def abandon_trial(self) -> None:
+        with self._lock:
+            self._trial = False
+
+    def record_retry(self) -> None:
+        with self._lock:
+            self.counters["retries"] += 1
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state, self.failures, self._trial = "closed", 0, False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.counters["failures"] += 1
+            self.failures += 1
+            self._trial = False
+            if self.state == "half_open" or self.failures >= self.policy.failure_threshold:
+                if self.state != "open":
+                    self.counters["trips"] += 1
+                self.state, self.opened_at = "open", time.monotonic()
+
+    def _open_message(self) -> str:
+        wait = self.policy.reset_after_s - (time.monotonic() - (self.opened_at or 0))
+        return (
+            f"{self.service} is unavailable after {self.failures} failed calls; "
+            f"retrying in {max(wait, 0):.0f} s."
+        )
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "service": self.service,
+                "state": self.state,
+                "consecutive_failures": self.failures,
+                **self.counters,
+            }
+
+
+BREAKERS = {service: CircuitBreaker(service, policy) for service, policy in POLICIES.items()}
+
+# Services with a guarded() call running in this context; nested calls (a
+# query opening a connection) go straight through, the outer call decides
+_active: ContextVar[frozenset] = ContextVar("resilience_active", default=frozenset())
+
+
+def backoff(policy: Policy, attempt: int) -> float:
+    """Full jitter: uniform between 0 and the capped exponential delay."""
+    return random.uniform(0, min(policy.max_delay_s, policy.base_delay_s * 2**attempt))
+
+
+def guarded(service: str, fn, idempotent: bool = True):
+    """
+    Call `fn()` through `service`'s breaker, retrying transient errors when
+    `idempotent` (a write that may have landed is not repeated). Raises
+    CircuitOpenError without calling `fn` while the breaker is open.
+    """
+    active = _active.get()
+    if service in active:
+        return fn()
+
+    breaker = BREAKERS[service]
+    policy = breaker.policy
+    breaker.before_call()
+    attempts = policy.attempts if idempotent else 1
+    token = _active.set(active | {service})
+    try:
+        return _attempt(breaker, fn, attempts)
+    finally:
+        _active.reset(token)
+
+
+def _attempt(breaker: CircuitBreaker, fn, attempts: int):
+    for attempt in range(attempts):
+        try:
+            result = fn()
+        except Exception as e:
+            if _origin(e) not in (None, breaker.service):
+                # Another service's failure, already retried and counted there
+                breaker.abandon_trial()
+                raise
+            _tag(e, breaker.service)
+            if not is_transient(e):
+                breaker.record_success()
+                raise
+            if attempt + 1 == attempts:
+                breaker.record_failure()
+                raise
+            breaker.record_retry()
+            time.sleep(backoff(breaker.policy, attempt))
+        except BaseException:  # Streamlit rerun/stop: no verdict on the service
+            breaker.abandon_trial()
+            raise
+        else:
+            breaker.record_success()
+            return result
+
+
+def stats() -> list[dict]:
+    return [breaker.stats() for breaker in BREAKERS.values()]
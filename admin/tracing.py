@@ -0,0 +1,188 @@
+# Standard library
+import json
+import os
+import secrets
+import socket
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+# OpenTelemetry-style spans for following one user action across Key Vault,
+# Blob Storage and Snowflake. Every instrument() call (admin/metrics.py) is a
+# span; page runs, button actions, CLI commands and the background
+# recalculation job are the parents, so an upload -> archive -> recalculate
+# sequence shares one trace_id. Off unless BWA_TRACE is set:
+#
+#   BWA_TRACE=console          one JSON span per line on stderr
+#   BWA_TRACE=traces.jsonl     appended to the file
+#
+# Field names follow the OTLP JSON span (trace_id, span_id, parent_span_id,
+# start/end_time_unix_nano, attributes, status). For a text waterfall:
+#
+#   python -m admin.tracing traces.jsonl [trace_id]
+
+TRACE_ENV = "BWA_TRACE"
+SERVICE_NAME = "bwa"
+
+_current: ContextVar["Span | None"] = ContextVar("trace_span", default=None)
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_span_id: str | None
+    start_time_unix_nano: int
+    end_time_unix_nano: int | None = None
+    attributes: dict = field(default_factory=dict)
+    status: dict = field(default_factory=lambda: {"code": "UNSET"})
+
+    def set_attribute(self, key: str, value) -> None:
+        if value is not None:
+            self.attributes[key] = value
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_span_id,
+            "start_time_unix_nano": self.start_time_unix_nano,
+            "end_time_unix_nano": self.end_time_unix_nano,
+            "duration_ms": (self.end_time_unix_nano - self.start_time_unix_nano) / 1e6,
+            "attributes": self.attributes,
+            "status": self.status,
+            "resource": {"service.name": SERVICE_NAME, "host.name": socket.gethostname()},
+        }
+
+
+class ConsoleExporter:
+    def export(self, span: Span) -> None:
+        print(json.dumps(span.to_dict(), default=str), file=sys.stderr, flush=True)
+
+
+class JsonlExporter:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), default=str) + "\n"
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+def _exporter_from_env():
+    target = os.getenv(TRACE_ENV, "").strip()
+    if not target or target.lower() in ("0", "false", "no"):
+        return None
+    return ConsoleExporter() if target.lower() == "console" else JsonlExporter(target)
+
+
+EXPORTER = _exporter_from_env()
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Child of the current span (or a new trace). Yields the Span, or None
+    when tracing is off. Exceptions mark it as an error; Streamlit's
+    rerun/stop control flow does not.
+    """
+    if EXPORTER is None:
+        yield None
+        return
+
+    parent = _current.get()
+    current = Span(
+        name=name,
+        trace_id=parent.trace_id if parent else secrets.token_hex(16),
+        span_id=secrets.token_hex(8),
+        parent_span_id=parent.span_id if parent else None,
+        start_time_unix_nano=time.time_ns(),
+    )
+    for key, value in attributes.items():
+        current.set_attribute(key, value)
+    token = _current.set(current)
+    try:
+        yield current
+    except Exception as e:
+        current.status = {"code": "ERROR", "message": f"{type(e).__name__}: {e}"}
+        raise
+    finally:
+        _current.reset(token)
+        current.end_time_unix_nano = time.time_ns()
+        if current.status["code"] == "UNSET":
+            current.status = {"code": "OK"}
+        EXPORTER.export(current)
+
+
+def action(name: str, **attributes):
+    """Parent span for a button (or other user) action."""
+    return span(f"action {name}", **attributes)
+
+
+def in_current_span(fn):
+    """
+    Wrap `fn` to run under the span current here, for work handed to a
+    thread or executor (context variables do not follow it otherwise).
+    """
+    parent = _current.get()
+
+    def run(*args, **kwargs):
+        token = _current.set(parent)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _current.reset(token)
+
+    return run
+
+
+# -------------------------
+# Offline waterfall
+# -------------------------
+def waterfall(spans: list[dict], width: int = 60) -> str:
+    """Text latency waterfall of one trace's spans, children under parents."""
+    if not spans:
+        return ""
+    start = min(s["start_time_unix_nano"] for s in spans)
+    total = max(s["end_time_unix_nano"] for s in spans) - start or 1
+    children: dict[str | None, list[dict]] = {}
+    ids = {s["span_id"] for s in spans}
+    for s in sorted(spans, key=lambda s: s["start_time_unix_nano"]):
+        parent = s["parent_span_id"] if s["parent_span_id"] in ids else None
+        children.setdefault(parent, []).append(s)
+
+    lines = []
+
+    def walk(parent: str | None, depth: int) -> None:
+        for s in children.get(parent, []):
+            offset = int((s["start_time_unix_nano"] - start) / total * width)
+            length = max(1, int(s["duration_ms"] * 1e6 / total * width))
+            bar = " " * offset + "█" * min(length, width - offset)
+            flag = " !" if s["status"]["code"] == "ERROR" else ""
+            lines.append(f"{bar:<{width}} {s['duration_ms']:9.1f} ms  {'  ' * depth}{s['name']}{flag}")
+            walk(s["span_id"], depth + 1)
+
+    walk(None, 0)
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit("usage: python -m admin.tracing TRACES.jsonl [trace_id]")
+    with open(sys.argv[1], encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    traces: dict[str, list[dict]] = {}
+    for record in records:
+        traces.setdefault(record["trace_id"], []).append(record)
+    selected = sys.argv[2:] or list(traces)[-5:]  # the last five traces by default
+    for trace_id in selected:
+        roots = [s["name"] for s in traces[trace_id] if not s["parent_span_id"]]
+        print(f"\ntrace {trace_id} ({', '.join(roots)})")
+        print(waterfall(traces[trace_id]))
@@ -1,8 +1,13 @@
 # Standard library
 import os
+import queue
 import re
+import threading
 import time
-from datetime import datetime
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import date, datetime
 from io import StringIO
 from textwrap import wrap
 
@@ -25,6 +30,14 @@ from dotenv import load_dotenv
 from snowflake.connector.pandas_tools import write_pandas
 from st_aggrid import AgGrid, GridOptionsBuilder
 
+# Local
+from admin.frames import compact_frame, compact_table, frame_memory
+from admin.metrics import instrument, query_label
+from admin.profiler import phase
+from admin.owners import OWNERS, OwnerProfile, current_owner, owners_for_role
+from admin.queries import REFRESH_MONTHLY_AGGREGATE_SQL
+from admin.resilience import POLICIES, STATEMENT_TIMEOUT_S, guarded, is_transient
+
 # Load env variables
 load_dotenv()
 
@@ -34,6 +47,13 @@ load_dotenv()
 # 3. update secrets in Git Hub Actions secrets 
 # 4. restart the app service
 
+
+def _azure_transport(service: str) -> dict:
+    """Azure SDK client options: our timeouts, and no SDK retries (admin/resilience.py retries)."""
+    timeout = POLICIES[service].timeout_s
+    return {"connection_timeout": timeout, "read_timeout": timeout, "retry_total": 0}
+
+
 class AzureKeyVaultClient:
     def __init__(
         self,
@@ -49,6 +69,9 @@ class AzureKeyVaultClient:
 
         self._validate_env()
 
+        self._credential: ClientSecretCredential | None = None
+        self._client: SecretClient | None = None
+
     def _validate_env(self):
         missing = [
             name
@@ -83,18 +106,33 @@ class AzureKeyVaultClient:
             st.write(e)
             raise
 
+    def credential(self) -> ClientSecretCredential:
+        """Shared credential, so its token cache survives across calls."""
+        if self._credential is None:
+            self._credential = self._authenticate()
+        return self._credential
+
     def _secret_client(self) -> SecretClient:
-        """Create a SecretClient."""
-        return SecretClient(
-            vault_url=self.vault_url,
-            credential=self._authenticate(),
-        )
+        """Create (once) and return the SecretClient."""
+        if self._client is None:
+            self._client = SecretClient(
+                vault_url=self.vault_url,
+                credential=self.credential(),
+                **_azure_transport("keyvault"),
+            )
+        return self._client
 
     def get_secret(self, secret_name: str) -> str:
         """Retrieve a secret value from Azure Key Vault."""
+
+        def fetch():
+            with instrument("keyvault", f"get_secret {secret_name}") as info:
+                value = self._secret_client().get_secret(secret_name).value
+                info["bytes"] = len(value or "")
+            return value
+
         try:
-            secret_client = self._secret_client()
-            return secret_client.get_secret(secret_name).value
+            return guarded("keyvault", fetch)
         except ClientAuthenticationError as e:
             st.write("Authentication failed while retrieving secret.")
             st.write(e)
@@ -109,6 +147,29 @@ class AzureKeyVaultClient:
             raise
 
 
+@dataclass
+class StatementResult:
+    """One statement of a SnowflakeClient.run_batch() call."""
+
+    label: str
+    sql: str
+    data: pd.DataFrame | None = None
+    rows: int = 0
+    duration_s: float = 0.0
+    query_id: str | None = None
+    error: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def dataframe(self) -> pd.DataFrame:
+        """The statement's result set; raises if it failed."""
+        if not self.ok:
+            raise RuntimeError(f"{self.label}: {self.error}")
+        return self.data
+
+
 class SnowflakeClient:
     def __init__(
         self,
@@ -117,6 +178,9 @@ class SnowflakeClient:
         database: str = "BUDGET",
         schema: str = "RAW",
         role: str = "PUBLIC",
+        pool_size: int = 4,
+        max_idle_seconds: float = 600,
+        connection_factory=None,
     ):
         self.kv = kv_client
         self.warehouse = warehouse
@@ -124,6 +188,21 @@ class SnowflakeClient:
         self.schema = schema
         self.role = role
 
+        # Idle connections as (connection, last_used) pairs, most recent first out
+        self.pool_size = pool_size
+        self.max_idle_seconds = max_idle_seconds
+        self._pool: queue.LifoQueue = queue.LifoQueue(maxsize=pool_size)
+        self._lock = threading.Lock()
+        self._credentials: dict | None = None
+        self.checked_out = 0
+
+        # Identical reads in flight, shared by every caller that asks meanwhile
+        self._inflight: dict[tuple, Future] = {}
+        self.coalesced = 0
+
+        # Stand-in backends (admin/fakes.py) replace the real connector here
+        self._connection_factory = connection_factory or self._connect
+
     # -------------------------
     # Key handling (standalone)
     # -------------------------
@@ -186,66 +265,370 @@ class SnowflakeClient:
     # -------------------------
     # Connection + queries
     # -------------------------
+    def _connection_credentials(self) -> dict:
+        """Key Vault secrets for the service user, fetched once per client."""
+        if self._credentials is None:
+            with self._lock:
+                if self._credentials is None:
+                    self._credentials = {
+                        "user": self.kv.get_secret("svc-snf-user"),
+                        "private_key": self.private_key_from_secret(
+                            self.kv.get_secret("svc-snf-rsa-key")
+                        ),
+                        "account": self.kv.get_secret("svc-snf-acc"),
+                    }
+        return self._credentials
+
     def _connect(self):
         """Create and return a Snowflake connection (internal use)."""
         try:
-            return snowflake.connector.connect(
-                user=self.kv.get_secret("svc-snf-user"),
-                private_key=self.private_key_from_secret(
-                    self.kv.get_secret("svc-snf-rsa-key")
-                ),
-                account=self.kv.get_secret("svc-snf-acc"),
-                warehouse=self.warehouse,
-                database=self.database,
-                schema=self.schema,
-                role=self.role,
-            )
+            credentials = self._connection_credentials()
+
+            def connect():
+                with instrument("snowflake", "connect"):
+                    return snowflake.connector.connect(
+                        **credentials,
+                        warehouse=self.warehouse,
+                        database=self.database,
+                        schema=self.schema,
+                        role=self.role,
+                        login_timeout=POLICIES["snowflake"].timeout_s,
+                        network_timeout=POLICIES["snowflake"].timeout_s,
+                    )
+
+            return guarded("snowflake", connect)
         except Exception as e:
+            # Secrets may have been rotated; refetch them on the next attempt
+            self._credentials = None
             st.write("Error connecting to Snowflake:")
             st.write(e)
             raise
 
-    def run_query(self, sql: str, params=None):
-        """Execute SQL and return raw rows."""
-        conn = self._connect()
+    def _acquire(self):
+        while True:
+            try:
+                conn, last_used = self._pool.get_nowait()
+            except queue.Empty:
+                conn = self._connection_factory()
+                break
+            if (
+                not conn.is_closed()
+                and time.monotonic() - last_used < self.max_idle_seconds
+            ):
+                break
+            self._close_quietly(conn)
+
+        with self._lock:
+            self.checked_out += 1
+        return conn
+
+    def _release(self, conn) -> None:
+        with self._lock:
+            self.checked_out -= 1
+
+        if conn.is_closed():
+            return
+        try:
+            self._pool.put_nowait((conn, time.monotonic()))
+        except queue.Full:
+            self._close_quietly(conn)
+
+    def prefill(self, count: int | None = None) -> int:
+        """Open connections until `count` (default: pool_size) are idle; returns the idle count."""
+        conns = []
         try:
-            with conn.cursor() as cur:
-                cur.execute(sql, params) if params else cur.execute(sql)
-                return cur.fetchall()
+            for _ in range(min(count or self.pool_size, self.pool_size)):
+                conns.append(self._acquire())
         finally:
+            for conn in conns:
+                self._release(conn)
+        return self._pool.qsize()
+
+    @staticmethod
+    def _close_quietly(conn) -> None:
+        try:
             conn.close()
+        except Exception:
+            pass
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrow a pooled connection for the duration of the block.
+        It is always returned to the pool (or closed when the pool is full),
+        so `checked_out` goes back to zero once all callers are done.
+        """
+        conn = self._acquire()
+        try:
+            yield conn
+        except Exception as e:
+            if is_transient(e):
+                # Likely a dropped session; do not hand it to the next caller
+                self._close_quietly(conn)
+            raise
+        finally:
+            self._release(conn)
+
+    def close(self) -> None:
+        """Close every idle pooled connection."""
+        while True:
+            try:
+                conn, _ = self._pool.get_nowait()
+            except queue.Empty:
+                return
+            self._close_quietly(conn)
+
+    def pool_stats(self) -> dict:
+        return {
+            "idle": self._pool.qsize(),
+            "checked_out": self.checked_out,
+            "pool_size": self.pool_size,
+            "coalesced": self.coalesced,
+        }
+
+    @staticmethod
+    def _execute(cur, sql: str, params=None, **kwargs) -> None:
+        if STATEMENT_TIMEOUT_S:
+            kwargs["timeout"] = STATEMENT_TIMEOUT_S
+        cur.execute(sql, params, **kwargs) if params else cur.execute(sql, **kwargs)
+
+    @staticmethod
+    def _flight_key(sql: str, params, *options) -> tuple | None:
+        """Key for single-flight sharing; None for anything but plain reads."""
+        text = " ".join(sql.split()).rstrip(";").strip()
+        if not re.match(r"\(*\s*(SELECT|WITH)\b", text, re.I):
+            return None
+        return (text, repr(sorted(params.items()) if isinstance(params, dict) else params), *options)
+
+    def _single_flight(self, key: tuple | None, run):
+        """
+        Run `run()` once per key at a time. Callers arriving while it is in
+        flight wait and get its result (a shallow copy for DataFrames) or its
+        exception instead of sending the same query to the warehouse.
+        """
+        if key is None:
+            return run()
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = Future()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            result = flight.result()
+            return result.copy(deep=False) if isinstance(result, pd.DataFrame) else list(result)
 
-    def run_query_df(self, sql: str, params=None) -> pd.DataFrame:
-        """Execute SQL and return a pandas DataFrame."""
-        conn = self._connect()
         try:
-            with conn.cursor() as cur:
-                cur.execute(sql, params) if params else cur.execute(sql)
-                return pd.DataFrame.from_records(
+            result = run()
+        except BaseException as e:
+            flight.set_exception(e)
+            raise
+        else:
+            flight.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    def run_query(self, sql: str, params=None, label: str | None = None):
+        """Execute SQL and return raw rows; reads are retried on transient errors."""
+        key = self._flight_key(sql, params, "rows")
+
+        def run():
+            with self.connection() as conn:
+                with conn.cursor() as cur, instrument(
+                    "snowflake", label or query_label(sql)
+                ) as info:
+                    self._execute(cur, sql, params)
+                    rows = cur.fetchall()
+                    info.update(rows=len(rows), query_id=cur.sfqid)
+                    return rows
+
+        return self._single_flight(key, lambda: guarded("snowflake", run, idempotent=key is not None))
+
+    def run_query_df(
+        self, sql: str, params=None, label: str | None = None, compact: bool = False
+    ) -> pd.DataFrame:
+        """
+        Execute SQL and return a pandas DataFrame.
+
+        With compact=True the frame is Arrow-backed and memory-optimized
+        (see admin/frames.py); use it for results that are displayed or
+        passed along rather than computed on. Reads are retried on
+        transient errors (admin/resilience.py).
+        """
+        key = self._flight_key(sql, params, "df", compact)
+
+        def run():
+            with self.connection() as conn:
+                with conn.cursor() as cur, instrument(
+                    "snowflake", label or query_label(sql)
+                ) as info:
+                    self._execute(cur, sql, params)
+                    return self._fetch_df(cur, info, compact)
+
+        return self._single_flight(key, lambda: guarded("snowflake", run, idempotent=key is not None))
+
+    def iter_batches(self, sql: str, params=None, label: str | None = None):
+        """
+        Execute SQL and yield the result as DataFrames, one per result batch
+        (cursor.fetch_pandas_batches), so a large result is never held in
+        memory at once. The pooled connection is held until the generator
+        is exhausted or closed.
+        """
+        with self.connection() as conn:
+            with conn.cursor() as cur, instrument(
+                "snowflake", label or query_label(sql)
+            ) as info:
+                guarded("snowflake", lambda: self._execute(cur, sql, params), idempotent=False)
+                info.update(rows=0, bytes=0, query_id=cur.sfqid)
+                for batch in cur.fetch_pandas_batches():
+                    info["rows"] += len(batch)
+                    info["bytes"] += frame_memory(batch)
+                    yield batch
+
+    @staticmethod
+    def _fetch_df(cur, info: dict, compact: bool = False) -> pd.DataFrame:
+        with phase("dataframe"):
+            if compact and hasattr(cur, "fetch_arrow_all"):
+                # Arrow result batches straight from the connector, no Python rows
+                df = compact_table(cur.fetch_arrow_all(force_return_table=True))
+            else:
+                df = pd.DataFrame.from_records(
                     cur.fetchall(),
-                    columns=[c[0] for c in cur.description],
+                    columns=[c[0] for c in cur.description or ()],
                 )
-        finally:
-            conn.close()
+                if compact:
+                    df = compact_frame(df)
+        info.update(rows=len(df), bytes=frame_memory(df), query_id=cur.sfqid)
+        return df
+
+    @staticmethod
+    def _batch_text(statements: dict[str, str], params: dict[str, dict]) -> tuple[str, dict]:
+        """
+        Join statements into one multi-statement request. Bound names are
+        prefixed per statement (s0_owner, s1_owner, ...) so each keeps its own
+        values; with any binding present, literal % in unbound statements is
+        escaped as the connector would otherwise read it as a placeholder.
+        """
+        texts, bound = [], {}
+        for i, (label, sql) in enumerate(statements.items()):
+            sql = sql.strip().rstrip(";")
+            values = params.get(label)
+            if values is not None and not isinstance(values, dict):
+                raise ValueError(f"Batch parameters must be a dict: {label}")
+            if values:
+                sql = re.sub(r"%\((\w+)\)s", rf"%(s{i}_\1)s", sql)
+                bound.update({f"s{i}_{k}": v for k, v in values.items()})
+            texts.append(sql)
+        if bound:
+            texts = [
+                t if params.get(label) else t.replace("%", "%%")
+                for label, t in zip(statements, texts)
+            ]
+        return ";\n".join(texts), bound
+
+    def run_batch(
+        self,
+        statements: dict[str, str],
+        params: dict[str, dict] | None = None,
+        label: str | None = None,
+        compact: bool | tuple[str, ...] = False,
+    ) -> dict[str, StatementResult]:
+        """
+        Execute several statements in one round trip and return a
+        StatementResult per label, in order.
+
+        Snowflake runs the statements in sequence and stops at the first
+        failure: that statement carries the error, the ones after it are
+        marked not executed. When the failure surfaces before any result set
+        is read, the error is reported on every statement that was not
+        confirmed. Durations are time to result on the client, so the first
+        statement includes the request itself; query_id links each one to
+        QUERY_HISTORY for server-side timings.
+
+        `compact` applies run_query_df(compact=True) to every result set, or
+        only to the listed labels.
+        """
+        results = {
+            name: StatementResult(label=name, sql=sql, error="not executed")
+            for name, sql in statements.items()
+        }
+        if not statements:
+            return results
+        sql, bound = self._batch_text(statements, params or {})
+
+        with self.connection() as conn, conn.cursor() as cur, instrument(
+            "snowflake", label or f"batch[{len(statements)}]"
+        ) as batch_info:
+            pending = iter(results.values())
+            result = next(pending)
+            start = time.perf_counter()
+            try:
+                guarded(
+                    "snowflake",
+                    lambda: self._execute(cur, sql, bound, num_statements=len(statements)),
+                    idempotent=False,
+                )
+            except Exception as e:
+                for r in results.values():
+                    r.error = f"batch failed: {e}"
+                batch_info["query_id"] = cur.sfqid
+                return results
+            batch_info["query_id"] = cur.sfqid
+
+            while result is not None:
+                try:
+                    with instrument("snowflake", result.label) as info:
+                        wanted = compact if isinstance(compact, bool) else result.label in compact
+                        result.data = self._fetch_df(cur, info, wanted)
+                except Exception as e:
+                    result.error = str(e)
+                    break
+                result.error = None
+                result.rows = info["rows"]
+                result.query_id = info["query_id"]
+                result.duration_s = time.perf_counter() - start
+
+                result = next(pending, None)
+                start = time.perf_counter()
+                if result is not None:
+                    try:
+                        if cur.nextset() is None:
+                            break
+                    except Exception as e:
+                        result.error = str(e)
+                        break
+
+            batch_info["rows"] = sum(r.rows for r in results.values())
+        return results
 
     def sf_write_pandas(self, df: pd.DataFrame, table_name: str, schema: str = "CORE") -> tuple[bool, int, int]:
-        conn = self._connect()
         try:
-            # Common return: (success, nchunks, nrows, output)
-            success, nchunks, nrows, *_ = write_pandas(
-                conn=conn,
-                df=df,
-                table_name=table_name,
-                database=self.database,
-                schema=schema,
-            )
+            with self.connection() as conn, instrument(
+                "snowflake", f"write_pandas {schema}.{table_name}"
+            ) as info:
+                info["bytes"] = int(df.memory_usage(deep=True).sum())
+                # Common return: (success, nchunks, nrows, output)
+                success, nchunks, nrows, *_ = guarded(
+                    "snowflake",
+                    lambda: write_pandas(
+                        conn=conn,
+                        df=df,
+                        table_name=table_name,
+                        database=self.database,
+                        schema=schema,
+                    ),
+                    idempotent=False,
+                )
+                info["rows"] = int(nrows)
             return bool(success), int(nchunks), int(nrows)
         except Exception as e:
             st.write("Error writing DataFrame to Snowflake:")
             st.write(e)
             return False, 0, 0
-        finally:
-            conn.close()
 
 # # Function to insert DataFrame back into Snowflake
 # def insert_data(df):
@@ -259,6 +642,10 @@ class SnowflakeClient:
 
 
 
+class UploadError(RuntimeError):
+    """An upload to the input folder failed; the message is shown to the user."""
+
+
 class AzureBlobUploader:
     def __init__(
         self,
@@ -266,46 +653,67 @@ class AzureBlobUploader:
         container: str = "snfdb",
         input_folder: str = "peter/inputs/",
         processed_folder: str = "peter/processed_files/",
+        archive_keywords: tuple[str, ...] = ("pohyby", "account-statement"),
+        hierarchy_blob: str = "peter/inputs/input_hierarchy_peter.csv",
+        container_client=None,
     ):
         self.kv = kv_client
         self.container = container
         self.input_folder = input_folder
         self.processed_folder = processed_folder
+        self.archive_keywords = archive_keywords
+        self.hierarchy_blob = hierarchy_blob
+
+        if container_client is not None:
+            # e.g. admin.fakes.LocalContainerClient for offline runs
+            self.container_client = container_client
+            return
 
         self.blob_service_client = BlobServiceClient(
             account_url=self.kv.get_secret("sc-storage"),
-            credential=self.kv._authenticate(),
+            credential=self.kv.credential(),
+            **_azure_transport("blob"),
         )
         self.container_client = self.blob_service_client.get_container_client(
             container=self.container
         )
 
     def upload_file(self, file, filename: str) -> str:
+        """Upload to the input folder; returns a confirmation, raises UploadError on failure."""
         try:
             self._archive_existing_file(filename)
 
             full_blob_name = f"{self.input_folder}{filename}"
             file_data = file.read()
 
-            self.container_client.upload_blob(
-                name=full_blob_name,
-                data=file_data,
-                overwrite=True,
-            )
+            def upload():
+                with instrument("blob", "upload_file") as info:
+                    info["bytes"] = len(file_data)
+                    self.container_client.upload_blob(
+                        name=full_blob_name,
+                        data=file_data,
+                        overwrite=True,
+                    )
+
+            guarded("blob", upload)
 
             return f"File {filename} uploaded successfully to '{self.input_folder}'!"
 
         except Exception as e:
-            return f"Error uploading file: {e}"
+            raise UploadError(f"Error uploading file {filename}: {e}") from e
 
     def _archive_existing_file(self, filename: str) -> None:
         file_keyword = self._extract_keyword(filename)
         if not file_keyword:
             return
 
-        existing_blobs = self.container_client.list_blobs(
-            name_starts_with=self.input_folder
-        )
+        def list_inputs():
+            with instrument("blob", "list_inputs") as info:
+                blobs = list(self.container_client.list_blobs(name_starts_with=self.input_folder))
+                info["rows"] = len(blobs)
+            return blobs
+
+        existing_blobs = guarded("blob", list_inputs)
 
         for blob in existing_blobs:
             if file_keyword in blob.name:
@@ -319,55 +727,122 @@ class AzureBlobUploader:
         source_client = self.container_client.get_blob_client(source_blob)
         target_client = self.container_client.get_blob_client(target_blob)
 
-        target_client.start_copy_from_url(source_client.url)
-        self.container_client.delete_blob(source_blob)
+        def move():
+            with instrument("blob", "move_to_processed"):
+                target_client.start_copy_from_url(source_client.url)
+                self.container_client.delete_blob(source_blob)
+
+        # A retried copy is harmless; the delete only runs once the copy succeeded
+        guarded("blob", move)
 
     def export_hierarchy_csv(
         self,
         df_update: pd.DataFrame,
-        blob_path: str = "peter/inputs/input_hierarchy_peter.csv",
+        blob_path: str | None = None,
         delimiter: str = ";",
     ) -> bool:
         """
         Download existing hierarchy CSV from Azure Blob,
         append new rows, and upload it back.
 
-        Returns True if export was performed, False otherwise.
+        Returns True if export was performed, False otherwise; raises
+        UploadError on failure.
         """
 
         if df_update.empty:
             return False
 
-        blob_client = self.container_client.get_blob_client(blob_path)
+        blob_path = blob_path or self.hierarchy_blob
+        try:
+            blob_client = self.container_client.get_blob_client(blob_path)
+
+            # Download existing CSV
+            def download():
+                with instrument("blob", "download_hierarchy") as info:
+                    data = blob_client.download_blob().content_as_text()
+                    info["bytes"] = len(data)
+                return data
+
+            blob_data = guarded("blob", download)
+            df_existing = pd.read_csv(StringIO(blob_data), delimiter=delimiter)
+
+            # Normalize columns
+            df_existing.columns = df_existing.columns.str.upper()
 
-        # Download existing CSV
-        blob_data = blob_client.download_blob().content_as_text()
-        df_existing = pd.read_csv(StringIO(blob_data), delimiter=delimiter)
+            df_update = df_update[
+                ["PROD_HIERARCHY_ID", "L1", "L2", "L3", "LOAD_DATETIME"]
+            ].rename(columns={"LOAD_DATETIME": "AZURE_INSERT_DATETIME"})
 
-        # Normalize columns
-        df_existing.columns = df_existing.columns.str.upper()
+            df_update.columns = df_existing.columns
 
-        df_update = df_update[
-            ["PROD_HIERARCHY_ID", "L1", "L2", "L3", "LOAD_DATETIME"]
-        ].rename(columns={"LOAD_DATETIME": "AZURE_INSERT_DATETIME"})
+            # Combine
+            df_combined = pd.concat([df_existing, df_update], ignore_index=True)
 
-        df_update.columns = df_existing.columns
+            # Upload back to Azure
+            csv_buffer = StringIO()
+            df_combined.to_csv(csv_buffer, index=False, sep=delimiter)
 
-        # Combine
-        df_combined = pd.concat([df_existing, df_update], ignore_index=True)
+            def upload():
+                with instrument("blob", "upload_hierarchy") as info:
+                    payload = csv_buffer.getvalue()
+                    info.update(rows=len(df_combined), bytes=len(payload))
+                    blob_client.upload_blob(payload, overwrite=True)
 
-        # Upload back to Azure
-        csv_buffer = StringIO()
-        df_combined.to_csv(csv_buffer, index=False, sep=delimiter)
+            guarded("blob", upload)
 
-        blob_client.upload_blob(csv_buffer.getvalue(), overwrite=True)
+            return True
 
-        return True
+        except Exception as e:
+            raise UploadError(f"Error exporting hierarchy to {blob_path}: {e}") from e
     
-    @staticmethod
-    def _extract_keyword(filename: str) -> str | None:
-        if "pohyby" in filename:
-            return "pohyby"
-        if "account-statement" in filename:
-            return "account-statement"
-        return None
\ No newline at end of file
+    def _extract_keyword(self, filename: str) -> str | None:
+        for keyword in self.archive_keywords:
+            if keyword in filename:
+                return keyword
+        return None
+
+
+# -------------------------
+# Shared clients
+# -------------------------
+# Page scripts rerun on every interaction; these factories keep one client
+# (and so one connection pool / blob client) per process instead.
+
+RECALCULATION_PROCEDURES = {
+    "Truncate RAW schema": "CALL BUDGET.RAW.TRUNCATE_RAW_TABLES();",
+    "RAW procedure [REVOLUT]": "CALL BUDGET.RAW.COPY_FILES_TO_RAW_REVOLUT();",
+    "RAW procedure [CSOB]": "CALL BUDGET.RAW.COPY_FILES_TO_RAW_CSOB();",
+    "RAW procedure [HIERARCHY]": "CALL BUDGET.RAW.COPY_FILES_TO_HIERARCHY();",
+    "CORE procedure [REVOLUT]": "CALL BUDGET.CORE.RAW2CORE_REV();",
+    "CORE procedure [CSOB]": "CALL BUDGET.CORE.RAW2CORE_CSOB();",
+    "CORE procedure [HIERARCHY]": "CALL BUDGET.CORE.RAW2CORE_HIERARCHY();",
+    "CORE procedure [C2C MANUAL ADJUSTMENTS]": "CALL BUDGET.CORE.CORE2CORE_MANUAL_ADJ();",
+    "MART aggregate [MONTHLY]": REFRESH_MONTHLY_AGGREGATE_SQL,
+}
+
+
+@st.cache_resource
+def get_kv_client() -> AzureKeyVaultClient:
+    return AzureKeyVaultClient()
+
+
+@st.cache_resource
+def get_snowflake_client() -> SnowflakeClient:
+    return SnowflakeClient(kv_client=get_kv_client())
+
+
+@st.cache_resource
+def get_blob_uploader(owner: str) -> AzureBlobUploader:
+    profile = OWNERS[owner]
+    return AzureBlobUploader(
+        kv_client=get_kv_client(),
+        input_folder=profile.input_folder,
+        processed_folder=profile.processed_folder,
+        archive_keywords=profile.archive_keywords,
+        hierarchy_blob=profile.hierarchy_blob,
+    )
+
+@st.cache_resource
+def get_background_executor() -> ThreadPoolExecutor:
+    """Small shared pool for prefetching data a page is likely to need next."""
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="prefetch")
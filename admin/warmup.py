@@ -0,0 +1,206 @@
+# Standard library
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local
+from admin.datasets import DATASETS
+from admin.owners import OWNERS
+from admin.tracing import span
+from admin.utils import get_blob_uploader, get_snowflake_client
+
+# Boot warm-up, so the first user after a deploy or restart does not pay for
+# Key Vault auth, the Snowflake handshake, warehouse resume and the dashboard
+# queries. Steps run once per process in a background thread:
+#
+#   secrets    Key Vault credential + Snowflake service-user secrets
+#   pool       SnowflakeClient.prefill(): pool_size open connections
+#   warehouse  SELECT 1, which resumes a suspended warehouse
+#   blob       one blob client per owner
+#   datasets   the shared dashboard datasets, and per owner those its pages read
+#
+# It starts with `python -m admin serve` (before Streamlit accepts
+# connections), with the first page run, or via GET /warmup. With
+# BWA_HEALTH_PORT set, a small HTTP server answers
+#
+#   /livez   200 while the process is up
+#   /readyz  200 once warm-up succeeded, 503 before or after a failure
+#   /warmup  starts warm-up if it is not running or done; 202 + state
+#
+# That listener is for local runs and sidecars on the same host only: App
+# Service routes nothing but the app port (8000), so its health check must
+# use Streamlit's own /_stcore/health there, which reports liveness only.
+
+HEALTH_PORT_ENV = "BWA_HEALTH_PORT"
+
+# Datasets behind the dashboard pages, see admin/owner_data.py and admin/classify.py
+WARM_DATASETS = ("monthly_totals_all",)
+# Per-owner datasets by the page (OwnerPage.path) that reads them; an owner
+# only warms what its own pages in OWNERS will ask for
+WARM_PAGE_DATASETS = {
+    "admin/admin_1.py": ("classification_suggestions",),
+}
+
+
+def owner_datasets(owner: str) -> list[str]:
+    """Per-owner datasets read by `owner`'s pages, in page order."""
+    names = (name for page in OWNERS[owner].pages for name in WARM_PAGE_DATASETS.get(page.path, ()))
+    return list(dict.fromkeys(names))
+
+
+def warm_datasets(owners: list[str]) -> tuple[list[dict], dict[str, str]]:
+    """Load the shared datasets (all owners, then per owner); returns (warmed, failed)."""
+    from admin import classify, owner_data  # noqa: F401  (register the datasets)
+
+    targets = [(name, {}) for name in WARM_DATASETS]
+    targets += [(name, {"owner": o}) for o in owners for name in owner_datasets(o)]
+    warmed, failed = [], {}
+    for name, params in targets:
+        start = time.perf_counter()
+        try:
+            value = DATASETS.get(name, **params)
+        except Exception as e:
+            failed[f"{name} {params.get('owner', '')}".strip()] = f"{type(e).__name__}: {e}"
+            continue
+        warmed.append(
+            {
+                "dataset": name,
+                **params,
+                "rows": len(value),
+                "ms": round((time.perf_counter() - start) * 1000, 1),
+            }
+        )
+    return warmed, failed
+
+
+class Warmup:
+    def __init__(self):
+        self.state = "pending"  # pending -> warming -> ready | failed
+        self.steps: list[dict] = []
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self.error: str | None = None
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "state": self.state,
+                "steps": list(self.steps),
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "duration_s": (self.finished_at or time.time()) - self.started_at
+                if self.started_at
+                else None,
+                "error": self.error,
+            }
+
+    def start(self) -> bool:
+        """Run warm-up in the background unless it is running or done; True if started."""
+        with self._lock:
+            if self.state in ("warming", "ready"):
+                return False
+            self.state, self.steps, self.error = "warming", [], None
+            self.started_at, self.finished_at = time.time(), None
+            self._thread = threading.Thread(target=self.run, name="warmup", daemon=True)
+        self._thread.start()
+        return True
+
+    def _step(self, name: str, fn) -> None:
+        start = time.perf_counter()
+        detail = fn()
+        with self._lock:
+            self.steps.append(
+                {
+                    "step": name,
+                    "ms": round((time.perf_counter() - start) * 1000, 1),
+                    "detail": detail,
+                }
+            )
+
+    def run(self) -> None:
+        snf = get_snowflake_client()
+        try:
+            with span("warmup"):
+                self._step("secrets", lambda: bool(snf._connection_credentials()))
+                self._step("pool", snf.prefill)
+                self._step("warehouse", lambda: snf.run_query("SELECT 1", label="warmup")[0][0])
+                self._step("blob", lambda: len([get_blob_uploader(owner) for owner in OWNERS]))
+                warmed, failed = warm_datasets(list(OWNERS))
+                with self._lock:
+                    self.steps.append(
+                        {"step": "datasets", "ms": sum(w["ms"] for w in warmed), "detail": warmed}
+                    )
+                if failed:
+                    raise RuntimeError(f"datasets failed: {failed}")
+        except Exception as e:
+            with self._lock:
+                self.state, self.error = "failed", f"{type(e).__name__}: {e}"
+        else:
+            with self._lock:
+                self.state = "ready"
+        finally:
+            with self._lock:
+                self.finished_at = time.time()
+
+
+WARMUP = Warmup()
+
+
+# -------------------------
+# Health endpoints
+# -------------------------
+class _HealthHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        path = self.path.split("?")[0].rstrip("/")
+        if path == "/livez":
+            self._reply(200, {"status": "alive"})
+        elif path == "/readyz":
+            self._reply(200 if WARMUP.ready else 503, WARMUP.snapshot())
+        elif path == "/warmup":
+            WARMUP.start()
+            self._reply(200 if WARMUP.ready else 202, WARMUP.snapshot())
+        else:
+            self._reply(404, {"error": "not found"})
+
+    def _reply(self, code: int, body: dict) -> None:
+        payload = json.dumps(body, default=str).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass  # probes every few seconds; keep them out of the app log
+
+
+_server_lock = threading.Lock()
+_server: ThreadingHTTPServer | None = None
+
+
+def start_health_server(port: int | None = None) -> ThreadingHTTPServer | None:
+    """Serve the health endpoints on `port` (default BWA_HEALTH_PORT) once per process."""
+    global _server
+    port = port or int(os.getenv(HEALTH_PORT_ENV, "0"))
+    if not port:
+        return None
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer(("0.0.0.0", port), _HealthHandler)
+            threading.Thread(target=_server.serve_forever, name="health", daemon=True).start()
+    return _server
+
+
+def start() -> None:
+    """Health endpoints (if configured) plus a first warm-up; safe to call on every run."""
+    start_health_server()
+    if WARMUP.state == "pending":  # a failed warm-up is retried via /warmup
+        WARMUP.start()
@@ -0,0 +1,171 @@
+"""
+Offline benchmarks for the data access layer.
+
+Runs SnowflakeClient, AzureBlobUploader and the dashboard query set against
+the stand-ins in admin/fakes.py at several data sizes and prints one JSON
+line per benchmark, tagged with the current git commit:
+
+    pip install -r requirements-dev.txt
+    python -m benchmarks.run                       # 1k, 100k and 1M transactions
+    python -m benchmarks.run --sizes 1000 --runs 3 >> bench_output.txt
+"""
+
+# Standard library
+import argparse
+import datetime as dt
+import io
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Third-party
+import pandas as pd
+
+# Local
+from admin.fakes import fake_blob_uploader, fake_snowflake_client, seed_database
+from admin.grid import KeysetPager
+from admin.metrics import percentile
+from admin.owners import OWNERS
+from admin.queries import DRILLDOWN_SQL, MONTHLY_AGGREGATE_TABLE, MONTHLY_TOTALS_SQL
+
+DEFAULT_SIZES = (1_000, 100_000, 1_000_000)
+
+# The dashboards derive category counts from the monthly totals
+# (admin/owner_data.py); this direct read of the aggregate is the baseline
+# that derivation is compared against.
+CATEGORY_COUNTS_SQL = f"""
+    SELECT
+        L1,
+        SUM(TRANSACTIONS) as TRANSACTIONS
+    FROM {MONTHLY_AGGREGATE_TABLE}
+    WHERE OWNER = %(owner)s AND L1 IS NOT NULL
+    GROUP BY L1
+    ORDER BY TRANSACTIONS DESC
+"""
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def measure(fn, runs: int) -> tuple[list[float], object]:
+    """Call fn once to warm up, then `runs` times; returns timings (s) and the last result."""
+    result = fn()
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return timings, result
+
+
+def report(name: str, size: int, timings: list[float], rows: int | None, commit: str | None) -> dict:
+    p50 = statistics.median(timings)
+    return {
+        "benchmark": name,
+        "transactions": size,
+        "runs": len(timings),
+        "p50_ms": round(p50 * 1000, 3),
+        "p95_ms": round(percentile(timings, 0.95) * 1000, 3),
+        "max_ms": round(max(timings) * 1000, 3),
+        "rows": rows,
+        "rows_per_s": round(rows / p50) if rows and p50 else None,
+        "commit": commit,
+    }
+
+
+def snowflake_benchmarks(size: int):
+    db = seed_database(size)
+    snf = fake_snowflake_client(db=db)
+    owner = OWNERS["Peter"]
+    today = dt.date.today()
+    year = (dt.date(today.year, 1, 1), dt.date(today.year + 1, 1, 1))
+    pager = KeysetPager(snf)
+    columns = ["TRANSACTION_DATE", "DESCRIPTION", "L1", "AMOUNT"]
+    filters = [("OWNER", "=", owner.name)]
+
+    def deep_page():
+        # Walk five pages in to show keyset cost does not grow with depth
+        after = None
+        for _ in range(5):
+            page = pager.fetch_page(columns, filters, True, after, 100)
+            if len(page) <= 100:
+                break
+            last = page.iloc[99]
+            after = (last["TRANSACTION_DATE"], last["TRANSACTION_HK"])
+        return page
+
+    yield "snowflake.select_1", lambda: snf.run_query("SELECT 1")
+    yield "snowflake.full_mart_df", lambda: snf.run_query_df(
+        "SELECT * FROM BUDGET.MART.BUDGET WHERE OWNER = %(owner)s", {"owner": owner.name}
+    )
+    yield "dashboard.monthly_totals", lambda: snf.run_query_df(
+        MONTHLY_TOTALS_SQL, {"owners": list(OWNERS)}
+    )
+    yield "dashboard.category_counts", lambda: snf.run_query_df(
+        CATEGORY_COUNTS_SQL, {"owner": owner.name}
+    )
+    yield "dashboard.drilldown", lambda: snf.run_query_df(
+        DRILLDOWN_SQL, {"owner": owner.name, "category": "Food", "start": year[0], "end": year[1]}
+    )
+    yield "dashboard.grid_first_page", lambda: pager.fetch_page(columns, filters, True, None, 100)
+    yield "dashboard.grid_fifth_page", deep_page
+
+
+def blob_benchmarks(size: int):
+    root = tempfile.mkdtemp(prefix="bwa-bench-")
+    abl = fake_blob_uploader(root)
+    # Statement files grow with history: ~100 bytes per transaction line
+    statement = b"x" * min(size * 100, 50_000_000)
+    # Hierarchy holds ~1 mapping per 50 transactions; each export appends 20 more
+    existing = pd.DataFrame(
+        {
+            "PROD_HIERARCHY_ID": [f"MERCHANT {i}" for i in range(max(size // 50, 1))],
+            "L1": "Food", "L2": "Groceries", "L3": None,
+            "AZURE_INSERT_DATETIME": dt.datetime.now(),
+        }
+    )
+    update = existing.head(20).rename(columns={"AZURE_INSERT_DATETIME": "LOAD_DATETIME"})
+    counter = iter(range(10**9))
+
+    def export_hierarchy():
+        abl.container_client.upload_blob(
+            abl.hierarchy_blob, existing.to_csv(sep=";", index=False), overwrite=True
+        )
+        abl.export_hierarchy_csv(update)
+
+    yield "blob.upload_file", lambda: abl.upload_file(
+        io.BytesIO(statement), f"pohyby_{next(counter)}.csv"
+    )
+    yield "blob.export_hierarchy_csv", export_hierarchy
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--only", help="run benchmarks whose name starts with this prefix")
+    args = parser.parse_args(argv)
+
+    commit = _git_commit()
+    for size in args.sizes:
+        for suite in (snowflake_benchmarks, blob_benchmarks):
+            for name, fn in suite(size):
+                if args.only and not name.startswith(args.only):
+                    continue
+                timings, result = measure(fn, args.runs)
+                rows = len(result) if hasattr(result, "__len__") and not isinstance(result, str) else None
+                print(json.dumps(report(name, size, timings, rows, commit)), flush=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
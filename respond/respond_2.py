@@ -1,145 +1,99 @@
-import streamlit as st
-from azure.storage.blob import BlobServiceClient
-import os
-from azure.identity import ClientSecretCredential
-from azure.keyvault.secrets import SecretClient
-from dotenv import load_dotenv
-import snowflake.connector
-import pandas as pd
-from snowflake.connector.pandas_tools import write_pandas
-
-load_dotenv()
-from st_aggrid import AgGrid, GridOptionsBuilder  # add import for GridOptionsBuilder
-import matplotlib.pyplot as plt
-import seaborn as sns
-import matplotlib.ticker as ticker
-import altair as alt
-
-
-# Azure Key Vault
-client_id = os.getenv("AZURE_CLIENT_ID")
-tenant_id = os.getenv("AZURE_TENANT_ID")
-client_secret = os.getenv("AZURE_CLIENT_SECRET")
-vault_url = os.getenv("AZURE_VAULT_URL")
-
-# Create a credential object
-credentials = ClientSecretCredential(
-    client_id=client_id, tenant_id=tenant_id, client_secret=client_secret
-)
-
-
-# Function to get secrets from Azure Key Vault
-def secrets_get(secret_name):
-    secret_client = SecretClient(vault_url=vault_url, credential=credentials)
-    secret = secret_client.get_secret(secret_name)
-    return secret.value
-
-
-# Snowflake connection
-conn = snowflake.connector.connect(
-    user=secrets_get("snf-user-app"),
-    password=secrets_get("snf-password-app"),
-    account=secrets_get("snf-account"),
-    warehouse="COMPUTE_WH",
-    database="BUDGET",
-    schema="RAW",
-    role="PUBLIC",
-)
+from admin.utils import *
+from admin.charts import altair_chart, downsample
+from admin.grid import transaction_grid
+from admin.owner_data import monthly_totals
+from admin import periods
+from admin.export import export_panel
 
+OWNER = current_owner()
 
-cur = conn.cursor()
+snf = get_snowflake_client()
 
-# Query to fetch data from Snowflake
-query = "Select * from BUDGET.MART.BUDGET where owner = 'Jan' and TRANSACTION_HK <> '0d5b5bccddb88ab98eac67945c00c1f1'"
-
-# Load data into Pandas DataFrame
-data = pd.read_sql(query, conn)
+# Slice of the shared monthly totals (fetched once for all owners)
+monthly = monthly_totals(OWNER)
+last_12_months = monthly[
+    periods.last_n_months(12).mask(monthly["TRANSACTION_MONTH"]) & ~monthly["EXCLUDED"]
+]
 
 # Display the DataFrame using Streamlit
-st.title("Jans Budget Data Viewer")
+st.title(f"{OWNER.name}'s Budget Data Viewer")
 # AgGrid(data, height=400)
 
 with st.container(border=True):
     st.write("Chart of Monthly Expenses (No Income Included)")
-    data_chart = pd.read_sql(
-        """Select 
-        REPORTING_DATE,
-        L1,
-        ABS(SUM(AMOUNT)) as AMOUNT FROM BUDGET.MART.BUDGET
-        WHERE L1 <> 'Prijem' and transaction_date >= date_trunc(month,dateadd(month,-12,current_date)) and OWNER = 'Jan'
-        and TRANSACTION_HK <> '0d5b5bccddb88ab98eac67945c00c1f1'
-        GROUP BY ALL;""",
-        conn,
-    )
+    expenses = last_12_months[
+        last_12_months["L1"].notna()
+        & (last_12_months["L1"] != OWNER.income_category)
+    ]
+    data_chart = expenses.groupby(["REPORTING_DATE", "L1"], as_index=False)["AMOUNT"].sum()
+    data_chart["AMOUNT"] = data_chart["AMOUNT"].abs()
 
     # Create an Altair bar chart
-    chart = (
-        alt.Chart(data_chart)
-        .mark_bar(size=25)
-        .encode(x="REPORTING_DATE:T", y="AMOUNT:Q", color="L1:N")
-        .properties(
-            width=600,  # Set the width of the chart
-            height=400,  # Set the height of the chart
-        )
-        .configure_axis(
-            labelFontSize=14,  # Adjust axis label size
-            titleFontSize=16,  # Adjust axis title size
-        )
-        .configure_legend(
-            titleFontSize=16,  # Adjust legend title size
-            labelFontSize=14,  # Adjust legend label size
-        )
+    altair_chart(
+        "respond_2.monthly_expenses",
+        data_chart,
+        lambda d: (
+            alt.Chart(d)
+            .mark_bar(size=25)
+            .encode(x="REPORTING_DATE:T", y="AMOUNT:Q", color="L1:N")
+            .properties(
+                width=600,  # Set the width of the chart
+                height=400,  # Set the height of the chart
+            )
+            .configure_axis(
+                labelFontSize=14,  # Adjust axis label size
+                titleFontSize=16,  # Adjust axis title size
+            )
+            .configure_legend(
+                titleFontSize=16,  # Adjust legend title size
+                labelFontSize=14,  # Adjust legend label size
+            )
+        ),
+        x="REPORTING_DATE",
+        y="AMOUNT",
+        color="L1",
     )
 
-    # Display the chart in Streamlit
-    st.altair_chart(chart, use_container_width=True)
-
 
 with st.container(border=True):
     st.write("Chart of Monthly Income Sources")
-    data_chart_incom = pd.read_sql(
-        """Select SUM(amount) as INCOME,
-                             L2 as TYPE_OF_INCOME, 
-                             REPORTING_DATE from BUDGET.MART.BUDGET 
-                             where owner = 'Jan' and L1 = 'Prijem'
-                             group by all;""",
-        conn,
+    data_chart_incom = (
+        monthly[monthly["L1"] == OWNER.income_category]
+        .groupby(["L2", "REPORTING_DATE"], as_index=False, dropna=False)["AMOUNT"]
+        .sum()
+        .rename(columns={"AMOUNT": "INCOME", "L2": "TYPE_OF_INCOME"})
     )
 
     # Create an Altair bar chart
-    chart = (
-        alt.Chart(data_chart_incom)
-        .mark_bar(size=25)
-        .encode(x="REPORTING_DATE:T", y="INCOME:Q", color="TYPE_OF_INCOME:N")
-        .properties(
-            width=600,  # Set the width of the chart
-            height=400,  # Set the height of the chart
-        )
-        .configure_axis(
-            labelFontSize=14,  # Adjust axis label size
-            titleFontSize=16,  # Adjust axis title size
-        )
-        .configure_legend(
-            titleFontSize=16,  # Adjust legend title size
-            labelFontSize=14,  # Adjust legend label size
-        )
+    altair_chart(
+        "respond_2.monthly_income",
+        data_chart_incom,
+        lambda d: (
+            alt.Chart(d)
+            .mark_bar(size=25)
+            .encode(x="REPORTING_DATE:T", y="INCOME:Q", color="TYPE_OF_INCOME:N")
+            .properties(
+                width=600,  # Set the width of the chart
+                height=400,  # Set the height of the chart
+            )
+            .configure_axis(
+                labelFontSize=14,  # Adjust axis label size
+                titleFontSize=16,  # Adjust axis title size
+            )
+            .configure_legend(
+                titleFontSize=16,  # Adjust legend title size
+                labelFontSize=14,  # Adjust legend label size
+            )
+        ),
+        x="REPORTING_DATE",
+        y="INCOME",
+        color="TYPE_OF_INCOME",
     )
 
-    # Display the chart in Streamlit
-    st.altair_chart(chart, use_container_width=True)
-
 with st.container(border=True):
     st.write("Chart of Monthly P&L")
 
-    data_chart_2 = pd.read_sql(
-        """Select 
-        REPORTING_DATE,
-        SUM(AMOUNT) as AMOUNT FROM BUDGET.MART.BUDGET
-        WHERE transaction_date >= date_trunc(month,dateadd(month,-12,current_date)) and OWNER = 'Jan' 
-        AND TRANSACTION_HK <> '0d5b5bccddb88ab98eac67945c00c1f1'
-        GROUP BY ALL;""",
-        conn,
-    )
+    data_chart_2 = last_12_months.groupby("REPORTING_DATE", as_index=False)["AMOUNT"].sum()
 
     # Add a color column based on the AMOUNT value
     data_chart_2["color"] = data_chart_2["AMOUNT"].apply(
@@ -147,40 +101,57 @@ with st.container(border=True):
     )
 
     # Create an Altair bar chart
-    chart_2 = (
-        alt.Chart(data_chart_2)
-        .mark_bar(size=25)
-        .encode(
-            x="REPORTING_DATE:T",
-            y="AMOUNT:Q",
-            color=alt.condition(
-                alt.datum.AMOUNT > 0,  # Condition for positive values
-                alt.value("green"),  # Color if condition is true
-                alt.value("red"),  # Color if condition is false
-            ),
-        )
-        .properties(width=600, height=400)
-        .configure_axis(
-            labelFontSize=14,  # Adjust axis label size
-            titleFontSize=16,  # Adjust axis title size
-        )
-        .configure_legend(
-            titleFontSize=16,  # Adjust legend title size
-            labelFontSize=14,  # Adjust legend label size
-        )
+    altair_chart(
+        "respond_2.monthly_pnl",
+        data_chart_2,
+        lambda d: (
+            alt.Chart(d)
+            .mark_bar(size=25)
+            .encode(
+                x="REPORTING_DATE:T",
+                y="AMOUNT:Q",
+                color=alt.condition(
+                    alt.datum.AMOUNT > 0,  # Condition for positive values
+                    alt.value("green"),  # Color if condition is true
+                    alt.value("red"),  # Color if condition is false
+                ),
+            )
+            .properties(width=600, height=400)
+            .configure_axis(
+                labelFontSize=14,  # Adjust axis label size
+                titleFontSize=16,  # Adjust axis title size
+            )
+            .configure_legend(
+                titleFontSize=16,  # Adjust legend title size
+                labelFontSize=14,  # Adjust legend label size
+            )
+        ),
+        x="REPORTING_DATE",
+        y="AMOUNT",
     )
 
-    # Display the chart in Streamlit
-    st.altair_chart(chart_2, use_container_width=True)
-
 with st.container(border=True):
     st.write("Chart of Monthly Expense Development")
-    st.line_chart(data_chart, x="REPORTING_DATE", y="AMOUNT", color="L1")
+    st.line_chart(
+        downsample(data_chart, "REPORTING_DATE", "AMOUNT", "L1"),
+        x="REPORTING_DATE",
+        y="AMOUNT",
+        color="L1",
+    )
 
-# st.write("Here is the raw data from Snowflake:")
-st.dataframe(data)
+# Full transaction history, paged on the server
+transaction_grid(
+    snf,
+    key="jan_transactions",
+    base_filters=[
+        ("OWNER", "=", OWNER.name),
+        ("TRANSACTION_HK", "NOT IN", OWNER.excluded_transactions),
+    ],
+)
 
 
-# Close the cursor and connection
-cur.close()
-# conn.close()
+# ============================================================
+# EXPORT
+# ============================================================
+with st.container(border=True):
+    export_panel(OWNER)
@@ -1,39 +1,29 @@
 import streamlit as st
-import yaml
-import bcrypt as bc
-
-
-# Load the secrets.yaml file
-
-def load_secrets():
-    with open("secrets.yaml", "r") as file:
-        return yaml.safe_load(file)
-
-secrets = load_secrets()
-
-#Password hashing
-
-def hash_password(password):
-    salt = bc.gensalt()  # Generate salt
-    hashed_password = bc.hashpw(password.encode('utf-8'), salt)  # Hash password
-    return hashed_password
-
-def check_password(username, entered_password):
-    if username in secrets['users']:
-         stored_password_hash = secrets['users'][username]['password']
-    return bc.checkpw(entered_password.encode('utf-8'), stored_password_hash.encode('utf-8'))
-
-
-# Role setup
+from admin.owners import owners_for_role
+from admin.profiler import profile_page
+from admin.ingest import INGEST_ENABLED, get_ingestion_scheduler
+from admin.tracing import span
+from admin import warmup
+from admin.auth import (
+    LoginBusyError,
+    check_password,
+    forget_session,
+    remember_session,
+    restore_session,
+    role_lookup,
+    sync_session_cookie,
+)
 
-def role_lookup(username):
-    if username in secrets['users']:
-        return secrets['users'][username]['role']
-    return None 
+# Connections and dashboard datasets warm up in the background from the
+# first run on (or earlier with `python -m admin serve`), see admin/warmup.py
+warmup.start()
 
 if "role" not in st.session_state:
     st.session_state.role = None
 
+# Returning users are restored from the signed session cookie
+restore_session()
+
 
 
 #Login and logout
@@ -52,15 +42,20 @@ def login():
                 
     if login_button:
         #if authenticate(username, password):
-        if check_password(username, password):
-            st.session_state.role = role_lookup(username)
-            st.rerun()
+        try:
+            valid = check_password(username, password)
+        except LoginBusyError as e:
+            st.error(str(e))
         else:
-            st.error("Invalid username or password")
+            if valid:
+                remember_session(username, role_lookup(username))
+                st.rerun()
+            else:
+                st.error("Invalid username or password")
 
 
 def logout():
-    st.session_state.role = None
+    forget_session()
     st.rerun()
 
 role = st.session_state.role
@@ -77,27 +72,32 @@ request_1 = st.Page(
 request_2 = st.Page(
     "request/request_2.py", title="Request 2", icon=":material/bug_report:"
 )
-respond_1 = st.Page(
-    "respond/respond_1.py",
-    title="Files Upload / Hierarchy",
-    icon=":material/healing:",
-    default=(role == "Responder"),
-)
-respond_2 = st.Page(
-    "respond/respond_2.py", title="Report View", icon=":material/handyman:"
-)
-admin_1 = st.Page(
-    "admin/admin_1.py",
-    title="Files Upload / Hierarchy",
-    icon=":material/person_add:",
-    default=(role == "Admin"),
+
+# Budget pages per owner, see admin/owners.py
+owner_sections = {}
+page_owners = {}
+for profile in owners_for_role(role):
+    pages = [
+        st.Page(
+            page.path,
+            title=page.title,
+            icon=page.icon,
+            url_path=page.url_path,
+            default=(role == profile.roles[0] and i == 0),
+        )
+        for i, page in enumerate(profile.pages)
+    ]
+    owner_sections[profile.section] = pages
+    # Keyed by the page object: st.navigation returns one of these, and the
+    # default page reports url_path "" rather than its own
+    page_owners.update({page: profile.name for page in pages})
+
+performance = st.Page(
+    "admin/admin_3.py", title="Performance", icon=":material/speed:"
 )
-admin_2 = st.Page("admin/admin_2.py", title="Report View", icon=":material/security:")
 
 account_pages = [logout_page]
 #request_pages = [request_1, request_2]
-respond_pages = [respond_1, respond_2]
-admin_pages = [admin_1, admin_2]
 
 #st.title("Request manager")
 st.logo("images/horizontal_blue.png", icon_image="images/new_logo.png")
@@ -105,14 +105,24 @@ st.logo("images/horizontal_blue.png", icon_image="images/new_logo.png")
 page_dict = {}
 #if st.session_state.role in ["Requester", "Admin"]:
 #    page_dict["Request"] = request_pages
-if st.session_state.role in ["Responder", "Admin"]:
-    page_dict["Jan's Budget"] = respond_pages
+page_dict |= owner_sections
 if st.session_state.role == "Admin":
-    page_dict["Peter's Budget"] = admin_pages
+    page_dict["Admin"] = [performance]
 
 if len(page_dict) > 0:
+    # Starts the upload watcher once per process, see admin/ingest.py
+    if INGEST_ENABLED:
+        get_ingestion_scheduler()
     pg = st.navigation({"Account": account_pages} | page_dict)
 else:
     pg = st.navigation([st.Page(login)])
 
-pg.run()
+# Pages read their owner through admin.owners.current_owner()
+st.session_state.owner = page_owners.get(pg)
+
+sync_session_cookie()
+
+# Opt-in timing breakdown: ?profile=1 or BWA_PROFILE=1
+# One trace per page run; external calls and button actions are its children
+with span(f"page {pg.title}", page=pg.url_path, role=role), profile_page(pg.title):
+    pg.run()
@@ -0,0 +1,44 @@
+# Third-party
+import pytest
+
+pytest.importorskip("duckdb")  # admin/fakes.py runs Snowflake queries on DuckDB
+
+# Local
+from admin import fakes
+
+
+@pytest.fixture(scope="session")
+def db():
+    return fakes.seed_database(500)
+
+
+@pytest.fixture
+def snf(db):
+    """SnowflakeClient on the DuckDB stand-in; fails the test if a connection leaked."""
+    client = fakes.fake_snowflake_client(db=db)
+    yield client
+    assert client.checked_out == 0
+    client.close()
+
+
+@pytest.fixture
+def offline_app(db, tmp_path, monkeypatch):
+    """Point the app's shared clients at the stand-ins, for AppTest runs."""
+    import admin.utils
+
+    class LocalBlobService:
+        def get_container_client(self, container):
+            return fakes.LocalContainerClient(tmp_path / container)
+
+    monkeypatch.setattr(admin.utils, "get_kv_client", fakes.FakeKeyVaultClient)
+    monkeypatch.setattr(
+        admin.utils, "BlobServiceClient", lambda **kwargs: LocalBlobService()
+    )
+    monkeypatch.setattr(
+        admin.utils.SnowflakeClient, "_connect", lambda self: fakes.FakeSnowflakeConnection(db)
+    )
+    admin.utils.get_snowflake_client.clear()
+    admin.utils.get_blob_uploader.clear()
+    yield
+    admin.utils.get_snowflake_client.clear()
+    admin.utils.get_blob_uploader.clear()
@@ -0,0 +1,18 @@
+# Third-party
+import pytest
+from streamlit.testing.v1 import AppTest
+
+# Local
+from admin.owners import owners_for_role
+
+
+@pytest.mark.parametrize("role", ["Admin", "Responder"])
+def test_default_page_renders_for_role(role, offline_app):
+    app = AppTest.from_file("../streamlit_app.py", default_timeout=60)
+    app.session_state["role"] = role
+    app.session_state["username"] = "test"
+    app.run()
+
+    assert not app.exception, [e.value for e in app.exception]
+    default_owner = next(p for p in owners_for_role(role) if p.roles[0] == role)
+    assert app.session_state["owner"] == default_owner.name
@@ -0,0 +1,38 @@
+# Standard library
+import os
+from datetime import date, datetime
+
+# Third-party
+import pytest
+from azure.storage.blob import StandardBlobTier
+
+# Local
+from admin import archive
+from admin.fakes import LocalContainerClient
+from admin.owners import OWNERS
+
+OWNER = next(iter(OWNERS.values()))
+
+
+def test_compact_uploads_bundles_in_the_archive_tier(tmp_path):
+    container = LocalContainerClient(tmp_path)
+    name = f"{OWNER.processed_folder}pohyby-2026-03.csv"
+    container.upload_blob(name, b"a;b\n1;2\n")
+    march = datetime(2026, 3, 15).timestamp()
+    os.utime(tmp_path / name, (march, march))
+
+    report = archive.ProcessedArchive.for_owner(OWNER, container).compact(
+        OWNER.name, on=date(2026, 5, 10)
+    )
+
+    bundle = f"{OWNER.archive_folder}2026-03.tar.gz"
+    assert report.bundles == [bundle] and report.files == 1
+    assert container.tiers[bundle] is archive.ARCHIVE_TIER
+    assert archive.ProcessedArchive.for_owner(OWNER, container).retrieve(name) == b"a;b\n1;2\n"
+
+
+def test_fake_container_rejects_a_plain_string_tier(tmp_path):
+    container = LocalContainerClient(tmp_path)
+    with pytest.raises(TypeError):
+        container.upload_blob("bundle.tar.gz", b"", standard_blob_tier="Cool")
+    container.upload_blob("bundle.tar.gz", b"", standard_blob_tier=StandardBlobTier.COOL)
@@ -0,0 +1,33 @@
+# Standard library
+import os
+
+# Local
+from admin import auth
+from admin.auth import UserStore
+
+
+def test_user_store_reloads_when_the_file_changes(tmp_path):
+    path = tmp_path / "secrets.yaml"
+    path.write_text("users:\n  ana:\n    role: Admin\n")
+    store = UserStore(str(path))
+    assert store.get("ana") == {"role": "Admin"}
+
+    path.write_text("users:\n  bo:\n    role: Responder\n")
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    assert store.get("ana") is None
+    assert store.get("bo") == {"role": "Responder"}
+    assert store.data["users"] == {"bo": {"role": "Responder"}}
+
+
+def test_session_tokens_round_trip_and_reject_tampering(monkeypatch):
+    monkeypatch.setenv(auth.COOKIE_KEY_ENV, "test-key")
+    monkeypatch.setattr(auth, "role_lookup", lambda username: "Admin")
+    token = auth.issue_session_token("ana", "Admin")
+
+    assert auth.verify_session_token(token) == ("ana", "Admin")
+    payload, signature = token.rsplit(".", 1)
+    assert auth.verify_session_token(f"{payload}x.{signature}") is None
+    assert auth.verify_session_token(f"{payload}.ž{signature}") is None
+    assert auth.verify_session_token(f"pä{payload}.{signature}") is None
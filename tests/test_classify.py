@@ -0,0 +1,25 @@
+# Third-party
+import pandas as pd
+import pytest
+
+# Local
+from admin import classify
+from admin.fakes import fake_blob_uploader
+from admin.utils import UploadError
+
+
+def test_failed_hierarchy_export_still_invalidates(tmp_path, snf, monkeypatch):
+    written = []
+    monkeypatch.setattr(snf, "sf_write_pandas", lambda df, **kw: written.append(df) or (True, 1, len(df)))
+    abl = fake_blob_uploader(tmp_path)  # no hierarchy CSV to append to
+    invalidated = []
+    monkeypatch.setattr(classify.DATASETS, "invalidate", invalidated.append)
+    accepted = pd.DataFrame(
+        {"IDS": [["test-1", "test-2"]], "L1": ["Food"], "L2": ["Groceries"], "L3": [None]}
+    )
+
+    with pytest.raises(UploadError, match=abl.hierarchy_blob):
+        classify.commit_hierarchy(snf, abl, accepted, "Peter")
+
+    assert len(written[0]) == 2
+    assert invalidated == ["hierarchy"]
@@ -0,0 +1,33 @@
+# Third-party
+import pandas as pd
+
+# Local
+import admin.utils
+from admin import cli
+from admin.fakes import fake_blob_uploader
+
+
+def test_rules_scd2_fails_when_staging_fails(snf, monkeypatch, tmp_path):
+    monkeypatch.setattr(admin.utils, "get_snowflake_client", lambda: snf)
+    monkeypatch.setattr(snf, "sf_write_pandas", lambda *args, **kwargs: (False, 0, 0))
+    calls = []
+    monkeypatch.setattr(snf, "run_query_df", lambda sql, *args, **kwargs: calls.append(sql))
+    rules = tmp_path / "rules.csv"
+    pd.DataFrame({"PATTERN": ["MERCHANT"], "L1": ["Food"]}).to_csv(rules, sep=";", index=False)
+
+    assert cli.main(["rules-scd2", str(rules)]) == cli.EXIT_FAILED
+    assert calls == []  # the SCD2 load does not run on a failed staging write
+
+
+def test_upload_reports_failed_files(monkeypatch, tmp_path):
+    abl = fake_blob_uploader(tmp_path / "blobs", "Peter")
+
+    def broken_upload(**kwargs):
+        raise ConnectionError("storage unreachable")
+
+    monkeypatch.setattr(abl.container_client, "upload_blob", broken_upload)
+    monkeypatch.setattr(admin.utils, "get_blob_uploader", lambda owner: abl)
+    statement = tmp_path / "pohyby.csv"
+    statement.write_text("a;b")
+
+    assert cli.main(["upload", "Peter", str(statement)]) == cli.EXIT_FAILED
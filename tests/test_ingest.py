@@ -0,0 +1,43 @@
+# Local
+from admin import pipeline
+from admin.fakes import LocalContainerClient
+from admin.ingest import IngestionScheduler
+from admin.owners import OWNERS
+
+OWNER = OWNERS["Peter"]
+
+
+def scheduler(tmp_path, snf) -> tuple[IngestionScheduler, LocalContainerClient]:
+    container = LocalContainerClient(tmp_path)
+    runner = pipeline.RecalculationRunner(snf, container)
+    return (
+        IngestionScheduler(
+            runner, [OWNER.input_folder], quiet_s=0, ignored={OWNER.hierarchy_blob}
+        ),
+        container,
+    )
+
+
+def test_first_scan_without_a_job_is_a_baseline(tmp_path, snf):
+    watcher, container = scheduler(tmp_path, snf)
+    container.upload_blob(f"{OWNER.input_folder}pohyby-old.csv", b"a;b")
+
+    watcher.poll()
+
+    assert watcher.pending() == {}
+    assert watcher.history() == []
+
+
+def test_hierarchy_export_is_not_an_upload(tmp_path, snf):
+    watcher, container = scheduler(tmp_path, snf)
+    watcher.poll()
+
+    container.upload_blob(OWNER.hierarchy_blob, b"L1;L2", overwrite=True)
+    watcher.poll()
+    assert watcher.pending() == {}
+
+    upload = f"{OWNER.input_folder}pohyby-new.csv"
+    container.upload_blob(upload, b"a;b")
+    watcher.poll()
+    assert [list(run["uploads"]) for run in watcher.history()] == [[upload]]
+    watcher.runner.wait(10)
@@ -0,0 +1,18 @@
+# Local
+from admin import fakes, owner_data
+from admin.owners import OWNERS
+
+
+def test_monthly_totals_bootstrap_missing_aggregate(monkeypatch):
+    db = fakes.seed_database(200)
+    db.execute("DROP TABLE BUDGET.MART.BUDGET_MONTHLY")
+    snf = fakes.fake_snowflake_client(db=db)
+    monkeypatch.setattr(owner_data, "get_snowflake_client", lambda: snf)
+    monkeypatch.setattr(owner_data, "_aggregate_checked", False)
+
+    monthly = owner_data._load_monthly_totals()
+
+    assert set(monthly) == set(OWNERS)
+    assert sum(df["TRANSACTIONS"].sum() for df in monthly.values()) == 200
+    assert owner_data._aggregate_checked
+    assert snf.checked_out == 0
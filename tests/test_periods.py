@@ -0,0 +1,31 @@
+# Standard library
+from datetime import date
+
+# Third-party
+import pandas as pd
+
+# Local
+from admin import periods
+
+
+def test_current_month_bounds():
+    assert tuple(periods.current_month(date(2026, 5, 15))) == (date(2026, 5, 1), date(2026, 6, 1))
+    assert tuple(periods.current_month(date(2026, 12, 31))) == (date(2026, 12, 1), date(2027, 1, 1))
+
+
+def test_last_n_months_is_whole_months():
+    assert tuple(periods.last_n_months(3, date(2026, 5, 15))) == (date(2026, 2, 1), date(2026, 6, 1))
+    assert tuple(periods.last_n_months(12, date(2026, 1, 10))) == (date(2025, 1, 1), date(2026, 2, 1))
+
+
+def test_trailing_months_rolls_from_today():
+    assert tuple(periods.trailing_months(3, date(2026, 5, 15))) == (date(2026, 2, 15), date(2026, 6, 1))
+    # Month end clamps to the shorter month; January reaches into last year
+    assert periods.trailing_months(3, date(2026, 5, 31)).start == date(2026, 2, 28)
+    assert periods.trailing_months(3, date(2026, 1, 20)).start == date(2025, 10, 20)
+
+
+def test_range_mask_excludes_end():
+    dates = pd.Series(pd.to_datetime(["2026-02-14", "2026-02-15", "2026-05-31", "2026-06-01"]))
+    mask = periods.trailing_months(3, date(2026, 5, 15)).mask(dates)
+    assert mask.tolist() == [False, True, True, False]
@@ -0,0 +1,91 @@
+# Standard library
+import json
+
+# Third-party
+import pytest
+
+# Local
+from admin import pipeline
+from admin.fakes import LocalContainerClient
+
+
+class FlakyStatusContainer(LocalContainerClient):
+    """Fails the first status write, like a transient blob error."""
+
+    def __init__(self, root):
+        super().__init__(root)
+        self.fail_status = True
+
+    def get_blob_client(self, blob):
+        client = super().get_blob_client(blob)
+        if blob == pipeline.STATUS_BLOB and self.fail_status:
+            self.fail_status = False
+
+            def upload_blob(*args, **kwargs):
+                raise ConnectionError("status write failed")
+
+            client.upload_blob = upload_blob
+        return client
+
+
+def test_start_releases_lease_when_status_write_fails(tmp_path, snf):
+    container = FlakyStatusContainer(tmp_path)
+    runner = pipeline.RecalculationRunner(snf, container)
+
+    with pytest.raises(ConnectionError):
+        runner.start("test")
+
+    assert (runner.status() or {}).get("state") != "running"
+    lease = pipeline.RecalculationLease(container)
+    assert lease.acquire()
+    lease.release()
+
+    started, status = runner.start("test")
+    assert started
+    assert runner.wait(10)["state"] == "succeeded"
+
+
+def test_failed_step_stops_the_run(tmp_path, snf, monkeypatch):
+    monkeypatch.setattr(pipeline, "RECALCULATION_PROCEDURES", {
+        "RAW": "CALL BUDGET.RAW.COPY_FILES_TO_RAW_CSOB();",
+        "CORE": "SELECT * FROM BUDGET.CORE.NO_SUCH_TABLE",
+        "MART": "CALL BUDGET.CORE.RAW2CORE_CSOB();",
+    })
+    runner = pipeline.RecalculationRunner(snf, LocalContainerClient(tmp_path))
+
+    started, _ = runner.start("test")
+    status = runner.wait(10)
+
+    assert started and status["state"] == "failed"
+    steps = status["steps"]
+    assert steps["RAW"]["ok"] and steps["RAW"]["error"] is None
+    assert not steps["CORE"]["ok"] and "NO_SUCH_TABLE" in steps["CORE"]["error"]
+    assert steps["MART"] == {"ok": False, "error": "not executed", "duration_s": 0.0}
+
+
+def test_final_status_is_written_before_the_lease_is_released(tmp_path, snf, monkeypatch):
+    events = []
+
+    class RecordingContainer(LocalContainerClient):
+        def get_blob_client(self, blob):
+            client = super().get_blob_client(blob)
+            if blob == pipeline.STATUS_BLOB:
+                upload_blob = client.upload_blob
+
+                def record(data, *args, **kwargs):
+                    events.append(f"status:{json.loads(data)['state']}")
+                    return upload_blob(data, *args, **kwargs)
+
+                client.upload_blob = record
+            return client
+
+    release = pipeline.RecalculationLease.release
+    monkeypatch.setattr(
+        pipeline.RecalculationLease, "release", lambda self: events.append("release") or release(self)
+    )
+    runner = pipeline.RecalculationRunner(snf, RecordingContainer(tmp_path))
+
+    runner.start("test")
+    runner.wait(10)
+
+    assert events[-2:] == ["status:succeeded", "release"]
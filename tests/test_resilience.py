@@ -0,0 +1,63 @@
+# Third-party
+import pytest
+from azure.core.exceptions import ServiceRequestError
+
+# Local
+from admin import resilience
+
+
+@pytest.fixture(autouse=True)
+def fresh_breakers(monkeypatch):
+    monkeypatch.setattr(
+        resilience,
+        "BREAKERS",
+        {s: resilience.CircuitBreaker(s, p) for s, p in resilience.POLICIES.items()},
+    )
+    monkeypatch.setattr(resilience.time, "sleep", lambda s: None)
+
+
+def test_transient_errors_are_retried():
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise ServiceRequestError("connection reset")
+        return "ok"
+
+    assert resilience.guarded("blob", flaky) == "ok"
+    assert resilience.BREAKERS["blob"].stats()["retries"] == 2
+
+
+def test_breaker_opens_and_fails_fast():
+    def down():
+        raise ConnectionError("down")
+
+    threshold = resilience.POLICIES["blob"].failure_threshold
+    for _ in range(threshold):
+        with pytest.raises(ConnectionError):
+            resilience.guarded("blob", down)
+
+    with pytest.raises(resilience.CircuitOpenError):
+        resilience.guarded("blob", down)
+    assert resilience.BREAKERS["blob"].stats()["trips"] == 1
+
+
+def test_nested_failure_counts_only_for_its_own_service():
+    secret_fetches = []
+
+    def get_secret():
+        secret_fetches.append(1)
+        raise ServiceRequestError("key vault unreachable")
+
+    def connect():
+        return resilience.guarded("keyvault", get_secret)
+
+    with pytest.raises(ServiceRequestError):
+        resilience.guarded("snowflake", connect)
+
+    assert len(secret_fetches) == resilience.POLICIES["keyvault"].attempts
+    keyvault = resilience.BREAKERS["keyvault"].stats()
+    snowflake = resilience.BREAKERS["snowflake"].stats()
+    assert (keyvault["failures"], keyvault["retries"]) == (1, 2)
+    assert (snowflake["failures"], snowflake["retries"]) == (0, 0)
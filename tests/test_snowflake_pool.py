@@ -0,0 +1,100 @@
+# Standard library
+import threading
+import time
+
+# Third-party
+import pytest
+
+# Local
+from admin import fakes
+
+MART_SQL = "SELECT * FROM BUDGET.MART.BUDGET"
+
+
+def test_query_returns_connection(snf):
+    rows = snf.run_query("SELECT COUNT(*) FROM BUDGET.MART.BUDGET")
+
+    assert rows == [(500,)]
+    assert snf.checked_out == 0
+    assert snf.pool_stats()["idle"] == 1
+
+
+def test_failing_query_returns_connection(snf):
+    with pytest.raises(Exception):
+        snf.run_query_df("SELECT * FROM BUDGET.MART.MISSING_TABLE")
+
+    assert snf.checked_out == 0
+    assert snf.pool_stats()["idle"] == 1
+
+
+def test_iter_batches_closed_early_returns_connection(snf, monkeypatch):
+    monkeypatch.setattr(fakes, "FAKE_BATCH_ROWS", 100)
+    batches = snf.iter_batches(MART_SQL)
+
+    assert len(next(batches)) == 100
+    assert snf.checked_out == 1
+
+    batches.close()
+    assert snf.checked_out == 0
+
+
+def test_exhausted_pool_opens_extra_connections_and_closes_them(db):
+    opened = []
+
+    def connect():
+        opened.append(fakes.FakeSnowflakeConnection(db))
+        return opened[-1]
+
+    snf = fakes.fake_snowflake_client(db=db, pool_size=2)
+    snf._connection_factory = connect
+
+    held = [snf._acquire() for _ in range(3)]
+    assert snf.checked_out == 3 and len(opened) == 3
+    for conn in held:
+        snf._release(conn)
+
+    assert snf.checked_out == 0
+    assert snf.pool_stats()["idle"] == 2
+    assert sum(conn.is_closed() for conn in opened) == 1
+
+
+def test_identical_reads_in_flight_are_coalesced(db):
+    gate, started = threading.Event(), threading.Event()
+    executed = []
+
+    class GatedCursor(fakes.FakeSnowflakeCursor):
+        def execute(self, sql, *args, **kwargs):
+            executed.append(sql)
+            started.set()
+            gate.wait(5)
+            return super().execute(sql, *args, **kwargs)
+
+    class GatedConnection(fakes.FakeSnowflakeConnection):
+        def cursor(self):
+            return GatedCursor(self)
+
+    snf = fakes.fake_snowflake_client(db=db)
+    snf._connection_factory = lambda: GatedConnection(db)
+
+    results = {}
+
+    def read(name):
+        results[name] = snf.run_query_df(MART_SQL)
+
+    leader = threading.Thread(target=read, args=("leader",))
+    leader.start()
+    assert started.wait(5)
+    follower = threading.Thread(target=read, args=("follower",))
+    follower.start()
+    deadline = time.monotonic() + 5
+    while snf.coalesced == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    gate.set()
+    leader.join(5)
+    follower.join(5)
+
+    assert snf.coalesced == 1
+    assert len(executed) == 1
+    assert results["leader"].equals(results["follower"])
+    assert results["leader"] is not results["follower"]
+    assert snf.checked_out == 0
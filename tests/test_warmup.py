@@ -0,0 +1,17 @@
+# Local
+from admin import warmup
+from admin.owners import OWNERS
+
+
+def test_owner_datasets_follow_the_owner_pages(monkeypatch):
+    # Only Peter's pages include the classification workbench (admin_1)
+    assert warmup.owner_datasets("Peter") == ["classification_suggestions"]
+    assert warmup.owner_datasets("Jan") == []
+
+    loaded = []
+    monkeypatch.setattr(
+        warmup.DATASETS, "get", lambda name, **params: loaded.append((name, params)) or []
+    )
+    warmup.warm_datasets(list(OWNERS))
+
+    assert loaded == [("monthly_totals_all", {}), ("classification_suggestions", {"owner": "Peter"})]